@@ -0,0 +1,176 @@
+"""
+Benchmark regression gate.
+
+Runs the startup benchmarks (benchmarks/startup.py) and the suite (benchmarks/suite.py) for one project tree
+size, and compares the median of every metric with the stored baseline. Fails, if any metric is slower than
+its baseline by more than the tolerance.
+
+A metric only counts as regressed if both its median and its fastest run are beyond the tolerance, so that
+single slow runs caused by noise do not fail the gate.
+
+Baselines are stored per benchmark in benchmarks/baselines/. They depend on the machine, so they are not
+committed. Record them on the machine that runs the gate, before making changes:
+
+    python benchmarks/compare.py --update
+
+The gate fails if there is no baseline. Metrics that are missing in a baseline are reported as warnings.
+
+Usage: python benchmarks/compare.py [--runs N] [--projects N] [--tolerance [METRIC=]FRACTION ...] [--update]
+"""
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import click
+
+import startup
+from projects import generate
+from suite import run_worker
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+# Suite scenarios compared by the gate
+SUITE_METRICS = ('load_all_projects', 'all_projects_query', 'project_query',
+                 'schema_generation', 'schema_generation_uncached', 'subscription_progress')
+
+
+def run_startup(runs: int) -> Dict[str, List[float]]:
+    """Returns the import times of all startup scenarios in milliseconds."""
+    return {
+        name: [startup.total_time(startup.measure(statement)) / 1000 for _ in range(runs)]
+        for name, (statement, _) in startup.SCENARIOS.items()
+    }
+
+
+def run_suite(runs: int, projects: int, services: int) -> Dict[str, List[float]]:
+    """Returns the durations of the suite scenarios in milliseconds."""
+    with tempfile.TemporaryDirectory(prefix='riptide-mc-benchmark-') as root:
+        generate(root, projects, services)
+        scenarios = run_worker(root, projects, runs)
+    return {name: scenarios[name]['runs_ms'] for name in SUITE_METRICS}
+
+
+def baseline_path(benchmark: str) -> str:
+    return os.path.join(BASELINE_DIR, f'{benchmark}.json')
+
+
+def load_baseline(benchmark: str) -> Optional[dict]:
+    """Returns the stored baseline, or None if there is none."""
+    try:
+        with open(baseline_path(benchmark), 'r') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(benchmark: str, metrics: Dict[str, List[float]], parameters: dict):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    with open(baseline_path(benchmark), 'w') as file:
+        json.dump({
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'parameters': parameters,
+            'metrics': metrics,
+        }, file, indent=2)
+
+
+def compare(baseline: List[float], current: List[float], tolerance: float) -> Tuple[str, float]:
+    """Returns the status of a metric (OK, REGRESSED or IMPROVED) and the relative change of the median."""
+    change = statistics.median(current) / statistics.median(baseline) - 1
+    if change > tolerance and min(current) / min(baseline) - 1 > tolerance:
+        return 'REGRESSED', change
+    if change < -tolerance:
+        return 'IMPROVED', change
+    return 'OK', change
+
+
+def _parse_tolerances(values: List[str]) -> Tuple[float, Dict[str, float]]:
+    default = 0.1
+    per_metric = {}
+    for value in values:
+        metric, _, fraction = value.rpartition('=')
+        try:
+            fraction = float(fraction)
+        except ValueError:
+            raise click.BadParameter(f"Invalid tolerance {value}.", param_hint='--tolerance')
+        if metric:
+            per_metric[metric] = fraction
+        else:
+            default = fraction
+    return default, per_metric
+
+
+@click.command()
+@click.option('--runs', default=7, help="Number of runs per metric. Default: 7")
+@click.option('--projects', default=50, help="Number of projects for the suite. Default: 50")
+@click.option('--services', default=5, help="Number of services per project for the suite. Default: 5")
+@click.option('--tolerance', multiple=True, metavar='[METRIC=]FRACTION',
+              help="Allowed slowdown of the median, eg. 0.1 for 10% (the default), "
+                   "or for a single metric, eg. startup.server=0.2. Can be repeated.")
+@click.option('--update', is_flag=True, help="Store the results as new baselines instead of comparing.")
+def main(runs, projects, services, tolerance, update):
+    default_tolerance, tolerances = _parse_tolerances(tolerance)
+    metrics = [f'startup.{name}' for name in startup.SCENARIOS] + [f'suite.{name}' for name in SUITE_METRICS]
+    for metric in tolerances:
+        if metric not in metrics:
+            raise click.BadParameter(f"Unknown metric {metric}. Must be one of: {', '.join(metrics)}",
+                                     param_hint='--tolerance')
+    benchmarks = {
+        'startup': (lambda: run_startup(runs), {'runs': runs}),
+        'suite': (lambda: run_suite(runs, projects, services),
+                  {'runs': runs, 'projects': projects, 'services': services}),
+    }
+
+    baselines = {benchmark: load_baseline(benchmark) for benchmark in benchmarks}
+    missing = [baseline_path(benchmark) for benchmark, baseline in baselines.items() if baseline is None]
+    if missing and not update:
+        raise click.ClickException(f"No baseline in {', '.join(missing)}. Record the baselines on this machine "
+                                   f"with --update, before making changes.")
+    for benchmark, (_, parameters) in benchmarks.items():
+        stored = (baselines[benchmark] or {}).get('parameters', {})
+        for key, value in parameters.items():
+            # The number of runs may differ, everything else changes what is measured
+            if not update and key != 'runs' and stored.get(key, value) != value:
+                raise click.ClickException(f"The {benchmark} baseline was recorded with {key}={stored[key]}, "
+                                           f"not {value}. Use the same parameters or record a new baseline.")
+
+    regressed = False
+    unmeasured = []
+    for benchmark, (run, parameters) in benchmarks.items():
+        click.echo(f"Running {benchmark}...")
+        results = run()
+        if update:
+            save_baseline(benchmark, results, parameters)
+            click.echo(f"    Baseline written to {baseline_path(benchmark)}.")
+            continue
+
+        baseline = baselines[benchmark]['metrics']
+        for name, current in results.items():
+            metric = f'{benchmark}.{name}'
+            if name not in baseline:
+                unmeasured.append(metric)
+                click.echo(f"    {metric:38} {statistics.median(current):10.1f}ms       NEW (no baseline)")
+                continue
+            metric_tolerance = tolerances.get(metric, default_tolerance)
+            status, change = compare(baseline[name], current, metric_tolerance)
+            regressed = regressed or status == 'REGRESSED'
+            click.echo(f"    {metric:38} {statistics.median(current):10.1f}ms "
+                       f"(baseline {statistics.median(baseline[name]):10.1f}ms, {change:+7.1%}, "
+                       f"tolerance {metric_tolerance:.0%}) {status}")
+
+    if unmeasured:
+        click.echo(f"Warning: {', '.join(unmeasured)} not compared, the baselines have no results for them. "
+                   f"Update the baselines with --update.", err=True)
+    if regressed:
+        click.echo("Performance regressed. If this is expected, update the baselines with --update.")
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == '__main__':
+    main()
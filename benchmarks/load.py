@@ -0,0 +1,255 @@
+"""
+Load generator for the /subscriptions endpoint.
+
+Opens K websocket connections, which speak the graphql-ws protocol and run projectStart and projectStop
+subscriptions one after another, for increasing K. For every K it measures:
+
+- The latency until the first message and until the end of each subscription (percentiles)
+- The throughput in messages and completed subscriptions per second
+- The resident memory (RSS) of the server, if its PID is given (Linux only)
+
+The saturation point is the last K, after which the throughput increases by less than --min-gain or the 95th
+percentile of the subscription latency exceeds --latency-limit.
+
+Run it against a server using the fake engine, for example with a generated project tree
+(see benchmarks/projects.py):
+
+    XDG_CONFIG_HOME=/tmp/tree riptide_mc --engine fake --fake-latency 50 &
+    python benchmarks/load.py --pid $! --connections 1,10,50,100,200
+"""
+import asyncio
+import itertools
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+import click
+from tornado.httpclient import AsyncHTTPClient
+from tornado.ioloop import IOLoop
+from tornado.websocket import websocket_connect
+
+SUBSCRIPTION = """
+subscription %s($projectName: String!) {
+  %s(projectName: $projectName) {
+    __typename
+    ... on StartStopProgressStep { service state { steps currentStep text isEnd isError } }
+    ... on StartStopEndStep { errorString isFatalError }
+  }
+}
+"""
+
+# Interval in seconds in which the RSS of the server is sampled
+RSS_SAMPLE_INTERVAL = 0.25
+
+
+class LevelStatistics:
+    """Measurements of all connections of one load level."""
+    def __init__(self):
+        self.messages = 0
+        self.subscriptions = 0
+        self.errors = 0
+        self.first_message_latencies: List[float] = []
+        self.completion_latencies: List[float] = []
+        self.rss_samples: List[int] = []
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def server_rss(pid: int) -> Optional[int]:
+    """Resident set size of the process in bytes, or None if it can not be read."""
+    try:
+        with open(f'/proc/{pid}/status', 'r') as file:
+            for line in file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+async def project_names(graphql_url: str) -> List[str]:
+    response = await AsyncHTTPClient().fetch(
+        graphql_url, method='POST', headers={'Content-Type': 'application/json'},
+        body=json.dumps({'query': '{ allProjectNames }'})
+    )
+    return json.loads(response.body)['data']['allProjectNames']
+
+
+async def run_connection(url: str, projects: List[str], deadline: float, stats: LevelStatistics):
+    """Runs projectStart and projectStop subscriptions on one connection until the deadline is reached."""
+    connection = await websocket_connect(url, subprotocols=['graphql-ws'])
+    try:
+        connection.write_message(json.dumps({'type': 'connection_init', 'payload': {}}))
+        ack = json.loads(await connection.read_message())
+        if ack.get('type') != 'connection_ack':
+            raise RuntimeError(f"Connection was not acknowledged: {ack}")
+        operations = itertools.cycle(('projectStart', 'projectStop'))
+        for op_id in itertools.count(1):
+            if time.perf_counter() >= deadline:
+                break
+            operation = next(operations)
+            project = projects[op_id % len(projects)]
+            start = time.perf_counter()
+            connection.write_message(json.dumps({'id': str(op_id), 'type': 'start', 'payload': {
+                'query': SUBSCRIPTION % (operation.capitalize(), operation),
+                'variables': {'projectName': project}
+            }}))
+            first = True
+            while True:
+                message = await connection.read_message()
+                if message is None:
+                    raise RuntimeError("Connection closed by the server.")
+                message = json.loads(message)
+                if first:
+                    stats.first_message_latencies.append(time.perf_counter() - start)
+                    first = False
+                if message.get('type') != 'data':
+                    stats.errors += 1
+                    break
+                stats.messages += 1
+                step = message['payload'].get('data', {}).get(operation) or {}
+                if step.get('__typename') == 'StartStopEndStep':
+                    if step.get('errorString'):
+                        stats.errors += 1
+                    stats.subscriptions += 1
+                    stats.completion_latencies.append(time.perf_counter() - start)
+                    break
+    finally:
+        connection.close()
+
+
+async def sample_rss(pid: int, stats: LevelStatistics, stop: asyncio.Event):
+    while not stop.is_set():
+        rss = server_rss(pid)
+        if rss is not None:
+            stats.rss_samples.append(rss)
+        try:
+            await asyncio.wait_for(stop.wait(), RSS_SAMPLE_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_level(url: str, projects: List[str], connections: int, duration: float,
+                    pid: Optional[int]) -> Dict[str, object]:
+    stats = LevelStatistics()
+    stop_sampling = asyncio.Event()
+    sampler = asyncio.ensure_future(sample_rss(pid, stats, stop_sampling)) if pid else None
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(
+        *[run_connection(url, projects, start + duration, stats) for _ in range(connections)],
+        return_exceptions=True
+    )
+    elapsed = time.perf_counter() - start
+    stop_sampling.set()
+    if sampler:
+        await sampler
+    failed = [outcome for outcome in outcomes if isinstance(outcome, Exception)]
+    return {
+        'connections': connections,
+        'failed_connections': len(failed),
+        'connection_errors': sorted({str(ex) for ex in failed}),
+        'duration_s': elapsed,
+        'messages': stats.messages,
+        'subscriptions': stats.subscriptions,
+        'errors': stats.errors,
+        'messages_per_second': stats.messages / elapsed,
+        'subscriptions_per_second': stats.subscriptions / elapsed,
+        'first_message_ms': {p: _ms(percentile(stats.first_message_latencies, p)) for p in (50, 95, 99)},
+        'completion_ms': {p: _ms(percentile(stats.completion_latencies, p)) for p in (50, 95, 99)},
+        'rss_bytes_max': max(stats.rss_samples, default=None),
+    }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return seconds * 1000 if seconds is not None else None
+
+
+def saturation_point(levels: List[dict], min_gain: float, latency_limit: float) -> Optional[int]:
+    """
+    Returns the number of connections, after which adding connections no longer increases the throughput by
+    min_gain (relative), or the 95th percentile completion latency exceeds latency_limit (ms).
+    None if the server was not saturated.
+    """
+    previous = None
+    for level in levels:
+        p95 = level['completion_ms'][95]
+        if level['failed_connections'] or p95 is None or p95 > latency_limit:
+            return previous['connections'] if previous else level['connections']
+        if previous and level['messages_per_second'] < previous['messages_per_second'] * (1 + min_gain):
+            return previous['connections']
+        previous = level
+    return None
+
+
+@click.command()
+@click.option('--url', default='ws://localhost:8484/subscriptions',
+              help="Subscription endpoint. Default: ws://localhost:8484/subscriptions")
+@click.option('--connections', default='1,2,5,10,20,50,100',
+              help="Comma-separated numbers of concurrent connections to test. Default: 1,2,5,10,20,50,100")
+@click.option('--duration', default=10.0, help="Duration of each level in seconds. Default: 10")
+@click.option('--project', 'projects', multiple=True,
+              help="Project to start and stop. Can be repeated. Default: All projects")
+@click.option('--pid', type=int, default=None, help="PID of the server, to measure its RSS.")
+@click.option('--min-gain', default=0.1,
+              help="Minimum relative throughput gain of a level over the previous one. Default: 0.1")
+@click.option('--latency-limit', default=5000.0,
+              help="Maximum 95th percentile subscription latency in milliseconds. Default: 5000")
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), default=None,
+              help="File to write the results to as JSON.")
+def main(url, connections, duration, projects, pid, min_gain, latency_limit, output):
+    try:
+        counts = [int(count) for count in connections.split(',')]
+    except ValueError:
+        raise click.BadParameter("Must be a comma-separated list of numbers.", param_hint='--connections')
+    if pid and not os.path.exists(f'/proc/{pid}'):
+        raise click.BadParameter(f"No process with PID {pid}.", param_hint='--pid')
+
+    async def run():
+        names = list(projects)
+        if not names:
+            graphql_url = url.replace('ws://', 'http://', 1).replace('wss://', 'https://', 1)
+            names = await project_names(graphql_url.rsplit('/', 1)[0] + '/graphql')
+        if not names:
+            raise click.ClickException("The server has no projects.")
+        levels = []
+        for count in counts:
+            level = await run_level(url, names, count, duration, pid)
+            levels.append(level)
+            rss = f"{level['rss_bytes_max'] / 1024 / 1024:.1f}MiB" if level['rss_bytes_max'] else 'n/a'
+            click.echo(f"{count:5} connections: {level['messages_per_second']:9.1f} msg/s "
+                       f"{level['subscriptions_per_second']:7.1f} subscriptions/s  "
+                       f"p50/p95 {_format_ms(level['completion_ms'][50])}/{_format_ms(level['completion_ms'][95])}  "
+                       f"first message p95 {_format_ms(level['first_message_ms'][95])}  "
+                       f"RSS {rss}  errors {level['errors']} failed connections {level['failed_connections']}")
+        return levels
+
+    levels = IOLoop.current().run_sync(run)
+    saturation = saturation_point(levels, min_gain, latency_limit)
+    if saturation is None:
+        click.echo("Not saturated. Try more connections.")
+    else:
+        click.echo(f"Saturated at {saturation} connections.")
+    if output:
+        with open(output, 'w') as file:
+            json.dump({
+                'timestamp': time.time(),
+                'url': url,
+                'duration_s': duration,
+                'saturation_connections': saturation,
+                'levels': levels,
+            }, file, indent=2)
+        click.echo(f"Results written to {output}.")
+
+
+def _format_ms(value: Optional[float]) -> str:
+    return f"{value:.0f}ms" if value is not None else 'n/a'
+
+
+if __name__ == '__main__':
+    main()
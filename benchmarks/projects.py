@@ -0,0 +1,126 @@
+"""
+Generator for synthetic Riptide project trees.
+
+Creates a Riptide configuration directory with a system configuration and a project registry, and N projects
+with M services each. The services use logging, additional ports, environment variables and (for the first
+service of every project) a database driver. Each project also has normal and alias commands.
+
+Usage: python benchmarks/projects.py DIRECTORY [--projects N] [--services M]
+
+Run riptide_mc with XDG_CONFIG_HOME=DIRECTORY to use the generated tree. It is configured to use the fake engine.
+"""
+import json
+import os
+
+import click
+import yaml
+
+# Number of commands in every generated project. Every second command is an alias.
+COMMANDS_PER_PROJECT = 4
+
+
+def project_name(index: int) -> str:
+    return f'project{index:04d}'
+
+
+def _service(project_index: int, service_index: int) -> dict:
+    service = {
+        'image': f'example/service{service_index}:latest',
+        'roles': ['main', 'src'] if service_index == 0 else [],
+        'port': 80,
+        'environment': {f'VARIABLE_{i}': f'value{i}' for i in range(3)},
+        'logging': {
+            'stdout': True,
+            'stderr': True,
+            'paths': {'access': '/var/log/access.log', 'error': '/var/log/error.log'},
+        },
+        'additional_ports': {
+            'debug': {
+                'title': 'Debug',
+                'container': 9000,
+                'host_start': 30000 + project_index * 10 + service_index,
+            },
+        },
+    }
+    if service_index == 0:
+        service['driver'] = {
+            'name': 'mysql',
+            'config': {'database': 'benchmark', 'password': 'benchmark'},
+        }
+    return service
+
+
+def _commands() -> dict:
+    commands = {}
+    for index in range(COMMANDS_PER_PROJECT):
+        if index % 2:
+            commands[f'alias{index}'] = {'aliases': f'command{index - 1}'}
+        else:
+            commands[f'command{index}'] = {'image': f'example/command{index}:latest', 'command': 'run'}
+    return commands
+
+
+def generate_project(directory: str, project_index: int, services: int) -> str:
+    """
+    Writes the riptide.yml of a project into directory and returns its path.
+    The log directories of the services are created, like a real engine does when starting them.
+    """
+    service_names = ['www' if index == 0 else f'service{index}' for index in range(services)]
+    for name in service_names:
+        os.makedirs(os.path.join(directory, '_riptide', 'logs', name), exist_ok=True)
+    path = os.path.join(directory, 'riptide.yml')
+    document = {
+        'project': {
+            'name': project_name(project_index),
+            'src': '.',
+            'app': {
+                'name': f'app{project_index % 10}',
+                'services': {name: _service(project_index, index) for index, name in enumerate(service_names)},
+                'commands': _commands(),
+            },
+        },
+    }
+    with open(path, 'w') as file:
+        yaml.safe_dump(document, file)
+    return path
+
+
+def generate(root: str, projects: int, services: int) -> str:
+    """
+    Generates the configuration and projects in root.
+    Returns the directory to use as XDG_CONFIG_HOME.
+    """
+    config_dir = os.path.join(root, 'riptide')
+    os.makedirs(config_dir, exist_ok=True)
+    with open(os.path.join(config_dir, 'config.yml'), 'w') as file:
+        yaml.safe_dump({
+            'riptide': {
+                'proxy': {'url': 'riptide.local', 'ports': {'http': 80, 'https': 443}, 'autostart': True},
+                'engine': 'fake',
+                'repos': [],
+                'update_hosts_file': False,
+                'performance': {'dont_sync_named_volumes_with_host': False, 'dont_sync_unimportant_src': False},
+            }
+        }, file)
+    registry = {}
+    for index in range(projects):
+        registry[project_name(index)] = generate_project(
+            os.path.join(root, 'projects', project_name(index)), index, services
+        )
+    with open(os.path.join(config_dir, 'projects.json'), 'w') as file:
+        json.dump(registry, file)
+    return root
+
+
+@click.command()
+@click.argument('directory', type=click.Path(file_okay=False))
+@click.option('--projects', default=10, help="Number of projects. Default: 10")
+@click.option('--services', default=5, help="Number of services per project. Default: 5")
+def main(directory, projects, services):
+    generate(directory, projects, services)
+    click.echo(f"Generated {projects} projects with {services} services each. "
+               f"Use XDG_CONFIG_HOME={os.path.abspath(directory)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Startup time benchmark.
+
+Measures the cumulative import time (python -X importtime) of the entry points of the CLI and the server
+and fails if any of them exceeds its budget. Each measurement runs in a fresh interpreter and the
+fastest of several runs is used, to reduce noise.
+
+Usage: python benchmarks/startup.py [--runs N] [--budget NAME=MILLISECONDS ...] [--top N]
+"""
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+import click
+
+# Name -> (statement to time, budget in milliseconds)
+SCENARIOS: Dict[str, Tuple[str, float]] = {
+    # riptide_mc --help / --version and the privilege drop only need the CLI module
+    'cli': ("import riptide_mission_control.main", 75),
+    # Everything needed to serve requests: graphene, Rx, riptide and the generated GraphQL schema
+    'server': ("import riptide_mission_control.server.starter", 1000),
+}
+
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)$')
+
+
+def measure(statement: str) -> List[Tuple[str, int, int]]:
+    """
+    Runs statement in a new interpreter with -X importtime.
+    Returns (module, self time, cumulative time) in microseconds for every imported module.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True, check=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            modules.append((match.group(3), int(match.group(1)), int(match.group(2))))
+    return modules
+
+
+def total_time(modules: List[Tuple[str, int, int]]) -> int:
+    """Total import time in microseconds: The sum of the self times of all imported modules."""
+    return sum(self_time for _, self_time, _ in modules)
+
+
+@click.command()
+@click.option('--runs', default=5, help="Number of runs per scenario. The fastest is used. Default: 5")
+@click.option('--budget', multiple=True, help="Override a budget, as NAME=MILLISECONDS.")
+@click.option('--top', default=10, help="Number of slowest modules to print per scenario. Default: 10")
+def main(runs, budget, top):
+    budgets = {name: ms for name, (_, ms) in SCENARIOS.items()}
+    for entry in budget:
+        name, ms = entry.split('=', 1)
+        if name not in budgets:
+            raise click.BadParameter(f"Unknown scenario {name}.", param_hint='--budget')
+        budgets[name] = float(ms)
+
+    failed = False
+    for name, (statement, _) in SCENARIOS.items():
+        best = min((measure(statement) for _ in range(runs)), key=total_time)
+        ms = total_time(best) / 1000
+        ok = ms <= budgets[name]
+        failed = failed or not ok
+        click.echo(f"{name}: {ms:.1f}ms (budget {budgets[name]:.0f}ms) {'OK' if ok else 'OVER BUDGET'}")
+        for module, self_time, cumulative in sorted(best, key=lambda m: m[1], reverse=True)[:top]:
+            click.echo(f"    {self_time / 1000:8.1f}ms self {cumulative / 1000:8.1f}ms cumulative  {module}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+"""
+Benchmark suite for the key paths of the server, on synthetic project trees of increasing size.
+
+For every number of projects, a project tree is generated (see benchmarks/projects.py) and measured in a
+fresh interpreter, using the fake engine without latency:
+
+- load_all_projects:          Loading all projects with empty caches
+- all_projects_query:         allProjects query for the full project tree, including the status of all services
+- project_query:              project(name) query for the full tree of a single project
+- schema_generation:          Generating the GraphQL types of the Riptide documents in converter
+- schema_generation_uncached: The same, without the schema docstring cache
+- subscription_progress:      Progress steps of projectStart and projectStop for all projects per second
+
+The results are written as JSON, with the minimum, median and mean duration of all runs per scenario.
+The suite fails if the static cost of one of its queries exceeds the default maximum query cost of the
+server, since the server would reject it.
+
+Usage: python benchmarks/suite.py [--projects 1,10,100,500] [--services M] [--runs N] [--output FILE]
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import click
+
+from projects import generate, project_name
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ALL_PROJECTS_QUERY = """
+query AllProjects {
+  allProjects {
+    errors { name error }
+    projects {
+      path isSetup dbAvailable dbCurrent
+      config { name src app { config { name
+        services { key value { running www containerName
+          additionalPorts { key hostBound }
+          logFiles { key path }
+          config { image roles port environment { key value }
+            logging { stdout stderr paths { key value } }
+            additionalPorts { key value { title container hostStart } }
+            driver { name config } } } }
+        commands { key value { config {
+          ... on NormalCommandConfiguration { image command }
+          ... on AliasCommandConfiguration { aliases } } } } } } }
+    }
+  }
+}
+"""
+
+PROJECT_QUERY = """
+query Project($name: String!) {
+  project(name: $name) {
+    path isSetup dbAvailable dbCurrent
+    config { name src app { config { name
+      services { key value { running www containerName
+        additionalPorts { key hostBound }
+        logFiles { key path }
+        config { image roles port environment { key value }
+          logging { stdout stderr paths { key value } }
+          additionalPorts { key value { title container hostStart } }
+          driver { name config } } } }
+      commands { key value { config {
+        ... on NormalCommandConfiguration { image command }
+        ... on AliasCommandConfiguration { aliases } } } } } } }
+  }
+}
+"""
+
+
+def timings(func: Callable[[], None], runs: int, setup: Callable[[], None] = lambda: None) -> Dict[str, object]:
+    """Runs func runs times, calling setup before each run (untimed). Returns durations in milliseconds."""
+    durations = []
+    for _ in range(runs):
+        setup()
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return {
+        'min_ms': min(durations),
+        'median_ms': statistics.median(durations),
+        'mean_ms': statistics.mean(durations),
+        'runs_ms': durations,
+    }
+
+
+def measure_tree(projects: int, runs: int) -> Dict[str, dict]:
+    """
+    Measures all scenarios against the project tree in XDG_CONFIG_HOME.
+    Must run in a fresh interpreter, since the caches of the server are process-wide.
+    """
+    import graphene
+    from riptide.config.document.config import Config
+    from riptide.config.files import riptide_main_config_file
+    from riptide_mission_control.document_cache import document_cache
+    from riptide_mission_control.engines.fake import FakeEngine
+    from riptide_mission_control.engines.instrumented import InstrumentedEngine
+    from riptide_mission_control.registry import registry
+
+    system_config = Config.from_yaml(riptide_main_config_file())
+    system_config.validate()
+    registry().system_config = system_config
+    registry().engine = InstrumentedEngine(FakeEngine())
+
+    from riptide_mission_control.graphql_entities.query import Query
+    from riptide_mission_control.graphql_entities.mutation import Mutation
+    from riptide_mission_control.graphql_entities.subscription import Subscription
+    from riptide_mission_control.graphql_entities.subscriptions.start_stop import project_start_impl, \
+        project_stop_impl
+    from riptide_mission_control.project_loader import flush_caches, load_all_projects
+    from riptide_mission_control.request_context import RequestContext
+    from riptide_mission_control.status_cache import status_cache
+
+    schema = graphene.Schema(query=Query, mutation=Mutation, subscription=Subscription)
+    check_query_costs(schema)
+
+    def execute(query: str, variables: dict = None):
+        result = schema.execute(query, variables=variables, context_value=RequestContext(), backend=document_cache)
+        if result.errors:
+            raise RuntimeError(f"Query failed: {result.errors}")
+
+    results = {'load_all_projects': timings(load_all_projects, runs, setup=flush_caches)}
+
+    load_all_projects()
+    results['all_projects_query'] = timings(lambda: execute(ALL_PROJECTS_QUERY), runs, setup=status_cache.invalidate)
+    results['project_query'] = timings(
+        lambda: execute(PROJECT_QUERY, {'name': project_name(projects // 2)}), runs, setup=status_cache.invalidate
+    )
+
+    results['schema_generation'] = timings(_generate_schema_types, runs)
+    from riptide_mission_control.schema_doc_cache import NO_CACHE_ENV
+    os.environ[NO_CACHE_ENV] = '1'
+    try:
+        results['schema_generation_uncached'] = timings(_generate_schema_types, runs)
+    finally:
+        del os.environ[NO_CACHE_ENV]
+
+    from rx.subjects import ReplaySubject
+    steps = []
+
+    def start_stop_all():
+        for impl in (project_start_impl, project_stop_impl):
+            for index in range(projects):
+                subject = ReplaySubject()
+                subject.subscribe(steps.append)
+                impl(subject, project_name(index), [])
+
+    results['subscription_progress'] = timings(start_stop_all, runs, setup=steps.clear)
+    # steps only holds the steps of the last run
+    results['subscription_progress']['steps'] = len(steps)
+    results['subscription_progress']['steps_per_second'] = \
+        len(steps) / (results['subscription_progress']['runs_ms'][-1] / 1000)
+    return results
+
+
+def check_query_costs(schema):
+    """Raises a RuntimeError, if the static cost of a query of the suite exceeds the default maximum query cost."""
+    from graphql import parse
+    from riptide_mission_control.query_cost import QueryCostAnalysis
+
+    # The defaults, regardless of the settings of this process
+    analysis = QueryCostAnalysis()
+    for name, query in (('all_projects_query', ALL_PROJECTS_QUERY), ('project_query', PROJECT_QUERY)):
+        query_cost = analysis.analyse(schema, parse(query), None, None)
+        if analysis.max_cost and query_cost.cost > analysis.max_cost:
+            raise RuntimeError(f"The query of {name} costs {query_cost.cost}, which exceeds the default maximum "
+                               f"query cost of {analysis.max_cost}.")
+        if analysis.max_depth and query_cost.depth > analysis.max_depth:
+            raise RuntimeError(f"The query of {name} has a depth of {query_cost.depth}, which exceeds the default "
+                               f"maximum query depth of {analysis.max_depth}.")
+
+
+def _generate_schema_types():
+    """Generates the GraphQL types of all Riptide documents again, like on server start."""
+    import importlib
+    from riptide_mission_control.graphql_entities.document import app, command, config, converter, project, service
+    converter._already_generated_types.clear()
+    converter._generate_entry_already_generated.clear()
+    converter._structurally_generated_types.clear()
+    for module in (app, command, project, service):
+        importlib.reload(module)
+    config.create_config_document()
+
+
+def run_worker(root: str, projects: int, runs: int) -> Dict[str, dict]:
+    """Measures the project tree in root in a fresh interpreter."""
+    with tempfile.NamedTemporaryFile('r', suffix='.json') as output:
+        env = dict(os.environ, XDG_CONFIG_HOME=root)
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [REPOSITORY_ROOT, env.get('PYTHONPATH')]))
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', output.name,
+             '--projects', str(projects), '--runs', str(runs)],
+            env=env, stdout=subprocess.DEVNULL, check=True
+        )
+        return json.load(output)
+
+
+def _parse_counts(value: str) -> List[int]:
+    try:
+        return [int(count) for count in value.split(',')]
+    except ValueError:
+        raise click.BadParameter("Must be a comma-separated list of numbers.", param_hint='--projects')
+
+
+@click.command()
+@click.option('--projects', default='1,10,50,100,250,500',
+              help="Comma-separated numbers of projects to measure. Default: 1,10,50,100,250,500")
+@click.option('--services', default=5, help="Number of services per project. Default: 5")
+@click.option('--runs', default=5, help="Number of runs per scenario. Default: 5")
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), default='benchmark-results.json',
+              help="File to write the results to. Default: benchmark-results.json")
+@click.option('--worker', type=click.Path(dir_okay=False), default=None, hidden=True)
+def main(projects, services, runs, output, worker):
+    if worker:
+        # Measure a single project tree, see run_worker
+        results = measure_tree(int(projects), runs)
+        with open(worker, 'w') as file:
+            json.dump(results, file)
+        return
+
+    results = []
+    for count in _parse_counts(projects):
+        with tempfile.TemporaryDirectory(prefix='riptide-mc-benchmark-') as root:
+            generate(root, count, services)
+            scenarios = run_worker(root, count, runs)
+        results.append({'projects': count, 'services': services, 'scenarios': scenarios})
+        click.echo(f"{count} projects:")
+        for name, result in scenarios.items():
+            click.echo(f"    {name:28} {result['median_ms']:10.1f}ms median {result['min_ms']:10.1f}ms min")
+
+    with open(output, 'w') as file:
+        json.dump({
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'runs': runs,
+            'results': results,
+        }, file, indent=2)
+    click.echo(f"Results written to {output}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,3 +3,43 @@ LOGGER_NAME = 'riptide_mission_control'
 # Server default settings
 PORT = 8484
 PROJECT_CACHE_TIMEOUT = 120
+# Number of slowest resolvers to include in slow operation log entries
+SLOW_LOG_TOP_RESOLVERS = 5
+# Maximum number of slow operation log entries per minute
+SLOW_LOG_MAX_PER_MINUTE = 6
+# Maximum number of distinct operation names used as metric labels. Further operations are labeled 'other'.
+METRICS_MAX_OPERATION_LABELS = 100
+# Time in ms the IOLoop has to be blocked, before the stall detector reports it
+STALL_THRESHOLD = 250
+# Time in seconds the status of the containers of a project is cached
+STATUS_CACHE_TIMEOUT = 5
+# Maximum number of parsed and validated query documents to cache
+QUERY_DOCUMENT_CACHE_SIZE = 500
+# Maximum static cost of a GraphQL operation, see query_cost.py. 0 disables the limit.
+# The allProjects query of the dashboard, with the status, ports and log files of all services, costs about 5300.
+QUERY_MAX_COST = 10000
+# Maximum depth of the selections of a GraphQL operation. 0 disables the limit.
+QUERY_MAX_DEPTH = 15
+# Assumed number of entries of lists in the cost analysis, eg. projects and services, if they are not limited
+# with a first argument
+QUERY_COST_LIST_SIZE = 10
+# Assumed number of entries of lists, that usually only have a few, eg. the environment of a service.
+# See DEFAULT_SHORT_LISTS in query_cost.py.
+QUERY_COST_SHORT_LIST_SIZE = 2
+# Cost of GraphQL operations each client may spend per minute. 0 disables throttling.
+QUERY_COST_BUDGET = 0
+# Number of heavy operations (updateImages, projectDbCopy, updateRepositories) of one kind running at once.
+# Further operations are queued. 0 disables the limit.
+HEAVY_OPERATION_CONCURRENCY = 2
+# Number of heavy operations of one kind a single client may run at once. 0 disables the limit.
+HEAVY_OPERATION_CLIENT_CONCURRENCY = 1
+# Number of heavy operations of one kind a single client may start per minute. 0 disables the limit.
+HEAVY_OPERATION_RATE = 0
+# Number of containers started or stopped at once, by all subscriptions together. 0 disables the limit.
+CONTAINER_ACTION_CONCURRENCY = 8
+# Number of projects started or stopped at the same time by projectsStart and projectsStop, if not given
+PROJECTS_START_STOP_CONCURRENCY = 4
+# Maximum number of images pulled at the same time by a single updateImages operation
+IMAGE_PULL_MAX_PARALLELISM = 8
+# Minimum time in seconds between two progress updates of updateImages with parallelism
+IMAGE_PULL_PROGRESS_INTERVAL = 0.5
@@ -0,0 +1,90 @@
+"""Statistics, flushing and warming of all caches of the server"""
+import asyncio
+import logging
+from typing import List, Optional
+
+from riptide_mission_control import LOGGER_NAME
+from riptide_mission_control.document_cache import document_cache
+from riptide_mission_control.executor import run_in_executor
+from riptide_mission_control.project_loader import flush_projects, flush_project_registry, warm_projects, \
+    project_cache_statistic, project_registry_statistic, get_project_list
+from riptide_mission_control.status_cache import status_cache
+
+logger = logging.getLogger(LOGGER_NAME)
+
+SCOPE_ALL = 'all'
+SCOPE_PROJECTS = 'projects'
+SCOPE_PROJECT_REGISTRY = 'project_registry'
+SCOPE_STATUS = 'status'
+SCOPE_QUERY_DOCUMENTS = 'query_documents'
+
+# Scopes that can be limited to a single project
+PROJECT_SCOPES = (SCOPE_ALL, SCOPE_PROJECTS, SCOPE_STATUS)
+
+
+def all_cache_statistics() -> List[dict]:
+    return [
+        project_cache_statistic(),
+        project_registry_statistic(),
+        status_cache.statistic(),
+        document_cache.statistic()
+    ]
+
+
+def flush(scope: str = SCOPE_ALL, project_name: Optional[str] = None):
+    """
+    Flushes the caches of the given scope. If a project name is given, only the entries of this project
+    are flushed from the project and status caches.
+    """
+    if project_name is not None and scope not in PROJECT_SCOPES:
+        raise ValueError(f"Flushing cache {scope} for a single project is not supported.")
+    if scope in (SCOPE_ALL, SCOPE_PROJECT_REGISTRY) and project_name is None:
+        flush_project_registry()
+    if scope in (SCOPE_ALL, SCOPE_PROJECTS):
+        flush_projects(project_name)
+    if scope in (SCOPE_ALL, SCOPE_STATUS):
+        status_cache.invalidate(project_name)
+    if scope in (SCOPE_ALL, SCOPE_QUERY_DOCUMENTS) and project_name is None:
+        document_cache.flush()
+
+
+class CacheWarmer:
+    """Loads the project registry, projects and their status into the caches, in parallel in the executor."""
+    def __init__(self):
+        self.running = False
+
+    def start(self, project_names: Optional[List[str]] = None) -> Optional[asyncio.Future]:
+        """
+        Starts warming the caches. Must be called from the IOLoop thread.
+        Returns a future that is done when the caches are warm, or None if they are already being warmed.
+        """
+        if self.running:
+            return None
+        self.running = True
+        future = asyncio.ensure_future(self._warm(project_names))
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: asyncio.Future):
+        self.running = False
+        if future.exception() is not None:
+            logger.error(f"Warming cache failed: {future.exception()}")
+
+    async def _warm(self, project_names: Optional[List[str]]):
+        if project_names is None:
+            project_names = sorted((await run_in_executor(get_project_list)).keys())
+        await asyncio.gather(*(run_in_executor(self._warm_project, name) for name in project_names))
+
+    @staticmethod
+    def _warm_project(project_name: str):
+        projects, errors = warm_projects([project_name])
+        for error in errors:
+            logger.warning(f"Warming cache: {error['error']}")
+        for project in projects:
+            try:
+                status_cache.status(project)
+            except Exception as ex:
+                logger.warning(f"Warming cache: Could not get status of project {project_name}. {ex}")
+
+
+cache_warmer = CacheWarmer()
@@ -0,0 +1,130 @@
+"""
+Process-wide limit on how many containers are started or stopped at once.
+
+The subscriptions starting and stopping services run in their own event loops in the executor, so waiting for
+a free slot is coordinated across threads: each waiting service gets a future on its own event loop, which
+is resolved by the thread releasing a slot.
+"""
+import asyncio
+from collections import deque
+from threading import Lock
+from typing import Callable, Deque, Optional
+
+from riptide_mission_control import CONTAINER_ACTION_CONCURRENCY
+from riptide_mission_control.metrics import Gauge
+
+
+class _Waiter:
+    __slots__ = ('loop', 'future', 'count', 'on_queued')
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, count: int, on_queued: Optional[Callable[[int], None]]):
+        self.loop = loop
+        self.future = loop.create_future()
+        self.count = count
+        self.on_queued = on_queued
+
+
+class ContainerActionLimiter:
+    """
+    Limits the number of container start and stop actions running at once. Slots are handed out in order.
+    A limit of 0 disables the limit.
+
+    An engine call for several services takes one slot per service, but at most limit slots, and waits until
+    all of them are free.
+
+    on_queued callbacks are called with the position in the queue (starting at 1) when an action has to wait
+    and whenever its position changes. They are called in the event loop of the waiting action.
+    """
+    def __init__(self, limit: int = CONTAINER_ACTION_CONCURRENCY):
+        self.limit = limit
+        self.running = 0
+        self._waiters: Deque[_Waiter] = deque()
+        self._lock = Lock()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, count: int = 1, on_queued: Callable[[int], None] = None) -> int:
+        """Waits for count free slots. Returns the number of slots taken, which must be passed to release."""
+        with self._lock:
+            if self.limit:
+                count = min(count, self.limit)
+            if not self.limit or (self.running + count <= self.limit and not self._waiters):
+                self.running += count
+                return count
+            waiter = _Waiter(asyncio.get_event_loop(), count, on_queued)
+            self._waiters.append(waiter)
+            position = len(self._waiters)
+        if on_queued:
+            on_queued(position)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                # Otherwise the slots were already handed over and are released by _wake
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+            raise
+        return count
+
+    def release(self, count: int = 1):
+        with self._lock:
+            self.running -= count
+            woken = []
+            # The freed slots are handed over to the waiters in order, as long as they fit
+            while self._waiters and (not self.limit or self.running + self._waiters[0].count <= self.limit):
+                waiter = self._waiters.popleft()
+                self.running += waiter.count
+                woken.append(waiter)
+            moved = list(self._waiters) if woken else []
+        for waiter in woken:
+            waiter.loop.call_soon_threadsafe(self._wake, waiter)
+        for position, other in enumerate(moved, start=1):
+            if other.on_queued:
+                other.loop.call_soon_threadsafe(other.on_queued, position)
+
+    def _wake(self, waiter: _Waiter):
+        if waiter.future.done():
+            # The waiting action was cancelled in the meantime
+            self.release(waiter.count)
+        else:
+            waiter.future.set_result(None)
+
+    def slot(self, count: int = 1, on_queued: Callable[[int], None] = None) -> '_Slot':
+        """
+        Returns an asynchronous context manager, that holds count slots for its duration:
+
+            async with container_actions.slot(len(services)):
+                async for _ in engine.start_project(project, services):
+                    ...
+        """
+        return _Slot(self, count, on_queued)
+
+
+class _Slot:
+    def __init__(self, limiter: ContainerActionLimiter, count: int, on_queued: Optional[Callable[[int], None]]):
+        self._limiter = limiter
+        self._count = count
+        self._on_queued = on_queued
+        self._taken = 0
+
+    async def __aenter__(self):
+        self._taken = await self._limiter.acquire(self._count, self._on_queued)
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._limiter.release(self._taken)
+
+
+container_actions = ContainerActionLimiter()
+
+CONTAINER_ACTIONS_QUEUED = Gauge(
+    'riptide_mc_container_actions_queued',
+    'Number of container start and stop actions waiting for a free slot.',
+    lambda: container_actions.queued
+)
+CONTAINER_ACTIONS_RUNNING = Gauge(
+    'riptide_mc_container_actions_running',
+    'Number of container start and stop actions currently running.',
+    lambda: container_actions.running
+)
@@ -0,0 +1,84 @@
+"""Cache of parsed and validated GraphQL query documents"""
+import time
+from collections import OrderedDict
+from functools import partial
+from threading import Lock
+from typing import Tuple
+
+from graphql import parse, validate
+from graphql.backend.base import GraphQLBackend, GraphQLDocument
+from graphql.execution import execute, ExecutionResult
+
+from riptide_mission_control import QUERY_DOCUMENT_CACHE_SIZE
+from riptide_mission_control.memory import cache_registry
+from riptide_mission_control.metrics import CACHE_HITS, CACHE_MISSES, CACHE_EVICTIONS, cache_statistic
+
+_CACHE_NAME = 'query_documents'
+
+
+def _execute_validated(schema, document_ast, validation_errors, *args, **kwargs):
+    if validation_errors:
+        return ExecutionResult(errors=validation_errors, invalid=True)
+    return execute(schema, document_ast, *args, **kwargs)
+
+
+class DocumentCache(GraphQLBackend):
+    """
+    GraphQL backend, that parses and validates each query string only once.
+
+    The most recently used QUERY_DOCUMENT_CACHE_SIZE documents are kept. Documents that can not be parsed
+    are not cached.
+    """
+    def __init__(self, max_size: int = QUERY_DOCUMENT_CACHE_SIZE):
+        self.max_size = max_size
+        # (schema, query string) -> (time cached, document)
+        self._documents: 'OrderedDict[Tuple[object, str], Tuple[float, GraphQLDocument]]' = OrderedDict()
+        self._lock = Lock()
+
+    def document_from_string(self, schema, document_string) -> GraphQLDocument:
+        # Surrounding whitespace does not change the document
+        key = (schema, document_string.strip() if isinstance(document_string, str) else document_string)
+        with self._lock:
+            if key in self._documents:
+                self._documents.move_to_end(key)
+                CACHE_HITS.inc(cache=_CACHE_NAME)
+                return self._documents[key][1]
+        CACHE_MISSES.inc(cache=_CACHE_NAME)
+
+        document_ast = parse(document_string)
+        document = GraphQLDocument(
+            schema=schema,
+            document_string=document_string,
+            document_ast=document_ast,
+            execute=partial(_execute_validated, schema, document_ast, validate(schema, document_ast))
+        )
+        with self._lock:
+            self._documents[key] = (time.time(), document)
+            while len(self._documents) > self.max_size:
+                self._documents.popitem(last=False)
+                CACHE_EVICTIONS.inc(cache=_CACHE_NAME)
+        return document
+
+    def flush(self):
+        with self._lock:
+            CACHE_EVICTIONS.inc(len(self._documents), cache=_CACHE_NAME)
+            self._documents = OrderedDict()
+
+    def statistic(self) -> dict:
+        entries = list(self._documents.values())
+        return cache_statistic(
+            _CACHE_NAME,
+            len(entries),
+            min((cached for cached, _ in entries), default=None),
+            CACHE_HITS.get(cache=_CACHE_NAME),
+            CACHE_MISSES.get(cache=_CACHE_NAME),
+            CACHE_EVICTIONS.get(cache=_CACHE_NAME)
+        )
+
+    def memory_usage(self):
+        """Returns the number of documents and the cached documents."""
+        return len(self._documents), [document.document_ast for _, document in self._documents.values()]
+
+
+document_cache = DocumentCache()
+cache_registry.register('query_documents', document_cache.memory_usage)
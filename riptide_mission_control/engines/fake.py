@@ -0,0 +1,246 @@
+"""
+In-memory engine, that simulates containers without running them.
+
+Used for benchmarks and load tests, which should not depend on a real container engine. The latency,
+jitter and failure rate of the simulated calls can be configured per method.
+"""
+import random
+import threading
+import time
+import zlib
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple, Union
+
+from riptide.engine.abstract import AbstractEngine, ExecError
+from riptide.engine.results import MultiResultQueue, ResultQueue, ResultError, StartStopResultStep
+
+# Methods of the engine, for which latency, jitter and failure rate can be configured
+FAKE_ENGINE_METHODS = ('service_status', 'start_project', 'stop_project', 'pull_images', 'pull_image',
+                       'container_name_for')
+
+# Number of progress steps reported for each started or stopped service
+FAKE_START_STOP_STEPS = 3
+
+# Maximum number of layers of a simulated image, and number of progress events reported per layer download
+FAKE_IMAGE_LAYERS = 4
+FAKE_IMAGE_LAYER_CHUNKS = 4
+
+
+class FakeEngineError(Exception):
+    """Raised by the fake engine for simulated failures."""
+
+
+class FakeCallBehaviour(NamedTuple):
+    """
+    Behaviour of a simulated engine call.
+    latency and jitter are in seconds, the actual duration is uniformly distributed in latency +- jitter.
+    failure_rate is the probability of a call failing, between 0 and 1.
+    """
+    latency: float = 0.0
+    jitter: float = 0.0
+    failure_rate: float = 0.0
+
+
+class FakeEngine(AbstractEngine):
+    """
+    Engine, that keeps the state of all containers in memory.
+
+    start_project and stop_project report FAKE_START_STOP_STEPS steps per service, from one thread per service,
+    like a real engine would. For these the latency applies to each service, other calls are delayed in the
+    calling thread. Failed start/stop calls end the queue of a service with an error, all other failed calls
+    raise FakeEngineError.
+
+    pull_image reports Docker pull progress events for up to FAKE_IMAGE_LAYERS layers, see image_pull.
+    The layers and their sizes are derived from the image name.
+    """
+    def __init__(self,
+                 default: FakeCallBehaviour = FakeCallBehaviour(),
+                 behaviours: Optional[Dict[str, FakeCallBehaviour]] = None,
+                 seed: Optional[int] = None):
+        self.default = default
+        self.behaviours = behaviours or {}
+        self._random = random.Random(seed)
+        # (project name, service name) of all running services
+        self._running: Set[Tuple[str, str]] = set()
+        self._volumes: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def behaviour(self, method: str) -> FakeCallBehaviour:
+        return self.behaviours.get(method, self.default)
+
+    def _simulate(self, method: str) -> bool:
+        """Sleeps for the latency of method and returns whether the call failed."""
+        behaviour = self.behaviour(method)
+        with self._lock:
+            delay = behaviour.latency + self._random.uniform(-behaviour.jitter, behaviour.jitter)
+            failed = self._random.random() < behaviour.failure_rate
+        if delay > 0:
+            time.sleep(delay)
+        return failed
+
+    def _simulate_or_raise(self, method: str):
+        if self._simulate(method):
+            raise FakeEngineError(f"Simulated failure of {method}.")
+
+    def start_project(self, project: 'Project', services: List[str], quick=False) -> MultiResultQueue[StartStopResultStep]:
+        return self._start_stop(project, services, 'start_project', True)
+
+    def stop_project(self, project: 'Project', services: List[str]) -> MultiResultQueue[StartStopResultStep]:
+        return self._start_stop(project, services, 'stop_project', False)
+
+    def _start_stop(self, project: 'Project', services: List[str], method: str, start: bool):
+        queues = {}
+        for service_name in services:
+            queue = ResultQueue()
+            queues[queue] = service_name
+            threading.Thread(
+                target=self._start_stop_service, args=(queue, project['name'], service_name, method, start),
+                name=f'fake-engine-{method}-{service_name}', daemon=True
+            ).start()
+        return MultiResultQueue(queues)
+
+    def _start_stop_service(self, queue: ResultQueue, project_name: str, service_name: str, method: str, start: bool):
+        verb = 'Starting' if start else 'Stopping'
+        behaviour = self.behaviour(method)
+        try:
+            for step in range(1, FAKE_START_STOP_STEPS + 1):
+                queue.put(StartStopResultStep(steps=FAKE_START_STOP_STEPS, current_step=step,
+                                              text=f'{verb} service... ({step}/{FAKE_START_STOP_STEPS})'))
+                if step == FAKE_START_STOP_STEPS:
+                    break
+                # The latency is spread over the steps
+                if self._simulate_step(behaviour):
+                    queue.end_with_error(ResultError(f"Simulated failure of {method}."))
+                    return
+            with self._lock:
+                if start:
+                    self._running.add((project_name, service_name))
+                else:
+                    self._running.discard((project_name, service_name))
+            queue.end()
+        except Exception as ex:
+            queue.end_with_error(ResultError(f"Error in {method}.", cause=ex))
+
+    def _simulate_step(self, behaviour: FakeCallBehaviour) -> bool:
+        steps = FAKE_START_STOP_STEPS - 1
+        with self._lock:
+            delay = (behaviour.latency + self._random.uniform(-behaviour.jitter, behaviour.jitter)) / steps
+            # Probability per step, so that the probability of the whole service failing is failure_rate
+            failed = self._random.random() < 1 - (1 - behaviour.failure_rate) ** (1 / steps)
+        if delay > 0:
+            time.sleep(delay)
+        return failed
+
+    def status(self, project: 'Project', *args) -> Dict[str, bool]:
+        return {name: self.service_status(project, name) for name in project['app']['services'].keys()}
+
+    def service_status(self, project: 'Project', service_name: str, *args) -> bool:
+        self._simulate_or_raise('service_status')
+        with self._lock:
+            return (project['name'], service_name) in self._running
+
+    def container_name_for(self, project: 'Project', service_name: str) -> str:
+        self._simulate_or_raise('container_name_for')
+        return f"riptide__{project['name']}__{service_name}"
+
+    def address_for(self, project: 'Project', service_name: str) -> Union[None, Tuple[str, int]]:
+        return None
+
+    def pull_images(self, project: 'Project', line_reset='\n', update_func=lambda msg: None) -> None:
+        images = [(f'service/{name}', service['image']) for name, service in project['app']['services'].items()]
+        if 'commands' in project['app']:
+            images += [(f'command/{name}', command['image'])
+                       for name, command in project['app']['commands'].items() if 'image' in command]
+        for name, image in images:
+            update_func(f"[{name}] Pulling '{image}':\n")
+            self._simulate_or_raise('pull_images')
+            update_func(line_reset + "    Done!\n")
+        update_func("Done.\n\n")
+
+    def pull_image(self, image: str, update_func=lambda event: None) -> None:
+        checksum = zlib.crc32(image.encode())
+        layers = [(f'{checksum:08x}{index}', (checksum >> index) % 50_000_000 + 1_000_000)
+                  for index in range(checksum % FAKE_IMAGE_LAYERS + 1)]
+        behaviour = self.behaviour('pull_image')
+        with self._lock:
+            delay = behaviour.latency + self._random.uniform(-behaviour.jitter, behaviour.jitter)
+            failed = self._random.random() < behaviour.failure_rate
+        update_func({'status': f"Pulling from {image.split(':')[0]}", 'id': 'latest'})
+        for layer_id, _ in layers:
+            update_func({'status': 'Pulling fs layer', 'id': layer_id})
+        for layer_id, size in layers:
+            for chunk in range(1, FAKE_IMAGE_LAYER_CHUNKS + 1):
+                if delay > 0:
+                    time.sleep(delay / len(layers) / FAKE_IMAGE_LAYER_CHUNKS)
+                if failed:
+                    raise FakeEngineError("Simulated failure of pull_image.")
+                update_func({'status': 'Downloading', 'id': layer_id,
+                             'progressDetail': {'current': size * chunk // FAKE_IMAGE_LAYER_CHUNKS, 'total': size}})
+            update_func({'status': 'Download complete', 'id': layer_id})
+            update_func({'status': 'Pull complete', 'id': layer_id})
+        update_func({'status': f"Status: Downloaded newer image for {image}"})
+
+    def cmd(self, project: 'Project', command_name: str, arguments: List[str]) -> int:
+        raise ExecError("The fake engine can not run commands.")
+
+    def cmd_in_service(self, project: 'Project', command_name: str, service_name: str, arguments: List[str]) -> int:
+        raise ExecError("The fake engine can not run commands.")
+
+    def service_fg(self, project: 'Project', service_name: str, arguments: List[str]) -> None:
+        raise ExecError("The fake engine can not run services in the foreground.")
+
+    def cmd_detached(self, project: 'Project', command: 'Command', run_as_root=False) -> (int, str):
+        return 0, ''
+
+    def exec(self, project: 'Project', service_name: str, cols=None, lines=None, root=False) -> None:
+        raise ExecError("The fake engine can not run commands.")
+
+    def exec_custom(self, project: 'Project', service_name: str, command: str, cols=None, lines=None, root=False) -> None:
+        raise ExecError("The fake engine can not run commands.")
+
+    def performance_value_for_auto(self, key: str, platform: str) -> bool:
+        return False
+
+    def list_named_volumes(self) -> List[str]:
+        with self._lock:
+            return sorted(self._volumes)
+
+    def delete_named_volume(self, name: str) -> None:
+        with self._lock:
+            self._volumes.discard(name)
+
+    def exists_named_volume(self, name: str) -> bool:
+        with self._lock:
+            return name in self._volumes
+
+    def copy_named_volume(self, from_name: str, target_name: str) -> None:
+        with self._lock:
+            self._volumes.add(target_name)
+
+    def create_named_volume(self, name: str) -> None:
+        with self._lock:
+            self._volumes.add(name)
+
+
+def parse_behaviours(latencies: List[str], jitters: List[str], failure_rates: List[str]) \
+        -> Tuple[FakeCallBehaviour, Dict[str, FakeCallBehaviour]]:
+    """
+    Parses the fake engine command line options. Each value is either a number, which applies to all methods,
+    or METHOD=NUMBER. Latencies and jitters are in milliseconds.
+    Returns the default behaviour and the behaviours of the methods.
+    """
+    defaults = {}
+    per_method: Dict[str, dict] = {}
+    for field, values, factor in (('latency', latencies, 1 / 1000),
+                                  ('jitter', jitters, 1 / 1000),
+                                  ('failure_rate', failure_rates, 1)):
+        for value in values:
+            method, _, number = value.rpartition('=')
+            if method and method not in FAKE_ENGINE_METHODS:
+                raise ValueError(f"Unknown engine method {method}. Must be one of: {', '.join(FAKE_ENGINE_METHODS)}")
+            number = float(number) * factor
+            if method:
+                per_method.setdefault(method, {})[field] = number
+            else:
+                defaults[field] = number
+    default = FakeCallBehaviour(**defaults)
+    return default, {method: default._replace(**fields) for method, fields in per_method.items()}
@@ -0,0 +1,63 @@
+"""Engine wrapper that records call counts and durations of all engine calls as metrics."""
+import time
+from functools import wraps
+
+from riptide.engine.abstract import AbstractEngine
+from riptide_mission_control.metrics import ENGINE_CALLS, ENGINE_ERRORS, ENGINE_CALL_DURATION
+
+
+class _TimedAsyncIterator:
+    """Wraps the result queues returned by start_project and stop_project, to time them until they are exhausted."""
+    def __init__(self, wrapped, method: str, start: float):
+        self._wrapped = wrapped
+        self._iterator = None
+        self._method = method
+        self._start = start
+
+    def __aiter__(self):
+        self._iterator = self._wrapped.__aiter__()
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self._iterator.__anext__()
+        except StopAsyncIteration:
+            ENGINE_CALL_DURATION.observe(time.perf_counter() - self._start, method=self._method)
+            raise
+        except Exception:
+            ENGINE_ERRORS.inc(method=self._method)
+            ENGINE_CALL_DURATION.observe(time.perf_counter() - self._start, method=self._method)
+            raise
+
+    def __getattr__(self, item):
+        return getattr(self._wrapped, item)
+
+
+class InstrumentedEngine:
+    """
+    Proxy for an engine. All method calls are passed to the wrapped engine and counted and timed.
+    """
+    def __init__(self, engine: AbstractEngine):
+        self.engine = engine
+
+    def __getattr__(self, item):
+        attribute = getattr(self.engine, item)
+        if not callable(attribute):
+            return attribute
+
+        @wraps(attribute)
+        def timed(*args, **kwargs):
+            ENGINE_CALLS.inc(method=item)
+            start = time.perf_counter()
+            try:
+                result = attribute(*args, **kwargs)
+            except Exception:
+                ENGINE_ERRORS.inc(method=item)
+                ENGINE_CALL_DURATION.observe(time.perf_counter() - start, method=item)
+                raise
+            if hasattr(result, '__aiter__'):
+                return _TimedAsyncIterator(result, item, start)
+            ENGINE_CALL_DURATION.observe(time.perf_counter() - start, method=item)
+            return result
+
+        return timed
@@ -0,0 +1,302 @@
+"""
+Recording and replaying of engine calls.
+
+RecordingEngine writes every engine call to a trace file, with its arguments, result (or error), duration
+and - for start_project, stop_project, pull_images and pull_image - the progress it reported. ReplayEngine
+answers engine calls from such a trace, with the recorded timings scaled by a factor. This makes it possible
+to benchmark a session captured in production offline.
+
+Trace files contain one JSON object per line. They are gzip-compressed if their name ends in .gz.
+The first line is a header, every other line is a call:
+
+- m: Method name
+- a: Arguments. Riptide documents (eg. the project) are recorded by their name.
+- t: Start of the call in seconds since the start of the recording
+- d: Duration in seconds. For start_project and stop_project until the last result was read.
+- r: Result, if the call returned
+- e: Error message, if the call raised an exception
+- p: Progress as [offset in seconds, ...]. For start_project and stop_project the values are
+     service name, status and finished, where status is null, ["step", steps, current step, text] or
+     ["error", message, details]. For pull_images it is the message, for pull_image the progress event.
+"""
+import gzip
+import json
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
+
+from configcrunch import YamlConfigDocument
+from riptide.engine.results import MultiResultQueue, ResultQueue, ResultError, StartStopResultStep
+
+TRACE_VERSION = 1
+
+# Methods returning a MultiResultQueue of start/stop progress
+_START_STOP_METHODS = ('start_project', 'stop_project')
+# Methods reporting progress through a function, with the position of the function in the arguments
+_PROGRESS_ARGUMENTS = {'pull_images': 2, 'pull_image': 1}
+# Methods returning tuples, which are stored as lists in the trace
+_TUPLE_RESULTS = ('address_for', 'cmd_detached')
+
+
+def _open_trace(path: str, mode: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def _serialise(value):
+    """Converts arguments and results to JSON. Documents are replaced by their name, functions are left out."""
+    if isinstance(value, YamlConfigDocument):
+        if 'name' in value:
+            return value['name']
+        return value['$name'] if '$name' in value else None
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, dict):
+        return {str(key): _serialise(item) for key, item in value.items()}
+    if callable(value):
+        return None
+    try:
+        return [_serialise(item) for item in value]
+    except TypeError:
+        return repr(value)
+
+
+def _serialise_status(status) -> Optional[list]:
+    if isinstance(status, StartStopResultStep):
+        return ['step', status.steps, status.current_step, status.text]
+    if isinstance(status, ResultError):
+        return ['error', status.message, status.details]
+    return None
+
+
+def _deserialise_status(status: Optional[list]):
+    if status is None:
+        return None
+    if status[0] == 'step':
+        return StartStopResultStep(steps=status[1], current_step=status[2], text=status[3])
+    return ResultError(status[1], details=status[2])
+
+
+class TraceWriter:
+    """Writes calls to a trace file. Thread-safe. Every call is flushed, so that a killed server loses nothing."""
+    def __init__(self, path: str, engine_name: str):
+        self.start = time.perf_counter()
+        self._file = _open_trace(path, 'w')
+        self._lock = threading.Lock()
+        self._write({'trace': TRACE_VERSION, 'engine': engine_name, 'time': time.time()})
+
+    def _write(self, entry: dict):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+            self._file.flush()
+
+    def record(self, method: str, args: list, start: float, end: float, result=None, error: Exception = None,
+               progress: list = None):
+        entry = {'m': method, 'a': args, 't': round(start - self.start, 6), 'd': round(end - start, 6)}
+        if error is not None:
+            entry['e'] = f'{error.__class__.__name__}: {error}'
+        else:
+            entry['r'] = _serialise(result)
+        if progress is not None:
+            entry['p'] = progress
+        self._write(entry)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class _RecordedStartStop:
+    """Wraps the result queues returned by start_project and stop_project, to record their progress."""
+    def __init__(self, wrapped, writer: TraceWriter, method: str, args: list, start: float):
+        self._wrapped = wrapped
+        self._iterator = None
+        self._writer = writer
+        self._method = method
+        self._args = args
+        self._start = start
+        self._progress = []
+
+    def __aiter__(self):
+        self._iterator = self._wrapped.__aiter__()
+        return self
+
+    async def __anext__(self):
+        try:
+            service_name, status, finished = await self._iterator.__anext__()
+        except StopAsyncIteration:
+            self._writer.record(self._method, self._args, self._start, time.perf_counter(),
+                                progress=self._progress)
+            raise
+        except Exception as ex:
+            self._writer.record(self._method, self._args, self._start, time.perf_counter(), error=ex,
+                                progress=self._progress)
+            raise
+        self._progress.append([round(time.perf_counter() - self._start, 6), service_name,
+                               _serialise_status(status), finished])
+        return service_name, status, finished
+
+    def __getattr__(self, item):
+        return getattr(self._wrapped, item)
+
+
+class RecordingEngine:
+    """
+    Proxy for an engine. All method calls are passed to the wrapped engine and recorded to a trace file.
+    """
+    def __init__(self, engine, path: str):
+        self.engine = engine
+        self.writer = TraceWriter(path, engine.__class__.__name__)
+
+    def __getattr__(self, item):
+        attribute = getattr(self.engine, item)
+        if not callable(attribute):
+            return attribute
+
+        @wraps(attribute)
+        def recorded(*args, **kwargs):
+            serialised_args = _serialise(list(args) + list(kwargs.values()))
+            progress = None
+            if item in _PROGRESS_ARGUMENTS:
+                progress = []
+                position = _PROGRESS_ARGUMENTS[item]
+                update_func = kwargs.get('update_func', args[position] if len(args) > position else lambda msg: None)
+
+                def recording_update_func(msg):
+                    progress.append([round(time.perf_counter() - start, 6), msg])
+                    update_func(msg)
+
+                if len(args) > position:
+                    args = args[:position] + (recording_update_func,) + args[position + 1:]
+                else:
+                    kwargs['update_func'] = recording_update_func
+            start = time.perf_counter()
+            try:
+                result = attribute(*args, **kwargs)
+            except Exception as ex:
+                self.writer.record(item, serialised_args, start, time.perf_counter(), error=ex, progress=progress)
+                raise
+            if item in _START_STOP_METHODS:
+                return _RecordedStartStop(result, self.writer, item, serialised_args, start)
+            self.writer.record(item, serialised_args, start, time.perf_counter(), result=result, progress=progress)
+            return result
+
+        return recorded
+
+
+class ReplayError(Exception):
+    """Raised by the replay engine for calls that are not in the trace, and for recorded errors."""
+
+
+def read_trace(path: str) -> Tuple[dict, List[dict]]:
+    """Returns the header and the calls of a trace file."""
+    lines = []
+    with _open_trace(path, 'r') as file:
+        try:
+            for line in file:
+                if line.strip():
+                    lines.append(json.loads(line))
+        except EOFError:
+            # Compressed trace of a server, that was killed. Everything up to the last flush is readable.
+            pass
+    if not lines or lines[0].get('trace') != TRACE_VERSION:
+        raise ValueError(f"{path} is not an engine trace.")
+    return lines[0], lines[1:]
+
+
+class ReplayEngine:
+    """
+    Engine, that answers calls with the recorded results of a trace.
+
+    Calls are matched by method and arguments. Calls with the same method and arguments get the recorded
+    results in order. Once they are used up, the last one is repeated. Each call takes the recorded duration
+    multiplied by time_scale (0 to answer immediately), progress is reported at the scaled recorded offsets.
+    """
+    def __init__(self, path: str, time_scale: float = 1.0):
+        self.time_scale = time_scale
+        self.header, self.calls = read_trace(path)
+        self._calls: Dict[Tuple[str, str], List[dict]] = defaultdict(list)
+        for call in self.calls:
+            self._calls[(call['m'], json.dumps(call['a']))].append(call)
+        self._methods = {call['m'] for call in self.calls}
+        self._next: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def _call_for(self, method: str, args: list) -> dict:
+        key = (method, json.dumps(_serialise(args)))
+        with self._lock:
+            calls = self._calls.get(key)
+            if not calls:
+                raise ReplayError(f"No recorded call of {method} with arguments {key[1]}.")
+            index = min(self._next[key], len(calls) - 1)
+            self._next[key] += 1
+            return calls[index]
+
+    def _sleep_until(self, start: float, offset: float):
+        delay = start + offset * self.time_scale - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    def __getattr__(self, item):
+        # Methods the recorded engine was never asked for do not exist, so that callers checking for
+        # optional methods (eg. pull_image) fall back like they did while recording
+        if item.startswith('__') or item not in self.__dict__.get('_methods', ()):
+            raise AttributeError(f"{self.__class__.__name__} has no recorded calls of {item}.")
+
+        def replayed(*args, **kwargs):
+            call = self._call_for(item, list(args) + list(kwargs.values()))
+            if item in _START_STOP_METHODS and 'p' in call:
+                return self._replay_start_stop(call)
+            start = time.perf_counter()
+            if item in _PROGRESS_ARGUMENTS:
+                position = _PROGRESS_ARGUMENTS[item]
+                update_func = kwargs.get('update_func', args[position] if len(args) > position else lambda msg: None)
+                for offset, msg in call.get('p', []):
+                    self._sleep_until(start, offset)
+                    update_func(msg)
+            self._sleep_until(start, call['d'])
+            if 'e' in call:
+                raise ReplayError(call['e'])
+            result = call['r']
+            if item in _TUPLE_RESULTS and isinstance(result, list):
+                return tuple(result)
+            return result
+
+        replayed.__name__ = item
+        return replayed
+
+    def _replay_start_stop(self, call: dict) -> MultiResultQueue[StartStopResultStep]:
+        queues = {}
+        for service_name in dict.fromkeys(service_name for _, service_name, _, _ in call['p']):
+            queues[service_name] = ResultQueue()
+        threading.Thread(
+            target=self._feed_start_stop, args=(call, queues), name=f"replay-{call['m']}", daemon=True
+        ).start()
+        return MultiResultQueue({queue: service_name for service_name, queue in queues.items()})
+
+    def _feed_start_stop(self, call: dict, queues: Dict[str, ResultQueue]):
+        start = time.perf_counter()
+        ended = set()
+        for offset, service_name, status, finished in call['p']:
+            self._sleep_until(start, offset)
+            queue = queues[service_name]
+            if not finished:
+                queue.put(_deserialise_status(status))
+                continue
+            ended.add(service_name)
+            if status is not None:
+                queue.end_with_error(_deserialise_status(status))
+            else:
+                queue.end()
+        self._sleep_until(start, call['d'])
+        # The recording may have stopped early, eg. because of an error while reading the results
+        for service_name, queue in queues.items():
+            if service_name not in ended:
+                queue.end_with_error(ResultError(call.get('e', "Not recorded.")))
@@ -0,0 +1,46 @@
+"""Runs long running operations, such as the implementations of subscriptions, in the thread pool executor."""
+import asyncio
+from threading import Lock
+
+from riptide_mission_control.metrics import Gauge
+
+
+class ExecutorStatistics:
+    """Number of functions waiting for a free thread and number of functions currently running."""
+    def __init__(self):
+        self.queued = 0
+        self.running = 0
+        self._lock = Lock()
+
+    def update(self, queued: int, running: int):
+        with self._lock:
+            self.queued += queued
+            self.running += running
+
+
+executor_statistics = ExecutorStatistics()
+
+EXECUTOR_QUEUED = Gauge(
+    'riptide_mc_executor_queued',
+    'Number of operations waiting for a free thread in the executor.',
+    lambda: executor_statistics.queued
+)
+EXECUTOR_RUNNING = Gauge(
+    'riptide_mc_executor_running',
+    'Number of operations currently running in the executor.',
+    lambda: executor_statistics.running
+)
+
+
+def _run_tracked(func, args):
+    executor_statistics.update(-1, 1)
+    try:
+        return func(*args)
+    finally:
+        executor_statistics.update(0, -1)
+
+
+def run_in_executor(func, *args) -> asyncio.Future:
+    """Runs func with args in the default executor of the current event loop."""
+    executor_statistics.update(1, 0)
+    return asyncio.get_event_loop().run_in_executor(None, _run_tracked, func, args)
@@ -15,12 +15,17 @@ from riptide.config.document.app import App
 from riptide.config.document.service import Service
 from riptide.config.document.command import Command
 from riptide_mission_control import LOGGER_NAME
-from riptide_mission_control.schema_docstring_parser import extract_from_schema, SCHEMA_DOC_TEXT_FOR_LIST
+from riptide_mission_control.schema_doc_cache import schema_doc_cache
+from riptide_mission_control.schema_docstring_parser import SCHEMA_DOC_TEXT_FOR_LIST
 
 
 logger = logging.getLogger(LOGGER_NAME)
 _already_generated_types = {}
 _generate_entry_already_generated = {}
+# Generated nested object types and unions, by their structure. See _structure_of.
+_structurally_generated_types = {}
+# Path-derived names of all fields using a structurally generated type, by its structure
+_structure_paths = {}
 
 
 class SchemaConversionError(Exception):
@@ -64,6 +69,7 @@ def create_graphl_document(
                                             name,
                                             descr
                                         )
+        schema_doc_cache.save()
     return _already_generated_types[name]
 
 
@@ -89,7 +95,7 @@ def generate_fields_from_schema(
     doc_entries = schema_doc
     if type(schema_doc) == str:
         try:
-            doc_entries = extract_from_schema(schema_doc)
+            doc_entries = schema_doc_cache.extract(schema_doc)
         except Exception as err:
             raise SchemaConversionError(f"Error reading the docstring of field {name}") from err
 
@@ -154,7 +160,7 @@ def _generate_union_type(key: str, field: Or):
         'Meta': Meta
     }
 
-    return type(key, (graphene.Union,), attrs)
+    return _deduplicated(('Union', tuple(typess)), key, lambda: type(key, (graphene.Union,), attrs))
 
 
 def _generate_entry(for_type: type):
@@ -237,14 +243,14 @@ def _schema_field_to_graphene_type(key: str, field: any, required: bool, field_d
             ), required=required, description=doc_text)
         else:
             # Schema is regular dict
-            # Nested ObjectType
+            # Nested ObjectType. Structurally identical ones (eg. the same nested dict in services and commands)
+            # are only generated once.
             if type(field_doc) is not dict:
                 raise SchemaConversionError(f"Invalid doc {field_doc} for field {key}")
-            return generate_object_type(
-                generate_fields_from_schema(key, Schema(field), field_doc),
-                key,
-                field_doc[SCHEMA_DOC_TEXT_FOR_LIST] if SCHEMA_DOC_TEXT_FOR_LIST in field_doc else None
-            )
+            fields = generate_fields_from_schema(key, Schema(field), field_doc)
+            descr = field_doc[SCHEMA_DOC_TEXT_FOR_LIST] if SCHEMA_DOC_TEXT_FOR_LIST in field_doc else None
+            structure = ('ObjectType', descr, tuple((name, _structure_of(f)) for name, f in fields.items()))
+            return _deduplicated(structure, key, lambda: generate_object_type(fields, key, descr))
     elif field == str or type(field) == str:
         return graphene.String
     elif field == int or type(field) == int:
@@ -360,6 +366,60 @@ def _priority(s):
         return COMPARABLE
 
 
+def _structure_of(t) -> any:
+    """
+    Returns a hashable representation of a generated field or type, that is equal for structurally
+    identical fields and types, including their descriptions.
+    Named types are represented by themselves, so nested types must already be deduplicated.
+    """
+    if isinstance(t, graphene.Field):
+        return 'Field', _structure_of(t.type), t.description
+    if isinstance(t, (graphene.NonNull, graphene.List)):
+        return type(t).__name__, _structure_of(t.of_type), tuple(sorted(t.kwargs.items()))
+    return t
+
+
+def _deduplicated(structure, key: str, generate) -> type:
+    """
+    Returns the type generated for structure, generating it with generate if there is none yet.
+
+    A type used by a single field is named after the path of the field (key). A type shared by several
+    fields is named after the common end of their paths, eg. ConfigurationAdditionalVolumes for the
+    additional volumes of services and commands. This way the name does not depend on which document
+    is generated first.
+    """
+    if structure not in _structurally_generated_types:
+        _structurally_generated_types[structure] = generate()
+        _structure_paths[structure] = {key}
+    generated = _structurally_generated_types[structure]
+    paths = _structure_paths[structure]
+    if key not in paths:
+        paths.add(key)
+        _rename_type(generated, _shared_name(paths))
+    return generated
+
+
+def _shared_name(paths) -> str:
+    """Returns the words at the end of all path-derived names, or the first name if they have none in common."""
+    words = [re.findall('[A-Z][^A-Z]*', path) for path in paths]
+    common = []
+    for suffix in zip(*[reversed(path_words) for path_words in words]):
+        if len(set(suffix)) != 1:
+            break
+        common.insert(0, suffix[0])
+    return ''.join(common) if common else sorted(paths)[0]
+
+
+def _rename_type(t, name: str):
+    """Renames a generated type and its entry type. The schema is built from the types only later."""
+    # graphene freezes the options of types after creating them
+    object.__setattr__(t._meta, 'name', name)
+    if t in _generate_entry_already_generated:
+        entry = _generate_entry_already_generated[t]
+        object.__setattr__(entry._meta, 'name', "Entry" + name)
+        object.__setattr__(entry._meta, 'description', f"An named entry in a list of {name}")
+
+
 def _snake_to_camel(word):
     """Converts snake_case into camelCase"""
     words = word.split('_')
@@ -1,14 +1,11 @@
-import os
-
 import graphene
 from typing import Union
 
 from riptide.config.document.project import Project as ProjectDoc
-from riptide.config.files import get_project_setup_flag_path
 from riptide.db.environments import DbEnvironments
 from riptide_mission_control.graphql_entities.document.converter import create_graphl_document
 from riptide_mission_control import PROJECT_CACHE_TIMEOUT
-from riptide_mission_control.registry import registry
+from riptide_mission_control.request_context import get_request_context
 
 ProjectConfigurationGraphqlDocument = create_graphl_document(ProjectDoc, "ProjectConfiguration", ProjectDoc.__doc__)
 
@@ -62,21 +59,21 @@ class ProjectGraphqlDocument(graphene.ObjectType):
         return _get_project_doc(parent)["$path"]
 
     def resolve_is_setup(parent, info):
-        return os.path.exists(get_project_setup_flag_path(_get_project_doc(parent).folder()))
+        return get_request_context(info).is_setup(_get_project_doc(parent))
 
     def resolve_db_available(parent, info):
         return DbEnvironments.has_db(_get_project_doc(parent))
 
     def resolve_db_list(parent, info):
-        if not DbEnvironments.has_db(_get_project_doc(parent)):
+        dbenv = get_request_context(info).db_environments(_get_project_doc(parent))
+        if dbenv is None:
             return None
-        dbenv = DbEnvironments(_get_project_doc(parent), registry().engine)
         return dbenv.list()
 
     def resolve_db_current(parent, info):
-        if not DbEnvironments.has_db(_get_project_doc(parent)):
+        dbenv = get_request_context(info).db_environments(_get_project_doc(parent))
+        if dbenv is None:
             return None
-        dbenv = DbEnvironments(_get_project_doc(parent), registry().engine)
         return dbenv.currently_selected_name()
 
 
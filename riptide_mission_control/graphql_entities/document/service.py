@@ -2,10 +2,10 @@ import graphene
 from typing import Union
 
 from riptide.config.document.service import Service as ServiceDoc, get_logging_path_for
-from riptide.config.service.ports import get_existing_port_mapping
 from riptide_mission_control.graphql_entities.document.converter import create_graphl_document
-from riptide_mission_control import PROJECT_CACHE_TIMEOUT
+from riptide_mission_control import PROJECT_CACHE_TIMEOUT, STATUS_CACHE_TIMEOUT
 from riptide_mission_control.registry import registry
+from riptide_mission_control.request_context import get_request_context
 
 ServiceConfigurationGraphqlDocument = create_graphl_document(ServiceDoc, "ServiceConfiguration", ServiceDoc.__doc__)
 
@@ -65,7 +65,9 @@ class ServiceGraphqlDocument(graphene.ObjectType):
 
     running = graphene.Field(
         graphene.Boolean,
-        required=True, description="Whether or not the container for this service is currently running."
+        required=True, description=f"Whether or not the container for this service is currently running. "
+                                   f"This may be cached for {STATUS_CACHE_TIMEOUT}s. "
+                                   f"See mutation flush_cache to clear."
     )
 
     additional_ports = graphene.List(
@@ -92,16 +94,17 @@ class ServiceGraphqlDocument(graphene.ObjectType):
 
     def resolve_running(parent, info):
         service: ServiceDoc = _get_service_doc(parent)
-        return registry().engine.service_status(service.parent().parent(), service["$name"], registry().system_config)
+        return get_request_context(info).service_running(service.parent().parent(), service["$name"])
 
     def resolve_additional_ports(parent, info):
         service: ServiceDoc = _get_service_doc(parent)
         project = service.parent().parent()
+        port_mappings = get_request_context(info).port_mappings(project, service)
         # Collect Additional Ports
         additional_ports = []
         if "additional_ports" in service:
             for key, entry in service["additional_ports"].items():
-                port_host = get_existing_port_mapping(project, service, entry["host_start"])
+                port_host = port_mappings[entry["host_start"]]
                 additional_ports.append({
                     "key": key,
                     "title": entry["title"],
@@ -2,14 +2,46 @@ import graphene
 from graphql import GraphQLError
 
 from riptide.config.loader import remove_project
+from riptide_mission_control.cache_management import flush, cache_warmer, SCOPE_ALL, SCOPE_PROJECTS, \
+    SCOPE_PROJECT_REGISTRY, SCOPE_STATUS, SCOPE_QUERY_DOCUMENTS
 from riptide_mission_control.project_loader import flush_caches
 from riptide_mission_control import PROJECT_CACHE_TIMEOUT
 
 
+class CacheScope(graphene.Enum):
+    ALL = SCOPE_ALL
+    PROJECTS = SCOPE_PROJECTS
+    PROJECT_REGISTRY = SCOPE_PROJECT_REGISTRY
+    STATUS = SCOPE_STATUS
+    QUERY_DOCUMENTS = SCOPE_QUERY_DOCUMENTS
+
+    @property
+    def description(self):
+        if self == CacheScope.ALL:
+            return "All caches"
+        elif self == CacheScope.PROJECTS:
+            return "Loaded projects and the port mappings"
+        elif self == CacheScope.PROJECT_REGISTRY:
+            return "The list of registered projects"
+        elif self == CacheScope.STATUS:
+            return "Running status of the services of projects"
+        return "Parsed and validated GraphQL queries"
+
+
 # noinspection PyMethodParameters,PyMethodMayBeStatic
 class Mutation(graphene.ObjectType):
     flush_cache = graphene.Boolean(
-        description=f"Flushes the project cache. Loaded projects are normally cached for {PROJECT_CACHE_TIMEOUT}s."
+        scope=CacheScope(description="Caches to flush. If not given: ALL"),
+        project_name=graphene.String(description="Only flush the entries of this project. "
+                                                 "Only supported for the scopes ALL, PROJECTS and STATUS."),
+        description=f"Flushes caches. Loaded projects are normally cached for {PROJECT_CACHE_TIMEOUT}s."
+    )
+
+    warm_cache = graphene.Boolean(
+        project_names=graphene.List(graphene.String, description="Projects to load. If not given: All"),
+        description="Starts loading the project registry, the projects and their status into the caches "
+                    "in the background and returns immediately. Returns false, if the caches are "
+                    "already being warmed."
     )
 
     remove_project = graphene.Boolean(
@@ -17,10 +49,16 @@ class Mutation(graphene.ObjectType):
         description=f"Remove a registered project from Riptide, by name. Flushes cache."
     )
 
-    def resolve_flush_cache(parent, info):
-        flush_caches()
+    def resolve_flush_cache(parent, info, scope=SCOPE_ALL, project_name=None):
+        try:
+            flush(scope, project_name)
+        except ValueError as ex:
+            raise GraphQLError(str(ex))
         return True
 
+    def resolve_warm_cache(parent, info, project_names=None):
+        return cache_warmer.start(project_names) is not None
+
     def resolve_remove_project(parent, info, name: str):
         try:
             remove_project(name)
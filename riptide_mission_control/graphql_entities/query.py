@@ -1,9 +1,14 @@
 import graphene
 
+from riptide.config.document.project import Project
+from riptide_mission_control.cache_management import all_cache_statistics
 from riptide_mission_control.graphql_entities.document.config import create_config_document
 from riptide_mission_control.graphql_entities.document.project import ProjectGraphqlDocument
-from riptide_mission_control.project_loader import load_single_project, load_all_projects, get_project_list
+from riptide_mission_control.port_mapping_table import port_mapping_table
+from riptide_mission_control.project_loader import load_single_project, get_project_list, load_projects_page
 from riptide_mission_control.registry import registry
+from riptide_mission_control.request_context import get_request_context
+from riptide_mission_control.tracing import resolver_statistics
 
 
 ConfigGraphqlDocument = create_config_document()
@@ -20,6 +25,43 @@ class MultiProjectsLoadResult(graphene.ObjectType):
                             description="List of errors", required=True)
     projects = graphene.Field(graphene.List(ProjectGraphqlDocument),
                               description="List of successfully loaded projects", required=True)
+    page_info = graphene.Field(graphene.relay.PageInfo,
+                               description="Pagination information. Use end_cursor as 'after' to load the next page.",
+                               required=True)
+
+
+class BoundPort(graphene.ObjectType):
+    project = graphene.Field(graphene.String, description="Name of the project", required=True)
+    service = graphene.Field(graphene.String, description="Name of the service", required=True)
+    host_start = graphene.Field(graphene.Int,
+                                description="First port number on host that Riptide tried to reserve",
+                                required=True)
+    host_bound = graphene.Field(graphene.Int, description="Actual bound port number on host", required=True)
+
+
+class ResolverStatistic(graphene.ObjectType):
+    field = graphene.Field(graphene.String, description="Field, as ParentType.fieldName", required=True)
+    count = graphene.Field(graphene.Int, description="Number of times the field was resolved", required=True)
+    mean = graphene.Field(graphene.Float, description="Mean duration in milliseconds", required=True)
+    p50 = graphene.Field(graphene.Float, description="Median duration in milliseconds", required=True)
+    p90 = graphene.Field(graphene.Float, description="90th percentile duration in milliseconds", required=True)
+    p99 = graphene.Field(graphene.Float, description="99th percentile duration in milliseconds", required=True)
+    max = graphene.Field(graphene.Float, description="Maximum duration in milliseconds", required=True)
+
+
+class CacheStatistic(graphene.ObjectType):
+    cache = graphene.Field(graphene.String,
+                           description="Name of the cache: projects, project_registry, status or query_documents",
+                           required=True)
+    entries = graphene.Field(graphene.Int, description="Number of cached entries", required=True)
+    hits = graphene.Field(graphene.Int, description="Number of lookups served from the cache", required=True)
+    misses = graphene.Field(graphene.Int, description="Number of lookups not served from the cache", required=True)
+    hit_rate = graphene.Field(graphene.Float, description="Hits divided by all lookups. Null if there were none.")
+    evictions = graphene.Field(graphene.Int,
+                               description="Number of entries removed because they expired, the cache was full "
+                                           "or flushed",
+                               required=True)
+    age = graphene.Field(graphene.Float, description="Age of the oldest entry in seconds. Null if empty.")
 
 
 # noinspection PyMethodParameters,PyMethodMayBeStatic
@@ -30,9 +72,33 @@ class Query(graphene.ObjectType):
                                        description="Returns all projects names registered to Riptide. "
                                                    "Does not load projects.")
     all_projects = graphene.Field(MultiProjectsLoadResult,
-                                  description="Returns all projects registered to Riptide.")
+                                  first=graphene.Int(description="Maximum number of projects to return. "
+                                                                 "If not given: All"),
+                                  after=graphene.String(description="Cursor after which to continue "
+                                                                    "(page_info.end_cursor of the previous page)"),
+                                  name_prefix=graphene.String(description="Only return projects whose names "
+                                                                          "start with this prefix"),
+                                  app_name=graphene.String(description="Only return projects using the app "
+                                                                       "with this name"),
+                                  has_db=graphene.Boolean(description="Only return projects with (true) or "
+                                                                      "without (false) database features"),
+                                  is_setup=graphene.Boolean(description="Only return projects that are (true) "
+                                                                        "or are not (false) set-up"),
+                                  description="Returns all projects registered to Riptide, ordered by name. "
+                                              "Only the projects of the requested page are loaded.")
     config = graphene.Field(ConfigGraphqlDocument,
                             description="Returns the system configuration.")
+    all_bound_ports = graphene.Field(graphene.List(BoundPort),
+                                     description="Returns all additional ports bound on the host by Riptide, "
+                                                 "across all projects, ordered by bound port. "
+                                                 "Does not load projects.")
+    resolver_statistics = graphene.Field(graphene.List(ResolverStatistic),
+                                         description="Returns duration statistics per resolved field, slowest "
+                                                     "first. Percentiles are based on the most recent durations. "
+                                                     "Only available if the server was started with "
+                                                     "--trace-resolvers, empty otherwise.")
+    cache_stats = graphene.Field(graphene.List(CacheStatistic),
+                                 description="Returns entries, hit rate, age and evictions of the server's caches.")
 
     def resolve_config(parent, info):
         return ConfigGraphqlDocument(registry().system_config)
@@ -43,5 +109,26 @@ class Query(graphene.ObjectType):
     def resolve_all_project_names(parent, info):
         return get_project_list().keys()
 
-    def resolve_all_projects(parent, info):
-        return load_all_projects()
+    def resolve_all_projects(parent, info, first=None, after=None, name_prefix=None,
+                             app_name=None, has_db=None, is_setup=None):
+        context = get_request_context(info)
+
+        def project_filter(project: Project):
+            if app_name is not None and project["app"]["name"] != app_name:
+                return False
+            if has_db is not None and (context.db_environments(project) is not None) != has_db:
+                return False
+            if is_setup is not None and context.is_setup(project) != is_setup:
+                return False
+            return True
+
+        return load_projects_page(first, after, name_prefix, project_filter)
+
+    def resolve_all_bound_ports(parent, info):
+        return port_mapping_table.all_bound()
+
+    def resolve_resolver_statistics(parent, info):
+        return resolver_statistics.to_list()
+
+    def resolve_cache_stats(parent, info):
+        return all_cache_statistics()
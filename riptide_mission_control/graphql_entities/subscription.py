@@ -1,12 +1,39 @@
-import asyncio
+import weakref
+
 import graphene
 from rx.subjects import ReplaySubject
 
+from graphql import GraphQLError
+
+from riptide_mission_control import PROJECTS_START_STOP_CONCURRENCY, IMAGE_PULL_MAX_PARALLELISM
+from riptide_mission_control.executor import run_in_executor
+from riptide_mission_control.graphql_entities.subscriptions.admission import admission_controllers
 from riptide_mission_control.graphql_entities.subscriptions.db import db_copy_impl, db_new_impl, \
     db_switch_subscriber_impl, db_drop_impl
 from riptide_mission_control.graphql_entities.subscriptions.misc import update_repositories_impl, update_images_impl
-from riptide_mission_control.graphql_entities.subscriptions.start_stop import project_start_impl, project_stop_impl
-from riptide_mission_control.graphql_entities.subscriptions.utils import ResultStep, StartStopResultStep
+from riptide_mission_control.graphql_entities.subscriptions.start_stop import project_start_impl, project_stop_impl, \
+    projects_start_impl, projects_stop_impl
+from riptide_mission_control.graphql_entities.subscriptions.utils import ResultStep, StartStopResultStep, \
+    ProjectsStartStopResultStep
+from riptide_mission_control.memory import cache_registry
+from riptide_mission_control.request_context import get_request_context
+
+# ReplaySubjects of subscriptions, as long as they are referenced by anyone
+_live_subjects = weakref.WeakSet()
+
+
+def _new_subject() -> ReplaySubject:
+    subject = ReplaySubject()
+    _live_subjects.add(subject)
+    return subject
+
+
+def _subject_buffers():
+    subjects = list(_live_subjects)
+    return sum(len(subject.queue) for subject in subjects), [subject.queue for subject in subjects]
+
+
+cache_registry.register('replay_subject_buffers', _subject_buffers)
 
 
 # noinspection PyMethodMayBeStatic,PyMethodParameters
@@ -20,6 +47,10 @@ class Subscription(graphene.ObjectType):
     WILL execute the operation again.
 
     Each of these subscriptions sends progress reports and signals when it's done / an error occurred.
+
+    updateRepositories, updateImages and projectDbCopy are limited in how many of them run at once and how
+    often a client may start them. Operations over the limits are queued and report their position in the
+    queue, or fail if the client started too many of them.
     """
     update_repositories = graphene.Field(
         ResultStep,
@@ -33,6 +64,13 @@ class Subscription(graphene.ObjectType):
     update_images = graphene.Field(
         ResultStep,
         project_name=graphene.String(required=True),
+        parallelism=graphene.Int(required=False,
+                                 description=f"Pull up to this many images at the same time, at most "
+                                             f"{IMAGE_PULL_MAX_PARALLELISM}. Images used by multiple services "
+                                             f"or projects are pulled once. Progress is reported per image in "
+                                             f"images and overall in progress, instead of as text. "
+                                             f"If not given, the images are pulled one after another by the "
+                                             f"engine, which reports progress as text."),
         description="Update all images used by the specified project"
     )
 
@@ -87,46 +125,94 @@ class Subscription(graphene.ObjectType):
         description="Stop services of a project."
     )
 
+    projects_start = graphene.Field(
+        ProjectsStartStopResultStep,
+        project_names=graphene.List(graphene.String, required=True),
+        concurrency=graphene.Int(required=False,
+                                 description=f"Number of projects to start at the same time. "
+                                             f"If not given: {PROJECTS_START_STOP_CONCURRENCY}"),
+        description="Start all services of multiple projects. The progress of all projects is sent as one stream, "
+                    "followed by a summary. Services that are already started are NOT restarted."
+    )
+
+    projects_stop = graphene.Field(
+        ProjectsStartStopResultStep,
+        project_names=graphene.List(graphene.String, required=True),
+        concurrency=graphene.Int(required=False,
+                                 description=f"Number of projects to stop at the same time. "
+                                             f"If not given: {PROJECTS_START_STOP_CONCURRENCY}"),
+        description="Stop all services of multiple projects. The progress of all projects is sent as one stream, "
+                    "followed by a summary."
+    )
+
     def resolve_update_repositories(parent, info):
-        subject = ReplaySubject()
-        asyncio.get_event_loop().run_in_executor(None, update_repositories_impl, subject)
+        subject = _new_subject()
+        admission_controllers['updateRepositories'].submit(
+            get_request_context(info).client, subject, update_repositories_impl
+        )
         return subject
 
-    def resolve_update_images(parent, info, project_name: str):
-        subject = ReplaySubject()
-        asyncio.get_event_loop().run_in_executor(None, update_images_impl, subject, project_name)
+    def resolve_update_images(parent, info, project_name: str, parallelism=None):
+        if parallelism is not None and parallelism < 1:
+            raise GraphQLError("parallelism must be at least 1.")
+        if parallelism is not None:
+            parallelism = min(parallelism, IMAGE_PULL_MAX_PARALLELISM)
+        subject = _new_subject()
+        admission_controllers['updateImages'].submit(
+            get_request_context(info).client, subject, update_images_impl, project_name, parallelism
+        )
         return subject
 
     def resolve_project_db_copy(parent, info, project_name: str, source: str, target: str, switch=True):
-        subject = ReplaySubject()
-        asyncio.get_event_loop().run_in_executor(None, db_copy_impl, subject, project_name, source, target, switch)
+        subject = _new_subject()
+        admission_controllers['projectDbCopy'].submit(
+            get_request_context(info).client, subject, db_copy_impl, project_name, source, target, switch
+        )
         return subject
 
     def resolve_project_db_new(parent, info, project_name: str, new_name: str, switch=True):
-        subject = ReplaySubject()
-        asyncio.get_event_loop().run_in_executor(None, db_new_impl, subject, project_name, new_name, switch)
+        subject = _new_subject()
+        run_in_executor(db_new_impl, subject, project_name, new_name, switch)
         return subject
 
     def resolve_project_db_switch(parent, info, project_name: str, name: str):
-        subject = ReplaySubject()
-        asyncio.get_event_loop().run_in_executor(None, db_switch_subscriber_impl, subject, project_name, name)
+        subject = _new_subject()
+        run_in_executor(db_switch_subscriber_impl, subject, project_name, name)
         return subject
 
     def resolve_project_db_drop(parent, info, project_name: str, name: str):
-        subject = ReplaySubject()
-        asyncio.get_event_loop().run_in_executor(None, db_drop_impl, subject, project_name, name)
+        subject = _new_subject()
+        run_in_executor(db_drop_impl, subject, project_name, name)
         return subject
 
     def resolve_project_start(parent, info, project_name: str, services=None):
         if services is None:
             services = []
-        subject = ReplaySubject()
-        asyncio.get_event_loop().run_in_executor(None, project_start_impl, subject, project_name, services)
+        subject = _new_subject()
+        run_in_executor(project_start_impl, subject, project_name, services)
         return subject
 
     def resolve_project_stop(parent, info, project_name: str, services=None):
         if services is None:
             services = []
-        subject = ReplaySubject()
-        asyncio.get_event_loop().run_in_executor(None, project_stop_impl, subject, project_name, services)
+        subject = _new_subject()
+        run_in_executor(project_stop_impl, subject, project_name, services)
+        return subject
+
+    def resolve_projects_start(parent, info, project_names, concurrency=None):
+        if concurrency is None:
+            concurrency = PROJECTS_START_STOP_CONCURRENCY
+        if concurrency < 1:
+            raise GraphQLError("concurrency must be at least 1.")
+        subject = _new_subject()
+        run_in_executor(projects_start_impl, subject, project_names, concurrency)
+        return subject
+
+    def resolve_projects_stop(parent, info, project_names, concurrency=None):
+        if concurrency is None:
+            concurrency = PROJECTS_START_STOP_CONCURRENCY
+        if concurrency < 1:
+            raise GraphQLError("concurrency must be at least 1.")
+        subject = _new_subject()
+        run_in_executor(projects_stop_impl, subject, project_names, concurrency)
         return subject
@@ -0,0 +1,223 @@
+"""
+Admission control for subscriptions that use a lot of disk and network, such as updating images.
+
+Each of these operations has its own AdmissionController. It limits how many of the operations run at once,
+overall and per client, and how many of them each client may start per minute.
+"""
+from collections import OrderedDict, defaultdict, deque
+from threading import Lock
+from typing import Deque, Dict, List, NamedTuple, Tuple
+
+from rx.subjects import ReplaySubject
+
+from riptide_mission_control import HEAVY_OPERATION_CONCURRENCY, HEAVY_OPERATION_CLIENT_CONCURRENCY, \
+    HEAVY_OPERATION_RATE
+from riptide_mission_control.executor import run_in_executor
+from riptide_mission_control.graphql_entities.subscriptions.utils import ResultStep
+from riptide_mission_control.metrics import Counter, Gauge
+from riptide_mission_control.rate_limit import TokenBucket
+
+# Operations under admission control, by their subscription field
+HEAVY_OPERATIONS = ('updateImages', 'projectDbCopy', 'updateRepositories')
+
+# Maximum number of clients to keep rate limits for, per operation
+_MAX_CLIENTS = 1024
+
+
+class AdmissionLimits(NamedTuple):
+    # Number of operations running at once. 0 for no limit.
+    concurrency: int = HEAVY_OPERATION_CONCURRENCY
+    # Number of operations of a single client running at once. 0 for no limit.
+    client_concurrency: int = HEAVY_OPERATION_CLIENT_CONCURRENCY
+    # Number of operations a single client may start per minute. 0 for no limit.
+    rate: int = HEAVY_OPERATION_RATE
+
+
+class _Ticket:
+    """An operation waiting for admission."""
+    __slots__ = ('client', 'subject', 'func', 'args', 'position')
+
+    def __init__(self, client: str, subject: ReplaySubject, func, args: tuple):
+        self.client = client
+        self.subject = subject
+        self.func = func
+        self.args = args
+        self.position = 0
+
+    def is_cancelled(self) -> bool:
+        # The subscription was stopped or the connection was closed
+        return not self.subject.observers
+
+
+class AdmissionController:
+    """
+    Admits operations of one kind.
+
+    Operations of clients that are over the rate are rejected with an error ResultStep. Operations over the
+    concurrency limits are queued and started in order, once there is a free slot. Until then, the client
+    receives ResultSteps with the position in the queue. Queued operations that are no longer subscribed
+    to are dropped.
+    """
+    def __init__(self, operation: str, limits: AdmissionLimits = AdmissionLimits()):
+        self.operation = operation
+        self._limits = limits
+        self._queue: Deque[_Ticket] = deque()
+        self.running = 0
+        self._running_per_client: Dict[str, int] = defaultdict(int)
+        # Least recently used first
+        self._buckets: 'OrderedDict[str, TokenBucket]' = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def limits(self) -> AdmissionLimits:
+        return self._limits
+
+    @limits.setter
+    def limits(self, limits: AdmissionLimits):
+        with self._lock:
+            self._limits = limits
+            self._buckets = OrderedDict()
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def submit(self, client: str, subject: ReplaySubject, func, *args):
+        """
+        Runs func with subject and args in the executor, as soon as the limits allow it.
+        Must be called from the event loop.
+        """
+        with self._lock:
+            retry_after = self._take_token(client)
+            if retry_after is None:
+                ticket = _Ticket(client, subject, func, args)
+                self._queue.append(ticket)
+                started, moved = self._dispatch(ticket)
+
+        if retry_after is not None:
+            ADMISSION_REJECTIONS.inc(operation=self.operation)
+            subject.on_next(ResultStep(
+                steps=1,
+                current_step=1,
+                text=f"Too many {self.operation} operations. Retry in {retry_after:.0f}s.",
+                is_end=True,
+                is_error=True
+            ))
+            subject.on_completed()
+            return
+        self._start(started)
+        self._report(moved)
+
+    def _take_token(self, client: str):
+        """Returns None if the client may start an operation, otherwise the time in seconds until it may."""
+        if not self._limits.rate:
+            return None
+        if client in self._buckets:
+            self._buckets.move_to_end(client)
+            bucket = self._buckets[client]
+        else:
+            if len(self._buckets) >= _MAX_CLIENTS:
+                # Full buckets are the same as new ones. If none are full, the least recently used one is dropped.
+                self._buckets = OrderedDict(
+                    (key, bucket) for key, bucket in self._buckets.items() if not bucket.is_full()
+                )
+                if len(self._buckets) >= _MAX_CLIENTS:
+                    self._buckets.popitem(last=False)
+            bucket = self._buckets[client] = TokenBucket(self._limits.rate, self._limits.rate / 60)
+        if bucket.try_take():
+            return None
+        return bucket.time_until_available()
+
+    def _dispatch(self, submitted: _Ticket = None) -> Tuple[List[_Ticket], List[_Ticket]]:
+        """
+        Removes the tickets, that may start now, from the queue. Must be called with the lock held.
+        Returns the tickets to start and the queued tickets whose position changed.
+        """
+        limits = self._limits
+        started = []
+        moved = []
+        queue = deque()
+        for ticket in self._queue:
+            # The subscription to a ticket submitted just now is not set up yet
+            if ticket is not submitted and ticket.is_cancelled():
+                continue
+            if (not limits.concurrency or self.running < limits.concurrency) and \
+                    (not limits.client_concurrency
+                     or self._running_per_client[ticket.client] < limits.client_concurrency):
+                self.running += 1
+                self._running_per_client[ticket.client] += 1
+                started.append(ticket)
+                continue
+            queue.append(ticket)
+            if ticket.position != len(queue):
+                ticket.position = len(queue)
+                moved.append(ticket)
+        self._queue = queue
+        return started, moved
+
+    def _start(self, tickets: List[_Ticket]):
+        for ticket in tickets:
+            future = run_in_executor(ticket.func, ticket.subject, *ticket.args)
+            future.add_done_callback(lambda _, ticket=ticket: self._finished(ticket))
+
+    def _report(self, tickets: List[_Ticket]):
+        for ticket in tickets:
+            ticket.subject.on_next(ResultStep(
+                steps=1,
+                current_step=0,
+                text=f"Waiting for other {self.operation} operations to finish. "
+                     f"Position in queue: {ticket.position}."
+            ))
+
+    def _finished(self, ticket: _Ticket):
+        with self._lock:
+            self.running -= 1
+            self._running_per_client[ticket.client] -= 1
+            if not self._running_per_client[ticket.client]:
+                del self._running_per_client[ticket.client]
+            started, moved = self._dispatch()
+        self._start(started)
+        self._report(moved)
+
+
+def parse_limits(concurrency: List[str], client_concurrency: List[str], rates: List[str]) \
+        -> Dict[str, AdmissionLimits]:
+    """
+    Parses the admission control command line options. Each value is either a number, which applies to
+    all operations, or OPERATION=NUMBER. Returns the limits of all operations.
+    """
+    defaults = {}
+    per_operation: Dict[str, dict] = {}
+    for field, values in (('concurrency', concurrency),
+                          ('client_concurrency', client_concurrency),
+                          ('rate', rates)):
+        for value in values:
+            operation, _, number = value.rpartition('=')
+            if operation and operation not in HEAVY_OPERATIONS:
+                raise ValueError(f"Unknown operation {operation}. Must be one of: {', '.join(HEAVY_OPERATIONS)}")
+            number = int(number)
+            if operation:
+                per_operation.setdefault(operation, {})[field] = number
+            else:
+                defaults[field] = number
+    default = AdmissionLimits(**defaults)
+    return {operation: default._replace(**per_operation.get(operation, {})) for operation in HEAVY_OPERATIONS}
+
+
+admission_controllers = {operation: AdmissionController(operation) for operation in HEAVY_OPERATIONS}
+
+ADMISSION_QUEUED = Gauge(
+    'riptide_mc_heavy_operations_queued',
+    'Number of heavy operations (eg. updateImages) waiting for admission.',
+    lambda: sum(controller.queued for controller in admission_controllers.values())
+)
+ADMISSION_RUNNING = Gauge(
+    'riptide_mc_heavy_operations_running',
+    'Number of heavy operations (eg. updateImages) currently running.',
+    lambda: sum(controller.running for controller in admission_controllers.values())
+)
+ADMISSION_REJECTIONS = Counter(
+    'riptide_mc_heavy_operations_rejected_total',
+    'Number of heavy operations rejected, because the client started too many of them.',
+    ['operation']
+)
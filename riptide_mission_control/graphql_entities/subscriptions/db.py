@@ -2,6 +2,7 @@ from rx.subjects import ReplaySubject
 
 from riptide.config.document.project import Project
 from riptide.db.environments import DbEnvironments
+from riptide_mission_control.container_actions import container_actions
 from riptide_mission_control.graphql_entities.subscriptions.utils import async_in_executor, try_loading_project, \
     ResultStep
 from riptide_mission_control.registry import registry
@@ -203,8 +204,9 @@ async def db_switch_impl(
             current_step=current_step_in_ctx + 1,
             text="Stopping database service..."
         ))
-        async for _ in registry().engine.stop_project(project, [db_name]):
-            pass
+        async with container_actions.slot():
+            async for _ in registry().engine.stop_project(project, [db_name]):
+                pass
 
     # 2. Switch environment
     try:
@@ -238,8 +240,9 @@ async def db_switch_impl(
                 current_step=current_step_in_ctx + 3,
                 text=f"Starting database...",
             ))
-            async for _ in registry().engine.start_project(project, [db_name]):
-                pass
+            async with container_actions.slot():
+                async for _ in registry().engine.start_project(project, [db_name]):
+                    pass
 
         subject.on_next(ResultStep(
             steps=total_steps_from_ctx + 3,
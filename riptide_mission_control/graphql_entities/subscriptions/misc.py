@@ -1,10 +1,19 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Dict, List, Optional
+
 from rx.subjects import ReplaySubject
 
 from riptide.config import repositories
 from riptide.config.document.config import Config
+from riptide.config.document.project import Project
 from riptide.config.files import riptide_main_config_file
+from riptide_mission_control import IMAGE_PULL_PROGRESS_INTERVAL
 from riptide_mission_control.graphql_entities.subscriptions.utils import async_in_executor, try_loading_project, \
-    ResultStep
+    ResultStep, ImagePullProgress
+from riptide_mission_control.image_pull import image_puller, images_of, pull_function, ImagePull, WAITING, \
+    FAILED, NOT_FOUND
 from riptide_mission_control.registry import registry
 
 
@@ -71,7 +80,12 @@ async def update_repositories_impl(subject: ReplaySubject):
 
 
 @async_in_executor
-async def update_images_impl(subject: ReplaySubject, project_name: str):
+async def update_images_impl(subject: ReplaySubject, project_name: str, parallelism: Optional[int] = None):
+    """
+    Pulls the images of the project with the engine, which reports progress as text.
+    If parallelism is given and the images can be pulled one by one (see image_pull), up to parallelism
+    images are pulled at the same time, reporting structured progress.
+    """
     subject.on_next(ResultStep(
         steps=1,
         current_step=1,
@@ -82,6 +96,11 @@ async def update_images_impl(subject: ReplaySubject, project_name: str):
     if not project:
         return
 
+    pull_func = pull_function(registry().engine) if parallelism else None
+    if pull_func:
+        _pull_images_parallel(subject, project, pull_func, parallelism)
+        return
+
     try:
         registry().engine.pull_images(project,
                                       line_reset="",
@@ -108,4 +127,72 @@ async def update_images_impl(subject: ReplaySubject, project_name: str):
         ))
     finally:
         subject.on_completed()
-    pass
\ No newline at end of file
+
+
+def _pull_images_parallel(subject: ReplaySubject, project: Project, pull_func, parallelism: int):
+    images = images_of(project)
+    progress = _ImagesProgress(subject, images)
+    try:
+        with ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix='image-pull') as pool:
+            pulls = list(pool.map(lambda image: image_puller.pull(image, pull_func, progress.update), images))
+        failed = [pull for pull in pulls if pull.status == FAILED]
+        not_found = [pull.image for pull in pulls if pull.status == NOT_FOUND]
+        if failed:
+            progress.report(
+                f"Error updating {len(failed)} of {len(pulls)} images: "
+                + "; ".join(f"{pull.image}: {pull.error}" for pull in failed),
+                is_end=True, is_error=True
+            )
+        elif not_found:
+            progress.report(f"Done updating images! Warning: Images not found in repository: "
+                            f"{', '.join(not_found)}", is_end=True)
+        else:
+            progress.report("Done updating images!", is_end=True)
+    except Exception as ex:
+        progress.report("Error updating the images: " + str(ex), is_end=True, is_error=True)
+    finally:
+        subject.on_completed()
+
+
+class _ImagesProgress:
+    """
+    Aggregates the progress of pulling the images of a project and sends it to the subject,
+    at most every IMAGE_PULL_PROGRESS_INTERVAL seconds or when an image is finished.
+    """
+    def __init__(self, subject: ReplaySubject, images: Dict[str, List[str]]):
+        self.subject = subject
+        self.images = images
+        self._pulls: Dict[str, ImagePull] = {}
+        self._last_report = 0.0
+        self._lock = Lock()
+
+    def update(self, pull: ImagePull):
+        with self._lock:
+            self._pulls[pull.image] = pull
+            now = time.monotonic()
+            if not pull.finished and now - self._last_report < IMAGE_PULL_PROGRESS_INTERVAL:
+                return
+            self._last_report = now
+            finished = sum(1 for pull in self._pulls.values() if pull.finished)
+            self.report(f"Pulled {finished} of {len(self.images)} images.")
+
+    def report(self, text: str, is_end=False, is_error=False):
+        images = []
+        fractions = []
+        for image, used_by in self.images.items():
+            pull = self._pulls.get(image)
+            progress = pull.progress() if pull else {
+                'layers_done': 0, 'layers_total': 0, 'bytes_done': 0, 'bytes_total': 0, 'fraction': 0.0
+            }
+            fractions.append(progress.pop('fraction'))
+            images.append(ImagePullProgress(image=image, used_by=used_by, status=pull.status if pull else WAITING,
+                                            error=pull.error if pull else None, **progress))
+        self.subject.on_next(ResultStep(
+            steps=1,
+            current_step=1,
+            text=text,
+            is_end=is_end,
+            is_error=is_error,
+            progress=100 * sum(fractions) / len(fractions) if fractions else 100.0,
+            images=images
+        ))
@@ -1,79 +1,146 @@
+import asyncio
 import traceback
 from graphql import GraphQLError
 from rx.subjects import ReplaySubject
 from typing import List, Dict
 
 from riptide.engine.results import EndResultQueue, ResultError
+from riptide_mission_control.container_actions import container_actions
 from riptide_mission_control.graphql_entities.subscriptions.utils import async_in_executor, StartStopEndStep, \
-    StartStopProgressStep, ResultStep
+    StartStopProgressStep, ResultStep, ProjectsStartStopProgressStep, ProjectsStartStopEndStep, \
+    ProjectStartStopResult
 from riptide_mission_control.project_loader import load_single_project
 from riptide_mission_control.registry import registry
+from riptide_mission_control.status_cache import status_cache
+
+# Messages for finished services and fatal errors, by action
+_MESSAGES = {
+    'start': ("Service started!", "Error starting the services: "),
+    'stop': ("Service stopped!", "Error stopping the services: "),
+}
 
 
 @async_in_executor
 async def project_start_impl(subject: ReplaySubject, project_name: str, services: List[str]):
+    subject.on_next(await _start_stop_project('start', subject, project_name, services))
+    subject.on_completed()
+
+
+@async_in_executor
+async def project_stop_impl(subject: ReplaySubject, project_name: str, services: List[str]):
+    subject.on_next(await _start_stop_project('stop', subject, project_name, services))
+    subject.on_completed()
+
+
+@async_in_executor
+async def projects_start_impl(subject: ReplaySubject, project_names: List[str], concurrency: int):
+    await _start_stop_projects('start', subject, project_names, concurrency)
+
+
+@async_in_executor
+async def projects_stop_impl(subject: ReplaySubject, project_names: List[str], concurrency: int):
+    await _start_stop_projects('stop', subject, project_names, concurrency)
+
+
+async def _start_stop_project(action: str, subject, project_name: str, services: List[str]) -> StartStopEndStep:
+    """
+    Starts or stops (action) services of a project, all if services is empty. Progress is sent to subject.
+    Returns the end step.
+    """
     try:
         project = load_single_project(project_name).config
     except GraphQLError as ex:
-        subject.on_next(StartStopEndStep(
+        return StartStopEndStep(
             error_string=str(ex),
             is_fatal_error=True
-        ))
-        subject.on_completed()
-        return
+        )
     engine = registry().engine
 
     if len(services) < 1:
         services = project["app"]["services"].keys()
 
-    last_steps: Dict[str, int] = {}
-
+    engine_method = engine.start_project if action == 'start' else engine.stop_project
+    end_msg, error_msg = _MESSAGES[action]
     try:
-        async for service_name, status, finished in engine.start_project(project, services):
-            _handle_update(finished, last_steps, service_name, status, subject, "Service started!")
+        await _run_services(engine_method, project, services, subject, end_msg)
     except Exception as err:
         print(traceback.format_exc())
-        subject.on_next(StartStopEndStep(
-            error_string="Error starting the services: " + str(err),
+        return StartStopEndStep(
+            error_string=error_msg + str(err),
             is_fatal_error=True
-        ))
-    else:
-        subject.on_next(StartStopEndStep())
+        )
+    finally:
+        status_cache.invalidate(project_name)
+    return StartStopEndStep()
+
+
+async def _start_stop_projects(action: str, subject: ReplaySubject, project_names: List[str], concurrency: int):
+    """
+    Starts or stops (action) all services of the projects, concurrency projects at a time.
+    The progress of all projects is sent to subject, followed by a summary.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
 
+    async def run_project(project_name):
+        progress = _ProjectProgress(subject, project_name)
+        async with semaphore:
+            end_step = await _start_stop_project(action, progress, project_name, [])
+        return ProjectStartStopResult(
+            project=project_name,
+            error_string=end_step.error_string,
+            is_fatal_error=end_step.is_fatal_error,
+            failed_services=progress.failed_services
+        )
+
+    results = await asyncio.gather(*[run_project(name) for name in dict.fromkeys(project_names)])
+    subject.on_next(ProjectsStartStopEndStep(results=results))
     subject.on_completed()
 
 
-@async_in_executor
-async def project_stop_impl(subject: ReplaySubject, project_name: str, services: List[str]):
-    try:
-        project = load_single_project(project_name).config
-    except GraphQLError as ex:
-        subject.on_next(StartStopEndStep(
-            error_string=str(ex),
-            is_fatal_error=True
+class _ProjectProgress:
+    """Forwards the progress of a single project of projectsStart/projectsStop, tagged with the project name."""
+    def __init__(self, subject: ReplaySubject, project_name: str):
+        self.subject = subject
+        self.project_name = project_name
+        self.failed_services: List[str] = []
+
+    def on_next(self, step: StartStopProgressStep):
+        if step.state.is_error:
+            self.failed_services.append(step.service)
+        self.subject.on_next(ProjectsStartStopProgressStep(
+            project=self.project_name,
+            service=step.service,
+            state=step.state
         ))
-        subject.on_completed()
-        return
-    engine = registry().engine
 
-    if len(services) < 1:
-        services = project["app"]["services"].keys()
 
+async def _run_services(action, project, services, subject, default_end_msg):
+    """
+    Runs action (start_project or stop_project of the engine) for the services, as soon as there is a free
+    slot for a container action for each of them. The engine is called once for all services, since it
+    also sets up the project, eg. its network. While waiting, the services report their position in the queue.
+    """
+    services = list(services)
     last_steps: Dict[str, int] = {}
 
-    try:
-        async for service_name, status, finished in engine.stop_project(project, services):
-            _handle_update(finished, last_steps, service_name, status, subject, "Service stopped!")
-    except Exception as err:
-        print(traceback.format_exc())
-        subject.on_next(StartStopEndStep(
-            error_string="Error stopping the services: " + str(err),
-            is_fatal_error=True
-        ))
-    else:
-        subject.on_next(StartStopEndStep())
+    def on_queued(position):
+        for name in services:
+            _handle_queued(name, position, subject)
 
-    subject.on_completed()
+    async with container_actions.slot(len(services), on_queued):
+        async for service_name, status, finished in action(project, services):
+            _handle_update(finished, last_steps, service_name, status, subject, default_end_msg)
+
+
+def _handle_queued(service_name, position, subject):
+    subject.on_next(StartStopProgressStep(
+        service=service_name,
+        state=ResultStep(
+            steps=1,
+            current_step=0,
+            text=f"Waiting for other containers to start or stop. Position in queue: {position}."
+        )
+    ))
 
 
 def _handle_update(finished, last_steps, service_name, status, subject, default_end_msg):
@@ -43,19 +43,78 @@ def try_loading_project(project_name, subject, total_steps, current_step) -> Uni
     return None
 
 
+class ImagePullProgress(graphene.ObjectType):
+    """Progress of pulling a single image."""
+    def __init__(self, image, used_by, status, layers_done, layers_total, bytes_done, bytes_total, error=None,
+                 *args, **kwargs):
+        self.image = image
+        self.used_by = used_by
+        self.status = status
+        self.layers_done = layers_done
+        self.layers_total = layers_total
+        self.bytes_done = bytes_done
+        self.bytes_total = bytes_total
+        self.error = error
+        super().__init__(image, used_by, status, layers_done, layers_total, bytes_done, bytes_total, error,
+                         *args, **kwargs)
+    image = graphene.Field(
+        graphene.String,
+        description="Name of the image",
+        required=True
+    )
+    used_by = graphene.Field(
+        graphene.List(graphene.String),
+        description="Services and commands using the image, eg. service/www",
+        required=True
+    )
+    status = graphene.Field(
+        graphene.String,
+        description="waiting, pulling, done, not_found or failed",
+        required=True
+    )
+    layers_done = graphene.Field(
+        graphene.Int,
+        description="Number of layers that are pulled completely",
+        required=True
+    )
+    layers_total = graphene.Field(
+        graphene.Int,
+        description="Number of layers of the image known so far",
+        required=True
+    )
+    bytes_done = graphene.Field(
+        graphene.Float,
+        description="Number of bytes downloaded",
+        required=True
+    )
+    bytes_total = graphene.Field(
+        graphene.Float,
+        description="Number of bytes to download, as far as known so far",
+        required=True
+    )
+    error = graphene.Field(
+        graphene.String,
+        description="Error message, if the image could not be pulled or was not found",
+        required=False
+    )
+
+
 class ResultStep(graphene.ObjectType):
     """
     A single status update of an asynchronous mutation.
 
     Clients should stop subscribing when is_end is true!
     """
-    def __init__(self, steps, current_step, text, is_end=False, is_error=False, *args, **kwargs):
+    def __init__(self, steps, current_step, text, is_end=False, is_error=False, progress=None, images=None,
+                 *args, **kwargs):
         self.steps = steps
         self.current_steps = current_step
         self.text = text
         self.is_end = is_end
         self.is_error = is_error
-        super().__init__(steps, current_step, text, is_end, is_error, *args, **kwargs)
+        self.progress = progress
+        self.images = images
+        super().__init__(steps, current_step, text, is_end, is_error, progress, images, *args, **kwargs)
     steps = graphene.Field(
         graphene.Int,
         description="Total number of steps, may change.",
@@ -82,6 +141,16 @@ class ResultStep(graphene.ObjectType):
                     "Only true, if is_end is also true.",
         required=True
     )
+    progress = graphene.Field(
+        graphene.Float,
+        description="Overall progress in percent, if known. Only set by updateImages with parallelism.",
+        required=False
+    )
+    images = graphene.Field(
+        graphene.List(ImagePullProgress),
+        description="Progress of the images. Only set by updateImages with parallelism.",
+        required=False
+    )
 
 
 class StartStopProgressStep(graphene.ObjectType):
@@ -141,3 +210,89 @@ class StartStopResultStep(graphene.Union):
     """
     class Meta:
         types = (StartStopProgressStep, StartStopEndStep)
+
+
+class ProjectsStartStopProgressStep(graphene.ObjectType):
+    """
+    A status update for starting or stopping a single service of one of multiple projects.
+
+    Clients should NOT stop subscribing if child ResultSteps is_end is true, this
+    only indicates that single services started.
+    """
+    def __init__(self, project, service, state, *args, **kwargs):
+        self.project = project
+        self.service = service
+        self.state = state
+        super().__init__(project, service, state, *args, **kwargs)
+    project = graphene.Field(
+        graphene.String,
+        description="Name of the project, that the current state update belongs to",
+        required=True
+    )
+    service = graphene.Field(
+        graphene.String,
+        description="Name of the service, that the current state update belongs to",
+        required=False
+    )
+    state = graphene.Field(
+        ResultStep,
+        description="State update for the service",
+        required=False
+    )
+
+
+class ProjectStartStopResult(graphene.ObjectType):
+    """The result of starting or stopping one of multiple projects."""
+    def __init__(self, project, error_string=None, is_fatal_error=False, failed_services=None, *args, **kwargs):
+        self.project = project
+        self.error_string = error_string
+        self.is_fatal_error = is_fatal_error
+        self.failed_services = failed_services or []
+        super().__init__(project, error_string, is_fatal_error, self.failed_services, *args, **kwargs)
+
+    project = graphene.Field(
+        graphene.String,
+        description="Name of the project",
+        required=True
+    )
+    error_string = graphene.Field(
+        graphene.String,
+        description="Error message on fatal errors.",
+        required=False
+    )
+    is_fatal_error = graphene.Field(
+        graphene.Boolean,
+        description="If true, starting or stopping the project failed fatally. "
+                    "Even services that are not in failed_services may not be started or stopped.",
+        required=True
+    )
+    failed_services = graphene.Field(
+        graphene.List(graphene.String),
+        description="Services that could not be started or stopped.",
+        required=True
+    )
+
+
+class ProjectsStartStopEndStep(graphene.ObjectType):
+    """The end of starting or stopping multiple projects, with the result of every project."""
+    def __init__(self, results, *args, **kwargs):
+        self.results = results
+        super().__init__(results, *args, **kwargs)
+
+    results = graphene.Field(
+        graphene.List(ProjectStartStopResult),
+        description="Results of the projects, in the order they were requested.",
+        required=True
+    )
+
+
+class ProjectsStartStopResultStep(graphene.Union):
+    """
+    A status update for the subscriptions starting or stopping multiple projects
+
+    Usually ProjectsStartStopProgressStep is sent, to indicate progress of a single service of a project.
+
+    ProjectsStartStopEndStep is sent as last update. After that the client should stop subscribing.
+    """
+    class Meta:
+        types = (ProjectsStartStopProgressStep, ProjectsStartStopEndStep)
@@ -0,0 +1,204 @@
+"""
+Pulling of single images, with structured progress, for pulling the images of a project in parallel.
+
+Pulls report Docker pull progress events, eg. {'status': 'Downloading', 'id': LAYER,
+'progressDetail': {'current': BYTES, 'total': BYTES}}. Engines can pull single images themselves by
+implementing pull_image(image, update_func), which reports such events. Otherwise images are pulled with
+the Docker SDK, if it is installed.
+
+An image that is already being pulled, eg. by updateImages of another project, is not pulled again.
+The running pull is joined instead.
+"""
+import threading
+from typing import Callable, Dict, List, Optional
+
+from riptide.config.document.project import Project
+
+# Statuses of ImagePull
+WAITING = 'waiting'
+PULLING = 'pulling'
+DONE = 'done'
+NOT_FOUND = 'not_found'
+FAILED = 'failed'
+
+# Statuses of progress events, that belong to a layer. Other events with an id belong to the image.
+_LAYER_STATUSES = ('Pulling fs layer', 'Waiting', 'Downloading', 'Verifying Checksum', 'Download complete',
+                   'Extracting', 'Pull complete', 'Already exists')
+# Statuses of layers, after which the layer is downloaded or complete
+_LAYER_DOWNLOADED = ('Verifying Checksum', 'Download complete', 'Extracting')
+_LAYER_DONE = ('Pull complete', 'Already exists')
+# Share of the progress of a layer, that is its download. The rest is extracting it.
+_DOWNLOAD_SHARE = 0.9
+
+PullFunction = Callable[[str, Callable[[dict], None]], None]
+
+
+class ImageNotFoundError(Exception):
+    """Raised by pull functions, if the image does not exist. This is a warning, not an error."""
+
+
+class _Layer:
+    __slots__ = ('current', 'total', 'done')
+
+    def __init__(self):
+        self.current = 0
+        self.total = 0
+        self.done = False
+
+
+class ImagePull:
+    """State of pulling a single image. Listeners are called with the pull after every change."""
+    def __init__(self, image: str):
+        self.image = image
+        self.status = WAITING
+        self.error: Optional[str] = None
+        self._layers: Dict[str, _Layer] = {}
+        self._listeners: List[Callable[['ImagePull'], None]] = []
+        self._finished = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self._finished.is_set()
+
+    def add_listener(self, listener: Callable[['ImagePull'], None]):
+        with self._lock:
+            self._listeners.append(listener)
+        listener(self)
+
+    def remove_listener(self, listener: Callable[['ImagePull'], None]):
+        with self._lock:
+            self._listeners.remove(listener)
+
+    def update(self, event: dict):
+        """Applies a Docker pull progress event."""
+        status = event.get('status', '')
+        with self._lock:
+            self.status = PULLING
+            if event.get('id') and status in _LAYER_STATUSES:
+                layer = self._layers.setdefault(event['id'], _Layer())
+                detail = event.get('progressDetail') or {}
+                if status == 'Downloading' and detail.get('total'):
+                    layer.current = detail.get('current', 0)
+                    layer.total = detail['total']
+                elif status in _LAYER_DOWNLOADED or status in _LAYER_DONE:
+                    layer.current = layer.total
+                layer.done = layer.done or status in _LAYER_DONE
+        self._notify()
+
+    def finish(self, status: str, error: str = None):
+        with self._lock:
+            self.status = status
+            self.error = error
+            for layer in self._layers.values():
+                layer.current = layer.total
+        self._finished.set()
+        self._notify()
+
+    def wait(self):
+        self._finished.wait()
+
+    def _notify(self):
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(self)
+
+    def progress(self) -> dict:
+        """Returns the layer counts and bytes of the pull, and its progress between 0 and 1."""
+        with self._lock:
+            layers = list(self._layers.values())
+            finished = self._finished.is_set()
+        fraction = 1.0 if finished else 0.0
+        if layers and not finished:
+            fraction = sum(
+                1.0 if layer.done else _DOWNLOAD_SHARE * layer.current / layer.total if layer.total else 0.0
+                for layer in layers
+            ) / len(layers)
+        return {
+            'layers_done': sum(1 for layer in layers if layer.done),
+            'layers_total': len(layers),
+            'bytes_done': sum(layer.current for layer in layers),
+            'bytes_total': sum(layer.total for layer in layers),
+            'fraction': fraction,
+        }
+
+
+class ImagePuller:
+    """Pulls images, so that every image is only pulled once at a time, no matter how many operations need it."""
+    def __init__(self):
+        self._pulls: Dict[str, ImagePull] = {}
+        self._lock = threading.Lock()
+
+    def pull(self, image: str, pull_func: PullFunction, listener: Callable[[ImagePull], None]) -> ImagePull:
+        """
+        Pulls image with pull_func, or joins the pull of the image that is already running.
+        Blocks until the image is pulled. listener is called with the pull after every change.
+        """
+        with self._lock:
+            pull = self._pulls.get(image)
+            owner = pull is None
+            if owner:
+                pull = ImagePull(image)
+                self._pulls[image] = pull
+        pull.add_listener(listener)
+        try:
+            if not owner:
+                pull.wait()
+                return pull
+            try:
+                pull_func(image, pull.update)
+            except ImageNotFoundError as ex:
+                pull.finish(NOT_FOUND, str(ex))
+            except Exception as ex:
+                pull.finish(FAILED, str(ex))
+            else:
+                pull.finish(DONE)
+            finally:
+                with self._lock:
+                    del self._pulls[image]
+            return pull
+        finally:
+            pull.remove_listener(listener)
+
+
+def images_of(project: Project) -> Dict[str, List[str]]:
+    """Returns the images of the services and commands of the project, with the services and commands using them."""
+    images: Dict[str, List[str]] = {}
+    for name, service in project['app']['services'].items():
+        images.setdefault(service['image'], []).append(f'service/{name}')
+    if 'commands' in project['app']:
+        for name, command in project['app']['commands'].items():
+            if 'image' in command:
+                images.setdefault(command['image'], []).append(f'command/{name}')
+    return images
+
+
+def pull_function(engine) -> Optional[PullFunction]:
+    """Returns the function to pull single images with, or None if single images can not be pulled."""
+    if hasattr(engine, 'pull_image'):
+        return engine.pull_image
+    try:
+        import docker
+    except ImportError:
+        return None
+    return _docker_pull
+
+
+def _docker_pull(image: str, update_func: Callable[[dict], None]):
+    import docker
+    from docker.utils import parse_repository_tag
+    repository, tag = parse_repository_tag(image)
+    client = docker.from_env()
+    try:
+        for event in client.api.pull(repository, tag=tag or 'latest', stream=True, decode=True):
+            if 'error' in event:
+                raise RuntimeError(event['error'])
+            update_func(event)
+    except docker.errors.NotFound as ex:
+        raise ImageNotFoundError("Image not found in repository.") from ex
+    finally:
+        client.close()
+
+
+image_puller = ImagePuller()
@@ -0,0 +1,68 @@
+"""Pre-serialised responses to introspection queries, which never change for a schema instance"""
+import hashlib
+from typing import Dict, Optional, Tuple
+
+from graphql.language import ast
+from tornado.escape import json_encode
+
+from riptide_mission_control.document_cache import document_cache
+
+# Maximum number of different introspection queries to cache responses for
+MAX_INTROSPECTION_RESPONSES = 16
+
+_INTROSPECTION_FIELDS = ('__schema', '__typename')
+
+
+def is_introspection_document(document_ast: ast.Document, operation_name: Optional[str]) -> bool:
+    """
+    Returns whether the operation to execute is a query without variables, that only selects __schema
+    (and __typename) on the root type. The result of such queries only depends on the schema.
+    """
+    operations = [definition for definition in document_ast.definitions
+                  if isinstance(definition, ast.OperationDefinition)
+                  and (operation_name is None or (definition.name and definition.name.value == operation_name))]
+    if len(operations) != 1:
+        return False
+    operation = operations[0]
+    if operation.operation != 'query' or operation.variable_definitions:
+        return False
+    return all(isinstance(selection, ast.Field) and selection.name.value in _INTROSPECTION_FIELDS
+               for selection in operation.selection_set.selections)
+
+
+class IntrospectionCache:
+    """
+    Caches the serialised responses of introspection queries, by schema, query string and operation name.
+    The response body is stored together with its ETag.
+    """
+    def __init__(self):
+        self._responses: Dict[Tuple[object, str, Optional[str]], Tuple[str, str]] = {}
+
+    def response(self, schema, query: Optional[str], operation_name: Optional[str]) -> Optional[Tuple[str, str]]:
+        """
+        Returns the response body and ETag, if the query is an introspection query.
+        Returns None for all other queries and introspection queries that failed.
+        """
+        if not isinstance(query, str) or '__schema' not in query:
+            return None
+        key = (schema, query.strip(), operation_name)
+        if key not in self._responses:
+            try:
+                document = document_cache.document_from_string(schema, query)
+            except Exception:
+                # Syntax errors are reported by the regular execution
+                return None
+            if not is_introspection_document(document.document_ast, operation_name):
+                return None
+            result = document.execute(operation_name=operation_name)
+            if result.errors or result.invalid:
+                return None
+            body = json_encode({'data': result.data})
+            etag = '"' + hashlib.sha1(body.encode('utf-8')).hexdigest() + '"'
+            if len(self._responses) < MAX_INTROSPECTION_RESPONSES:
+                self._responses[key] = (body, etag)
+            return body, etag
+        return self._responses[key]
+
+
+introspection_cache = IntrospectionCache()
@@ -1,24 +1,32 @@
+# Only import what is needed for --help and --version here. Everything else is imported when it is needed,
+# see benchmarks/startup.py.
 import os
+import signal
 import click
 import logging
-import pkg_resources
 from click import ClickException, echo
 
-from riptide.config.document.config import Config
-from riptide.config.files import riptide_main_config_file
-from riptide.engine.loader import load_engine
-from riptide.util import get_riptide_version_raw
-from riptide_mission_control import LOGGER_NAME, PORT
-from riptide_mission_control.privileges import drop_privileges
+from riptide_mission_control import LOGGER_NAME, PORT, STALL_THRESHOLD, QUERY_MAX_COST, QUERY_MAX_DEPTH, \
+    QUERY_COST_BUDGET, CONTAINER_ACTION_CONCURRENCY
 
 # Configure logger
 logging.basicConfig()
 logger = logging.getLogger(LOGGER_NAME)
 
 
+def _distribution_version(distribution: str) -> str:
+    try:
+        from importlib.metadata import version
+    except ImportError:
+        # Python < 3.8
+        import pkg_resources
+        return pkg_resources.get_distribution(distribution).version
+    return version(distribution)
+
+
 def print_version():
-    echo(f"riptide_lib: {get_riptide_version_raw()}")
-    echo(f"riptide_mission_control: {pkg_resources.get_distribution('riptide_mission_control').version}")
+    echo(f"riptide_lib: {_distribution_version('riptide_lib')}")
+    echo(f"riptide_mission_control: {_distribution_version('riptide_mission_control')}")
 
 
 @click.command()
@@ -33,7 +41,81 @@ def print_version():
               help="Log level. Default: INFO")
 @click.option('--port', '-p', default=PORT,
               help="Port, default: 8484")
-def main(user, loglevel, port, version=False):
+@click.option('--trace-resolvers', is_flag=True,
+              help="Trace all GraphQL resolvers and collect per-field duration statistics, "
+                   "available via the resolverStatistics query.")
+@click.option('--slow-threshold', type=int, default=None,
+              help="Log GraphQL operations that take longer than this many milliseconds, "
+                   "with their slowest resolvers. Disabled by default.")
+@click.option('--detect-stalls', is_flag=True,
+              help="Detect and log when the event loop is blocked, including the blocking stack.")
+@click.option('--stall-threshold', type=int, default=STALL_THRESHOLD,
+              help=f"Time in milliseconds the event loop has to be blocked to be reported by --detect-stalls. "
+                   f"Default: {STALL_THRESHOLD}")
+@click.option('--profile', type=click.Path(dir_okay=False, writable=True), default=None,
+              help="Profile the server and write the profile to this file on shutdown. "
+                   "Files ending in .json are written in the speedscope format using a sampling profiler "
+                   "for all threads, other files in the pstats format using cProfile for the main thread.")
+@click.option('--debug-token', envvar='RIPTIDE_MC_DEBUG_TOKEN',
+              help="Enable the /debug endpoints (eg. /debug/profile) for requests from localhost, "
+                   "that send this token as bearer token. Defaults to environment variable RIPTIDE_MC_DEBUG_TOKEN.")
+@click.option('--warm-up', is_flag=True,
+              help="After starting, load all projects and their status and pre-parse queries in the background. "
+                   "/ready returns 200 once this is done.")
+@click.option('--warm-up-queries', type=click.Path(exists=True, file_okay=False), default=None,
+              help="Directory with *.graphql files, one query each, to pre-parse during --warm-up. "
+                   "The files must contain the queries exactly as the clients send them.")
+@click.option('--engine', default=None,
+              help="Engine to use instead of the engine in the configuration. "
+                   "'fake' is an in-memory engine that only simulates containers, for benchmarks and load tests. "
+                   "'replay' answers engine calls from a trace recorded with --record-engine, see --replay-trace.")
+@click.option('--fake-latency', multiple=True, metavar='[METHOD=]MS',
+              help="--engine fake: Latency of engine calls in milliseconds. "
+                   "Either for all calls or for one method, eg. start_project=2000. Can be repeated.")
+@click.option('--fake-jitter', multiple=True, metavar='[METHOD=]MS',
+              help="--engine fake: Maximum random deviation from the latency in milliseconds. Can be repeated.")
+@click.option('--fake-failure-rate', multiple=True, metavar='[METHOD=]RATE',
+              help="--engine fake: Probability of engine calls failing, between 0 and 1. Can be repeated.")
+@click.option('--fake-seed', type=int, default=None,
+              help="--engine fake: Seed for the random jitter and failures, for reproducible runs.")
+@click.option('--record-engine', type=click.Path(dir_okay=False, writable=True), default=None,
+              help="Record all engine calls with their arguments, results and timings to this trace file. "
+                   "Files ending in .gz are compressed.")
+@click.option('--replay-trace', type=click.Path(exists=True, dir_okay=False), default=None,
+              help="--engine replay: Trace file to replay.")
+@click.option('--replay-time-scale', type=float, default=1.0,
+              help="--engine replay: Factor for the recorded durations of the engine calls. "
+                   "0 answers immediately. Default: 1")
+@click.option('--max-query-cost', type=int, default=QUERY_MAX_COST,
+              help=f"Reject GraphQL operations with a higher static cost. 0 disables the limit. "
+                   f"Default: {QUERY_MAX_COST}")
+@click.option('--max-query-depth', type=int, default=QUERY_MAX_DEPTH,
+              help=f"Reject GraphQL operations with deeper selections. 0 disables the limit. "
+                   f"Default: {QUERY_MAX_DEPTH}")
+@click.option('--query-cost-budget', type=int, default=QUERY_COST_BUDGET,
+              help="Cost each client may spend per minute. Clients over their budget get a 429 response. "
+                   "Disabled by default.")
+@click.option('--query-cost-weight', multiple=True, metavar='TYPE.FIELD=COST',
+              help="Cost of a field, eg. Service.running=20. Can be repeated.")
+@click.option('--max-heavy-operations', multiple=True, metavar='[OPERATION=]N',
+              help="Number of updateImages, projectDbCopy or updateRepositories operations running at once, "
+                   "further operations are queued. Either for all or for one operation, eg. updateImages=1. "
+                   "0 for no limit. Can be repeated. Default: 2")
+@click.option('--max-heavy-operations-per-client', multiple=True, metavar='[OPERATION=]N',
+              help="Like --max-heavy-operations, but for the operations of a single client. Default: 1")
+@click.option('--heavy-operation-rate', multiple=True, metavar='[OPERATION=]N',
+              help="Number of heavy operations a single client may start per minute, further operations fail. "
+                   "0 for no limit. Can be repeated. Disabled by default.")
+@click.option('--max-container-actions', type=int, default=CONTAINER_ACTION_CONCURRENCY,
+              help=f"Number of containers started or stopped at once, for all projects together. "
+                   f"Further services wait for a free slot. 0 for no limit. Default: {CONTAINER_ACTION_CONCURRENCY}")
+def main(user, loglevel, port, version=False, trace_resolvers=False, slow_threshold=None,
+         detect_stalls=False, stall_threshold=STALL_THRESHOLD, profile=None, debug_token=None,
+         warm_up=False, warm_up_queries=None, engine=None, fake_latency=(), fake_jitter=(),
+         fake_failure_rate=(), fake_seed=None, record_engine=None, replay_trace=None, replay_time_scale=1.0,
+         max_query_cost=QUERY_MAX_COST, max_query_depth=QUERY_MAX_DEPTH, query_cost_budget=QUERY_COST_BUDGET,
+         query_cost_weight=(), max_heavy_operations=(), max_heavy_operations_per_client=(),
+         heavy_operation_rate=(), max_container_actions=CONTAINER_ACTION_CONCURRENCY):
     """
     GraphQL API server for Riptide Projects.
 
@@ -41,24 +123,30 @@ def main(user, loglevel, port, version=False):
     """
 
     logger.setLevel(logging.getLevelName(loglevel))
-    from riptide_mission_control.server.starter import run_apiserver
 
     # Version flag
     if version:
         print_version()
         exit()
 
+    query_cost_weights = _parse_query_cost_weights(query_cost_weight)
+
     # Set privileges and drop back to user level
     try:
         if os.getuid() == 0:
             if not user:
                 raise ClickException("--user parameter required when running as root.")
             logger.info(f"Was running as root. Changing user to {user}.")
+            from riptide_mission_control.privileges import drop_privileges
             drop_privileges(user)
     except AttributeError:
         # Windows. Ignore.
         pass
 
+    from riptide.config.document.config import Config
+    from riptide.config.files import riptide_main_config_file
+    from riptide_mission_control.server.starter import run_apiserver
+
     # Read system config
     try:
         config_path = riptide_main_config_file()
@@ -69,15 +157,101 @@ def main(user, loglevel, port, version=False):
     except Exception as e:
         raise ClickException("Error reading configuration.") from e
 
+    # Read admission control limits
+    from riptide_mission_control.graphql_entities.subscriptions.admission import parse_limits
+    try:
+        admission_limits = parse_limits(max_heavy_operations, max_heavy_operations_per_client, heavy_operation_rate)
+    except ValueError as ex:
+        raise ClickException(f'Invalid heavy operation limit: {ex}') from ex
+
     # Read engine
+    engine = _load_engine(engine or system_config["engine"], fake_latency, fake_jitter, fake_failure_rate, fake_seed,
+                          replay_trace, replay_time_scale)
+    if record_engine:
+        from riptide_mission_control.engines.recording import RecordingEngine
+        engine = RecordingEngine(engine, record_engine)
+        logger.info(f"Recording engine calls to {record_engine}.")
+
+    # Run API server
+    profiler = None
+    if profile:
+        from riptide_mission_control.profiling import create_profiler, profile_format_for_path
+        profiler = create_profiler(profile_format_for_path(profile))
+        # Make sure the profile is also written when terminated
+        signal.signal(signal.SIGTERM, _exit_on_signal)
+        logger.info(f"Profiling. The profile will be written to {profile} on shutdown.")
+        profiler.start()
+    try:
+        run_apiserver(
+            system_config,
+            engine,
+            port,
+            trace_resolvers=trace_resolvers,
+            slow_threshold=slow_threshold,
+            stall_threshold=stall_threshold if detect_stalls else None,
+            debug_token=debug_token,
+            warm_up=warm_up,
+            warm_up_queries=warm_up_queries,
+            max_query_cost=max_query_cost,
+            max_query_depth=max_query_depth,
+            query_cost_budget=query_cost_budget,
+            query_cost_weights=query_cost_weights,
+            admission_limits=admission_limits,
+            max_container_actions=max_container_actions
+        )
+    finally:
+        if record_engine:
+            engine.writer.close()
+        if profiler:
+            profiler.stop()
+            with open(profile, 'wb') as f:
+                f.write(profiler.result())
+            logger.info(f"Profile written to {profile}.")
+
+
+def _parse_query_cost_weights(values):
+    weights = {}
+    for value in values:
+        field, _, cost = value.partition('=')
+        type_name, _, field_name = field.partition('.')
+        try:
+            weights[field] = int(cost)
+        except ValueError:
+            raise click.BadParameter(f"Invalid cost in {value}.", param_hint='--query-cost-weight')
+        if not type_name or not field_name:
+            raise click.BadParameter(f"Invalid field in {value}, must be TYPE.FIELD.",
+                                     param_hint='--query-cost-weight')
+    return weights
+
+
+def _load_engine(name, fake_latency, fake_jitter, fake_failure_rate, fake_seed, replay_trace, replay_time_scale):
+    if name == 'fake':
+        from riptide_mission_control.engines.fake import FakeEngine, parse_behaviours
+        try:
+            default, behaviours = parse_behaviours(fake_latency, fake_jitter, fake_failure_rate)
+        except ValueError as ex:
+            raise ClickException(f'Invalid fake engine option: {ex}') from ex
+        logger.warning("Using the fake engine. No containers are started or stopped.")
+        return FakeEngine(default, behaviours, fake_seed)
+
+    if name == 'replay':
+        if not replay_trace:
+            raise ClickException('--engine replay requires --replay-trace.')
+        from riptide_mission_control.engines.recording import ReplayEngine
+        try:
+            engine = ReplayEngine(replay_trace, replay_time_scale)
+        except ValueError as ex:
+            raise ClickException(str(ex)) from ex
+        logger.warning(f"Replaying {len(engine.calls)} engine calls from {replay_trace}. "
+                       f"No containers are started or stopped.")
+        return engine
+
+    from riptide.engine.loader import load_engine
     try:
-        engine = load_engine(system_config["engine"])
+        return load_engine(name)
     except NotImplementedError as ex:
-        raise ClickException('Unknown engine specified in configuration.') from ex
+        raise ClickException(f'Unknown engine {name}.') from ex
 
-    # Run API server
-    run_apiserver(
-        system_config,
-        engine,
-        port
-    )
+
+def _exit_on_signal(signum, frame):
+    raise SystemExit(0)
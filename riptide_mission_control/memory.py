@@ -0,0 +1,130 @@
+"""
+Memory diagnostics: tracemalloc snapshots and their differences, and the approximate size of the server's caches.
+
+Tracing allocations slows down the server considerably, so tracemalloc is only started on request.
+"""
+import gc
+import sys
+import tracemalloc
+from collections import OrderedDict
+from types import ModuleType, FunctionType, BuiltinFunctionType, MethodType
+from typing import Callable, Dict, List, Tuple, Any
+
+# Number of frames to store per traced allocation
+MEMORY_TRACE_FRAMES = 1
+# Maximum number of named snapshots kept, the oldest snapshot is dropped first
+MAX_MEMORY_SNAPSHOTS = 10
+# Maximum number of objects visited when computing the approximate size of a cache
+MAX_SIZE_OBJECTS = 1000000
+
+# Objects shared by everything, that are not counted as part of a cache
+_SHARED_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType)
+
+
+def approximate_size(obj: Any) -> Tuple[int, int]:
+    """
+    Returns the number of objects reachable from obj and their total size in bytes.
+    Types, modules and functions are not followed. Objects are counted once.
+    """
+    seen = set()
+    pending = [obj]
+    size = 0
+    while pending and len(seen) < MAX_SIZE_OBJECTS:
+        current = pending.pop()
+        if isinstance(current, _SHARED_TYPES) or id(current) in seen:
+            continue
+        seen.add(id(current))
+        size += sys.getsizeof(current)
+        pending.extend(gc.get_referents(current))
+    return len(seen), size
+
+
+class CacheRegistry:
+    """
+    Caches of the server register a callback here, that returns the number of entries of the cache and
+    the object holding them.
+    """
+    def __init__(self):
+        self.caches: Dict[str, Callable[[], Tuple[int, Any]]] = OrderedDict()
+
+    def register(self, name: str, callback: Callable[[], Tuple[int, Any]]):
+        self.caches[name] = callback
+
+    def report(self) -> List[dict]:
+        """Returns the number of entries, number of reachable objects and their approximate size for each cache."""
+        report = []
+        for name, callback in self.caches.items():
+            entries, holder = callback()
+            objects, size = approximate_size(holder)
+            report.append({
+                "cache": name,
+                "entries": entries,
+                "objects": objects,
+                "approximate_size": size
+            })
+        return report
+
+
+cache_registry = CacheRegistry()
+
+
+class MemoryDiagnostics:
+    """Starts and stops tracemalloc and manages named snapshots."""
+    def __init__(self):
+        self.snapshots: Dict[str, tracemalloc.Snapshot] = OrderedDict()
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = MEMORY_TRACE_FRAMES):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self):
+        """Stops tracing. Snapshots taken before are kept."""
+        tracemalloc.stop()
+
+    def take_snapshot(self, name: str):
+        if not tracemalloc.is_tracing():
+            raise ValueError("Memory tracing is not started.")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+        self.snapshots.pop(name, None)
+        self.snapshots[name] = snapshot
+        while len(self.snapshots) > MAX_MEMORY_SNAPSHOTS:
+            self.snapshots.popitem(last=False)
+
+    def diff(self, old: str, new: str, group_by: str = 'lineno', top: int = 20) -> List[dict]:
+        """
+        Returns the top allocation differences between the snapshots old and new, largest growth first.
+        group_by is either 'lineno' or 'filename'.
+        """
+        for name in (old, new):
+            if name not in self.snapshots:
+                raise KeyError(f"Snapshot {name} does not exist.")
+        stats = self.snapshots[new].compare_to(self.snapshots[old], group_by)
+        return [{
+            "file": stat.traceback[0].filename,
+            "line": stat.traceback[0].lineno if group_by == 'lineno' else None,
+            "size": stat.size,
+            "size_diff": stat.size_diff,
+            "count": stat.count,
+            "count_diff": stat.count_diff
+        } for stat in stats[:top]]
+
+    def status(self) -> dict:
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": self.tracing,
+            "traced_memory": current,
+            "traced_memory_peak": peak,
+            "snapshots": list(self.snapshots.keys()),
+            "caches": cache_registry.report()
+        }
+
+
+memory_diagnostics = MemoryDiagnostics()
@@ -0,0 +1,275 @@
+"""
+Runtime metrics, exported in the Prometheus text format.
+
+Recording a value costs one uncontended lock acquisition. Gauges that describe the current state of the
+server are implemented as callbacks and only evaluated when the metrics are scraped.
+"""
+import time
+import re
+from bisect import bisect_left
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+from riptide_mission_control import METRICS_MAX_OPERATION_LABELS
+from tornadoql.tornadoql import SETTINGS
+
+DEFAULT_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames: Tuple[str, ...], labelvalues: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+        metrics_registry.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError()
+
+    def render(self) -> str:
+        return '\n'.join([f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+                         + self.samples())
+
+
+class Counter(_Metric):
+    """A value that only ever increases."""
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in list(self._values.items())]
+
+
+class Gauge(_Metric):
+    """A value that can go up and down. If a callback is given, it is called on every scrape instead."""
+    type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float] = None):
+        super().__init__(name, documentation)
+        self.callback = callback
+        self._value = 0.0
+
+    def set(self, value: float):
+        self._value = value
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1):
+        self.inc(-amount)
+
+    def get(self) -> float:
+        if self.callback is not None:
+            return self.callback()
+        return self._value
+
+    def samples(self) -> List[str]:
+        return [f'{self.name} {_format_value(self.get())}']
+
+
+class Histogram(_Metric):
+    """Counts observed values in buckets, see the Prometheus histogram type."""
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label combination: [non-cumulative bucket counts..., +Inf count], sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            counts, total = self._values[key]
+            counts[index] += 1
+            total[0] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in list(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total[0])}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric):
+        self.metrics.append(metric)
+
+    def render(self) -> str:
+        """Returns all metrics in the Prometheus text exposition format."""
+        return '\n'.join(metric.render() for metric in self.metrics) + '\n'
+
+
+metrics_registry = MetricsRegistry()
+
+
+class BoundedLabelValues:
+    """
+    Limits the number of distinct values of a label, whose values are supplied by clients.
+    The first max_values valid values are used as they are, all others are replaced by 'other'.
+    """
+    OTHER = 'other'
+    _VALID_RE = re.compile(r'^[_A-Za-z][_0-9A-Za-z]{0,63}$')
+
+    def __init__(self, max_values: int):
+        self.max_values = max_values
+        self._values: Set[str] = set()
+        self._lock = Lock()
+
+    def label(self, value: str) -> str:
+        # Values come from request bodies, so they may not even be strings
+        if not isinstance(value, str) or not self._VALID_RE.match(value):
+            return self.OTHER
+        if value in self._values:
+            return value
+        with self._lock:
+            if len(self._values) >= self.max_values:
+                return self.OTHER
+            self._values.add(value)
+        return value
+
+
+# Values of the operation label of all metrics
+operation_labels = BoundedLabelValues(METRICS_MAX_OPERATION_LABELS)
+
+REQUEST_DURATION = Histogram(
+    'riptide_mc_graphql_request_duration_seconds',
+    'Duration of GraphQL queries and mutations, by operation name.',
+    ['operation']
+)
+SUBSCRIPTION_START_DURATION = Histogram(
+    'riptide_mc_graphql_subscription_start_duration_seconds',
+    'Duration of starting GraphQL subscriptions, by operation name.',
+    ['operation']
+)
+PROJECT_CACHE_HITS = Counter(
+    'riptide_mc_project_cache_hits_total',
+    'Number of projects served from the project cache.'
+)
+PROJECT_CACHE_MISSES = Counter(
+    'riptide_mc_project_cache_misses_total',
+    'Number of projects that had to be loaded, because they were not in the project cache or expired.'
+)
+PROJECT_CACHE_EVICTIONS = Counter(
+    'riptide_mc_project_cache_evictions_total',
+    'Number of projects removed from the project cache, because they expired or the cache was flushed.'
+)
+ENGINE_CALLS = Counter(
+    'riptide_mc_engine_calls_total',
+    'Number of calls to the engine, by method.',
+    ['method']
+)
+ENGINE_ERRORS = Counter(
+    'riptide_mc_engine_errors_total',
+    'Number of calls to the engine that raised an error, by method.',
+    ['method']
+)
+ENGINE_CALL_DURATION = Histogram(
+    'riptide_mc_engine_call_duration_seconds',
+    'Duration of calls to the engine, by method. For start and stop this includes waiting for all results.',
+    ['method']
+)
+WEBSOCKET_CONNECTIONS = Gauge(
+    'riptide_mc_websocket_connections',
+    'Number of open websocket connections.',
+    lambda: len(SETTINGS['sockets'])
+)
+ACTIVE_SUBSCRIPTIONS = Gauge(
+    'riptide_mc_active_subscriptions',
+    'Number of active GraphQL subscriptions over all websocket connections.',
+    lambda: sum(len(subscriptions) for subscriptions in list(SETTINGS['subscriptions'].values()))
+)
+CACHE_HITS = Counter(
+    'riptide_mc_cache_hits_total',
+    'Number of lookups served from a cache, by cache. See riptide_mc_project_cache_hits_total for the project cache.',
+    ['cache']
+)
+CACHE_MISSES = Counter(
+    'riptide_mc_cache_misses_total',
+    'Number of lookups that were not served from a cache, by cache.',
+    ['cache']
+)
+CACHE_EVICTIONS = Counter(
+    'riptide_mc_cache_evictions_total',
+    'Number of entries removed from a cache, because they expired, the cache was full or flushed, by cache.',
+    ['cache']
+)
+
+QUERY_COST = Histogram(
+    'riptide_mc_graphql_query_cost',
+    'Static cost of the GraphQL operations accepted by the cost analysis, by operation name.',
+    ['operation'],
+    buckets=(10, 50, 100, 500, 1000, 2500, 5000, 10000, 25000, 100000)
+)
+QUERY_COST_REJECTIONS = Counter(
+    'riptide_mc_graphql_query_cost_rejections_total',
+    'Number of GraphQL operations rejected by the cost analysis, by reason (depth, cost or budget).',
+    ['reason']
+)
+
+
+def cache_statistic(cache: str, entries: int, oldest_entry_time: float, hits: float, misses: float,
+                    evictions: float) -> dict:
+    """Returns the statistics of a cache. The age of the oldest entry is in seconds and None if it is empty."""
+    lookups = hits + misses
+    return {
+        "cache": cache,
+        "entries": entries,
+        "hits": int(hits),
+        "misses": int(misses),
+        "hit_rate": hits / lookups if lookups > 0 else None,
+        "evictions": int(evictions),
+        "age": time.time() - oldest_entry_time if oldest_entry_time is not None else None
+    }
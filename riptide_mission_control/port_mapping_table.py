@@ -0,0 +1,68 @@
+"""In-memory cache of the additional port mappings Riptide stores in ports.json"""
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from riptide.config.files import riptide_ports_config_file
+from riptide_mission_control.memory import cache_registry
+
+
+class PortMappingTable:
+    """
+    Holds the port requests of ports.json in memory.
+
+    The file is only read again, when its modification time or size changed.
+    """
+    def __init__(self):
+        self._file_signature: Optional[Tuple[int, int]] = None
+        self._requests: Dict[str, Dict[str, Dict[str, int]]] = {}
+
+    def refresh(self):
+        """Reloads ports.json, if it changed since it was last loaded."""
+        try:
+            stat = os.stat(riptide_ports_config_file())
+        except FileNotFoundError:
+            self._file_signature = None
+            self._requests = {}
+            return
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature != self._file_signature:
+            with open(riptide_ports_config_file(), mode='r') as file:
+                self._requests = json.load(file).get("requests", {})
+            self._file_signature = signature
+
+    def lookup(self, project_name: str, service_name: str, host_starts: Iterable[int]) -> Dict[int, Optional[int]]:
+        """
+        Returns the bound host ports for the requested start ports of a service.
+        Start ports that were never bound are mapped to None.
+        """
+        self.refresh()
+        service_requests = self._requests.get(project_name, {}).get(service_name, {})
+        return {host_start: service_requests.get(str(host_start)) for host_start in host_starts}
+
+    def all_bound(self) -> List[dict]:
+        """Returns all bound host ports of all projects and services, ordered by bound host port."""
+        self.refresh()
+        bound = []
+        for project_name, services in self._requests.items():
+            for service_name, ports in services.items():
+                for host_start, host_bound in ports.items():
+                    bound.append({
+                        "project": project_name,
+                        "service": service_name,
+                        "host_start": int(host_start),
+                        "host_bound": host_bound
+                    })
+        return sorted(bound, key=lambda entry: entry["host_bound"])
+
+    def flush(self):
+        self._file_signature = None
+        self._requests = {}
+
+    def memory_usage(self):
+        """Returns the number of projects and the cached requests."""
+        return len(self._requests), self._requests
+
+
+port_mapping_table = PortMappingTable()
+cache_registry.register('port_mappings', port_mapping_table.memory_usage)
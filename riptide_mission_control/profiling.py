@@ -0,0 +1,136 @@
+"""
+Profiling of the running server.
+
+Two profilers are available:
+
+- deterministic: cProfile, profiles only the thread it was started in (the IOLoop thread). Result is a
+  pstats file.
+- sampling: Periodically samples the stacks of all threads (including executor threads running
+  subscriptions). Result is a speedscope (https://www.speedscope.app/) JSON file.
+"""
+import cProfile
+import json
+import marshal
+import sys
+import threading
+import time
+from typing import Dict, List, Tuple
+
+PROFILE_FORMAT_PSTATS = 'pstats'
+PROFILE_FORMAT_SPEEDSCOPE = 'speedscope'
+
+# Seconds between two samples of the sampling profiler
+SAMPLING_INTERVAL = 0.005
+
+
+class DeterministicProfiler:
+    """Profiles the current thread with cProfile."""
+    format = PROFILE_FORMAT_PSTATS
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+
+    def stop(self):
+        self._profile.disable()
+
+    def result(self) -> bytes:
+        """Returns the profile in the pstats file format."""
+        self._profile.create_stats()
+        return marshal.dumps(self._profile.stats)
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads in a background thread."""
+    format = PROFILE_FORMAT_SPEEDSCOPE
+
+    def __init__(self, interval: float = SAMPLING_INTERVAL):
+        self.interval = interval
+        self._frames: Dict[Tuple[str, str, int], int] = {}
+        self._frame_list: List[dict] = []
+        # Per thread ident: list of sampled stacks and list of their weights
+        self._samples: Dict[int, Tuple[List[List[int]], List[float]]] = {}
+        self._thread_names: Dict[int, str] = {}
+        self._stopped = threading.Event()
+        self._thread = None
+        self._start = None
+        self._end = None
+
+    def start(self):
+        self._start = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='riptide-mc-sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._end = time.perf_counter()
+
+    def _frame_index(self, frame) -> int:
+        code = frame.f_code
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        if key not in self._frames:
+            self._frames[key] = len(self._frame_list)
+            self._frame_list.append({"name": key[0], "file": key[1], "line": key[2]})
+        return self._frames[key]
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stopped.wait(self.interval):
+            now = time.perf_counter()
+            weight = now - last
+            last = now
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_index(frame))
+                    frame = frame.f_back
+                stack.reverse()
+                if ident not in self._samples:
+                    self._samples[ident] = ([], [])
+                self._samples[ident][0].append(stack)
+                self._samples[ident][1].append(weight)
+            for thread in threading.enumerate():
+                self._thread_names[thread.ident] = thread.name
+
+    def result(self) -> bytes:
+        """Returns the profile in the speedscope file format."""
+        end_value = (self._end or time.perf_counter()) - self._start
+        profiles = []
+        for ident, (samples, weights) in self._samples.items():
+            profiles.append({
+                "type": "sampled",
+                "name": self._thread_names.get(ident, str(ident)),
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": end_value,
+                "samples": samples,
+                "weights": weights
+            })
+        return json.dumps({
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": self._frame_list},
+            "profiles": profiles,
+            "name": "riptide_mission_control",
+            "exporter": "riptide_mission_control"
+        }).encode('utf-8')
+
+
+def create_profiler(format: str):
+    """Returns a profiler that produces a file in the given format (pstats or speedscope)."""
+    if format == PROFILE_FORMAT_PSTATS:
+        return DeterministicProfiler()
+    if format == PROFILE_FORMAT_SPEEDSCOPE:
+        return SamplingProfiler()
+    raise ValueError(f"Unknown profile format {format}.")
+
+
+def profile_format_for_path(path: str) -> str:
+    """Returns speedscope for .json files, pstats otherwise."""
+    return PROFILE_FORMAT_SPEEDSCOPE if path.endswith('.json') else PROFILE_FORMAT_PSTATS
@@ -1,17 +1,27 @@
+import base64
+import binascii
 import time
 
 from graphql import GraphQLError
-from typing import Dict
+from typing import Dict, Callable, Optional, List, Tuple
 
 from riptide.config.document.project import Project
 from riptide.config.loader import load_config_by_project_name, load_projects, load_config
 from riptide_mission_control import PROJECT_CACHE_TIMEOUT
 from riptide_mission_control.graphql_entities.document.project import ProjectGraphqlDocument
+from riptide_mission_control.memory import cache_registry
+from riptide_mission_control.metrics import PROJECT_CACHE_HITS, PROJECT_CACHE_MISSES, PROJECT_CACHE_EVICTIONS, \
+    CACHE_HITS, CACHE_MISSES, CACHE_EVICTIONS, cache_statistic
+from riptide_mission_control.port_mapping_table import port_mapping_table
+
+_CURSOR_PREFIX = 'project:'
+_REGISTRY_CACHE_NAME = 'project_registry'
 
 
 class LoadedProjects:
-    projects: Dict[str, Project] = {}
-    time_last_loaded: Dict[str, float] = {}
+    def __init__(self):
+        self.projects: Dict[str, Project] = {}
+        self.time_last_loaded: Dict[str, float] = {}
 
 
 _loaded_projects = LoadedProjects()
@@ -19,17 +29,75 @@ _project_files_list: Dict[str, str] = None
 _project_files_last_loaded: int = 0
 
 
+cache_registry.register('projects', lambda: (len(_loaded_projects.projects), _loaded_projects.projects))
+cache_registry.register('project_files', lambda: (len(_project_files_list or {}), _project_files_list))
+
+
 def flush_caches():
-    global _project_files_list, _project_files_last_loaded, _loaded_projects
+    flush_project_registry()
+    flush_projects()
+
+
+def flush_project_registry():
+    """Flushes the cached list of registered projects."""
+    global _project_files_list, _project_files_last_loaded
+    if _project_files_list is not None:
+        CACHE_EVICTIONS.inc(cache=_REGISTRY_CACHE_NAME)
     _project_files_list = None
     _project_files_last_loaded = 0
-    _loaded_projects = LoadedProjects()
+
+
+def flush_projects(project_name: str = None):
+    """Flushes the given project or all projects from the project cache."""
+    global _loaded_projects
+    if project_name is None:
+        PROJECT_CACHE_EVICTIONS.inc(len(_loaded_projects.projects))
+        _loaded_projects = LoadedProjects()
+    elif project_name in _loaded_projects.projects:
+        PROJECT_CACHE_EVICTIONS.inc()
+        del _loaded_projects.projects[project_name]
+        del _loaded_projects.time_last_loaded[project_name]
+    port_mapping_table.flush()
+
+
+def project_cache_statistic() -> dict:
+    return cache_statistic(
+        'projects',
+        len(_loaded_projects.projects),
+        min(_loaded_projects.time_last_loaded.values(), default=None),
+        PROJECT_CACHE_HITS.get(),
+        PROJECT_CACHE_MISSES.get(),
+        PROJECT_CACHE_EVICTIONS.get()
+    )
+
+
+def project_registry_statistic() -> dict:
+    return cache_statistic(
+        _REGISTRY_CACHE_NAME,
+        len(_project_files_list) if _project_files_list is not None else 0,
+        _project_files_last_loaded if _project_files_list is not None else None,
+        CACHE_HITS.get(cache=_REGISTRY_CACHE_NAME),
+        CACHE_MISSES.get(cache=_REGISTRY_CACHE_NAME),
+        CACHE_EVICTIONS.get(cache=_REGISTRY_CACHE_NAME)
+    )
+
+
+def _needs_loading(name: str, current_time: float) -> bool:
+    """Returns whether the project has to be (re)loaded, because it is not cached or the cache entry expired."""
+    if name not in _loaded_projects.projects:
+        PROJECT_CACHE_MISSES.inc()
+        return True
+    if current_time - _loaded_projects.time_last_loaded[name] > PROJECT_CACHE_TIMEOUT:
+        PROJECT_CACHE_EVICTIONS.inc()
+        PROJECT_CACHE_MISSES.inc()
+        return True
+    PROJECT_CACHE_HITS.inc()
+    return False
 
 
 def load_single_project(name: str):
     current_time = time.time()
-    if name not in _loaded_projects.projects \
-            or current_time - _loaded_projects.time_last_loaded[name] > PROJECT_CACHE_TIMEOUT:
+    if _needs_loading(name, current_time):
         try:
             _loaded_projects.time_last_loaded[name] = current_time
             _loaded_projects.projects[name] = load_config_by_project_name(name)["project"]
@@ -40,45 +108,147 @@ def load_single_project(name: str):
 
 
 def get_project_list() -> Dict[str, str]:
-    global _project_files_list
+    global _project_files_list, _project_files_last_loaded
     current_time = time.time()
 
-    if current_time - _project_files_last_loaded > PROJECT_CACHE_TIMEOUT:
+    if _project_files_list is None or current_time - _project_files_last_loaded > PROJECT_CACHE_TIMEOUT:
+        if _project_files_list is not None:
+            CACHE_EVICTIONS.inc(cache=_REGISTRY_CACHE_NAME)
+        CACHE_MISSES.inc(cache=_REGISTRY_CACHE_NAME)
         _project_files_list = load_projects()
+        _project_files_last_loaded = current_time
+    else:
+        CACHE_HITS.inc(cache=_REGISTRY_CACHE_NAME)
     return _project_files_list
 
 
-def load_all_projects():
-    project_files = get_project_list()
-    current_time = time.time()
+def encode_project_cursor(project_name: str) -> str:
+    """Returns an opaque pagination cursor pointing at the project with the given name."""
+    return base64.b64encode((_CURSOR_PREFIX + project_name).encode('utf-8')).decode('ascii')
 
-    projects = []
-    errors = []
-    for project_name, project_file in project_files.items():
-
-        if project_name not in _loaded_projects.projects \
-                or current_time - _loaded_projects.time_last_loaded[project_name] > PROJECT_CACHE_TIMEOUT:
-
-            try:
-                project_load_result = load_config(project_file)
-                if "project" not in project_load_result:
-                    errors.append({
-                        "name": project_name,
-                        "path": project_file,
-                        "error": f"Could not load project {project_name} from {project_file}. "
-                                 f"Unknown error. File missing?"
-                    })
-                    continue
-                _loaded_projects.time_last_loaded[project_name] = current_time
-                _loaded_projects.projects[project_name] = project_load_result["project"]
-            except Exception as ex:
+
+def decode_project_cursor(cursor: str) -> str:
+    """Returns the project name the given pagination cursor points at."""
+    try:
+        decoded = base64.b64decode(cursor.encode('ascii'), validate=True).decode('utf-8')
+    except (binascii.Error, UnicodeError) as ex:
+        raise GraphQLError(f"Invalid cursor {cursor}.") from ex
+    if not decoded.startswith(_CURSOR_PREFIX):
+        raise GraphQLError(f"Invalid cursor {cursor}.")
+    return decoded[len(_CURSOR_PREFIX):]
+
+
+def _load_project_file(project_name: str, project_file: str, current_time: float, errors: List[dict]) -> Optional[Project]:
+    """
+    Returns the project from the cache or loads it from project_file, if the cache entry is missing or too old.
+    If loading fails, an error entry is added to errors and the previously cached project (if any) is returned.
+    """
+    if _needs_loading(project_name, current_time):
+        try:
+            project_load_result = load_config(project_file)
+            if "project" not in project_load_result:
                 errors.append({
                     "name": project_name,
                     "path": project_file,
-                    "error": f"Could not load project {project_name} from {project_file}. {ex}"
+                    "error": f"Could not load project {project_name} from {project_file}. "
+                             f"Unknown error. File missing?"
                 })
+                return None
+            _loaded_projects.time_last_loaded[project_name] = current_time
+            _loaded_projects.projects[project_name] = project_load_result["project"]
+        except Exception as ex:
+            errors.append({
+                "name": project_name,
+                "path": project_file,
+                "error": f"Could not load project {project_name} from {project_file}. {ex}"
+            })
+
+    return _loaded_projects.projects.get(project_name)
+
+
+def load_projects_page(
+        first: int = None,
+        after: str = None,
+        name_prefix: str = None,
+        project_filter: Callable[[Project], bool] = None
+):
+    """
+    Loads a page of the registered projects, ordered by name.
+
+    Only the projects that are needed to fill the page are loaded, so filters that can be evaluated
+    on the name alone should be passed as name_prefix instead of as part of the project_filter.
+
+    :param first:           Maximum number of projects to return. All if not given.
+    :param after:           Cursor of the last project of the previous page.
+    :param name_prefix:     Only return projects which names start with this prefix.
+    :param project_filter:  Only return loaded projects for which this function returns True.
+    """
+    if first is not None and first < 0:
+        raise GraphQLError("first must not be negative.")
+    project_files = get_project_list()
+    current_time = time.time()
+
+    names = sorted(project_files.keys())
+    if name_prefix:
+        names = [name for name in names if name.startswith(name_prefix)]
+    if after is not None:
+        after_name = decode_project_cursor(after)
+        names = [name for name in names if name > after_name]
+
+    projects = []
+    errors = []
+    start_cursor = None
+    end_cursor = None
+    has_next_page = False
+    for project_name in names:
+        page_full = first is not None and len(projects) >= first
+        # Once the page is full, only look for one more matching project to know if there is a next page.
+        # Errors of these projects are reported with the next page instead.
+        project = _load_project_file(project_name, project_files[project_name], current_time,
+                                     [] if page_full else errors)
+        if project is None or (project_filter is not None and not project_filter(project)):
+            continue
+        if page_full:
+            has_next_page = True
+            break
+
+        projects.append(ProjectGraphqlDocument(project))
+        end_cursor = encode_project_cursor(project_name)
+        if start_cursor is None:
+            start_cursor = end_cursor
+
+    return {
+        "projects": projects,
+        "errors": errors,
+        "page_info": {
+            "has_next_page": has_next_page,
+            "has_previous_page": after is not None,
+            "start_cursor": start_cursor,
+            "end_cursor": end_cursor
+        }
+    }
 
-        if project_name in _loaded_projects.projects:
-            projects.append(ProjectGraphqlDocument(_loaded_projects.projects[project_name]))
 
-    return {"projects": projects, "errors": errors}
+def load_all_projects():
+    return load_projects_page()
+
+
+def warm_projects(project_names: List[str] = None) -> Tuple[List[Project], List[dict]]:
+    """
+    Loads the registry and the given projects (all if not given) into the cache, if they are not cached yet
+    or expired. Returns the loaded projects and the errors that occurred.
+    """
+    project_files = get_project_list()
+    if project_names is None:
+        project_names = sorted(project_files.keys())
+    current_time = time.time()
+    projects = []
+    errors = []
+    for project_name in project_names:
+        if project_name not in project_files:
+            errors.append({"name": project_name, "path": "", "error": f"Project {project_name} not found."})
+            continue
+        project = _load_project_file(project_name, project_files[project_name], current_time, errors)
+        if project is not None:
+            projects.append(project)
+    return projects, errors
@@ -0,0 +1,241 @@
+"""Static cost and depth analysis of GraphQL operations, before they are executed"""
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, NamedTuple, Optional, Set, Tuple
+
+from graphql.language import ast
+from graphql.type.definition import GraphQLList, GraphQLNonNull, get_named_type
+
+from riptide_mission_control import QUERY_MAX_COST, QUERY_MAX_DEPTH, QUERY_COST_LIST_SIZE, \
+    QUERY_COST_SHORT_LIST_SIZE, QUERY_COST_BUDGET
+from riptide_mission_control.metrics import QUERY_COST, QUERY_COST_REJECTIONS
+from riptide_mission_control.rate_limit import TokenBucket
+
+# Cost of fields, that do more than reading the loaded project, by Type.field.
+# Other fields cost 1 if they are of an object type and 0 otherwise.
+DEFAULT_FIELD_WEIGHTS = {
+    # Engine calls
+    'Service.running': 10,
+    'Service.containerName': 5,
+    # File system access and the port mapping table
+    'Service.logFiles': 5,
+    'Service.additionalPorts': 5,
+    'Project.isSetup': 2,
+    'Project.dbAvailable': 5,
+    'Project.dbList': 5,
+    'Project.dbCurrent': 5,
+    'Query.allBoundPorts': 10,
+}
+
+# Lists, that usually only have a few entries, by Type.field, or by Type for all lists of the type.
+# These are the maps of the configuration of services and commands, and the ports and log files of services.
+DEFAULT_SHORT_LISTS = {
+    'ServiceConfiguration',
+    'ServiceConfigurationLogging',
+    'NormalCommandConfiguration',
+    'Service.additionalPorts',
+    'Service.logFiles',
+}
+
+# Maximum number of clients to keep cost budgets for
+_MAX_CLIENTS = 1024
+
+
+class QueryCost(NamedTuple):
+    cost: int
+    depth: int
+
+    def to_dict(self, analysis: 'QueryCostAnalysis') -> dict:
+        return {
+            "cost": self.cost,
+            "depth": self.depth,
+            "maxCost": analysis.max_cost or None,
+            "maxDepth": analysis.max_depth or None,
+        }
+
+
+class QueryCostError(Exception):
+    """An operation was rejected. status_code is the HTTP status to respond with."""
+    def __init__(self, message: str, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class QueryCostAnalysis:
+    """
+    Computes the cost and depth of operations from their parsed document and rejects or throttles operations
+    that are too expensive.
+
+    The cost of a field is its weight plus the cost of its selections. For lists, this is multiplied by the
+    value of the first argument of the list field or its closest parent field, if given, or by the assumed
+    number of entries: short_list_size for short_lists, list_size for all others.
+    Fragments on different types are all counted. Introspection fields are free.
+
+    If budget is set, each client may spend this much cost per minute, otherwise it is throttled.
+    Limits and budget are disabled if 0.
+    """
+    def __init__(self):
+        self.max_cost = QUERY_MAX_COST
+        self.max_depth = QUERY_MAX_DEPTH
+        self.list_size = QUERY_COST_LIST_SIZE
+        self.short_list_size = QUERY_COST_SHORT_LIST_SIZE
+        self.short_lists: Set[str] = set(DEFAULT_SHORT_LISTS)
+        self.weights: Dict[str, int] = dict(DEFAULT_FIELD_WEIGHTS)
+        self._budget = QUERY_COST_BUDGET
+        # Least recently used first
+        self._buckets: 'OrderedDict[str, TokenBucket]' = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def budget(self) -> int:
+        return self._budget
+
+    @budget.setter
+    def budget(self, budget: int):
+        with self._lock:
+            self._budget = budget
+            self._buckets = OrderedDict()
+
+    def analyse(self, schema, document_ast: ast.Document, operation_name: Optional[str],
+                variables: Optional[dict]) -> Optional[QueryCost]:
+        """Returns the cost of the operation, or None if the operation does not exist."""
+        fragments = {}
+        operations = []
+        for definition in document_ast.definitions:
+            if isinstance(definition, ast.FragmentDefinition):
+                fragments[definition.name.value] = definition
+            elif isinstance(definition, ast.OperationDefinition):
+                if operation_name is None or (definition.name and definition.name.value == operation_name):
+                    operations.append(definition)
+        if len(operations) != 1:
+            return None
+        operation = operations[0]
+        root_type = {
+            'query': schema.get_query_type(),
+            'mutation': schema.get_mutation_type(),
+            'subscription': schema.get_subscription_type()
+        }.get(operation.operation)
+        if root_type is None:
+            return None
+        return QueryCost(*self._selection_set(schema, root_type, operation.selection_set, fragments,
+                                              variables or {}, 1, None, set()))
+
+    def _selection_set(self, schema, parent_type, selection_set: ast.SelectionSet, fragments: dict,
+                       variables: dict, depth: int, first: Optional[int], visited: Set[str]) -> Tuple[int, int]:
+        """Returns the cost and maximum depth of the selections. depth is the depth of the selections."""
+        cost = 0
+        max_depth = depth - 1
+        for selection in selection_set.selections:
+            if isinstance(selection, ast.Field):
+                field_cost, field_depth = self._field(schema, parent_type, selection, fragments, variables, depth,
+                                                      first, visited)
+            elif isinstance(selection, ast.InlineFragment):
+                fragment_type = schema.get_type(selection.type_condition.name.value) \
+                    if selection.type_condition else parent_type
+                field_cost, field_depth = self._selection_set(schema, fragment_type, selection.selection_set,
+                                                              fragments, variables, depth, first, visited)
+            elif isinstance(selection, ast.FragmentSpread):
+                name = selection.name.value
+                if name in visited or name not in fragments:
+                    # Cycles and unknown fragments are reported by validation
+                    continue
+                fragment = fragments[name]
+                field_cost, field_depth = self._selection_set(
+                    schema, schema.get_type(fragment.type_condition.name.value), fragment.selection_set, fragments,
+                    variables, depth, first, visited | {name}
+                )
+            else:
+                continue
+            cost += field_cost
+            max_depth = max(max_depth, field_depth)
+        return cost, max_depth
+
+    def _field(self, schema, parent_type, field: ast.Field, fragments: dict, variables: dict, depth: int,
+               first: Optional[int], visited: Set[str]) -> Tuple[int, int]:
+        name = field.name.value
+        fields = getattr(parent_type, 'fields', None)
+        if name.startswith('__') or not fields or name not in fields:
+            # Introspection is free, unknown fields are reported by validation
+            return 0, depth
+        field_type = fields[name].type
+        weight = self.weights.get(f'{parent_type.name}.{name}', 1 if field.selection_set else 0)
+
+        first = self._first_argument(field, variables) or first
+        multiplier = 1
+        if _is_list(field_type):
+            multiplier = first or self._list_size(parent_type.name, name)
+            first = None
+
+        selections_cost, max_depth = 0, depth
+        if field.selection_set:
+            selections_cost, max_depth = self._selection_set(schema, get_named_type(field_type), field.selection_set,
+                                                             fragments, variables, depth + 1, first, visited)
+        return multiplier * (weight + selections_cost), max_depth
+
+    def _list_size(self, type_name: str, field_name: str) -> int:
+        if type_name in self.short_lists or f'{type_name}.{field_name}' in self.short_lists:
+            return self.short_list_size
+        return self.list_size
+
+    @staticmethod
+    def _first_argument(field: ast.Field, variables: dict) -> Optional[int]:
+        for argument in field.arguments or []:
+            if argument.name.value != 'first':
+                continue
+            value = None
+            if isinstance(argument.value, ast.IntValue):
+                value = int(argument.value.value)
+            elif isinstance(argument.value, ast.Variable):
+                value = variables.get(argument.value.name.value)
+            # Invalid values are rejected by the resolvers, but must not lower the cost before that
+            return value if isinstance(value, int) and value > 0 else None
+        return None
+
+    def check(self, client: str, operation: str, query_cost: QueryCost):
+        """
+        Raises a QueryCostError, if the operation is over the limits or the client is over its budget.
+        operation is the metric label of the operation.
+        """
+        if self.max_depth and query_cost.depth > self.max_depth:
+            QUERY_COST_REJECTIONS.inc(reason='depth')
+            raise QueryCostError(f"Query depth {query_cost.depth} exceeds the maximum depth of {self.max_depth}.",
+                                 400)
+        if self.max_cost and query_cost.cost > self.max_cost:
+            QUERY_COST_REJECTIONS.inc(reason='cost')
+            raise QueryCostError(f"Query cost {query_cost.cost} exceeds the maximum cost of {self.max_cost}. "
+                                 f"Select fewer fields or limit lists with first.", 400)
+        if self._budget and query_cost.cost > 0:
+            bucket = self._bucket(client)
+            # Operations costing more than the whole budget are allowed once the budget is full
+            amount = min(query_cost.cost, self._budget)
+            if not bucket.try_take(amount):
+                QUERY_COST_REJECTIONS.inc(reason='budget')
+                retry_after = bucket.time_until_available(amount)
+                raise QueryCostError(f"Query cost budget of {self._budget} per minute exceeded. "
+                                     f"Retry in {retry_after:.0f}s.", 429, retry_after)
+        QUERY_COST.observe(query_cost.cost, operation=operation)
+
+    def _bucket(self, client: str) -> TokenBucket:
+        with self._lock:
+            if client in self._buckets:
+                self._buckets.move_to_end(client)
+                return self._buckets[client]
+            if len(self._buckets) >= _MAX_CLIENTS:
+                # Full buckets are the same as new ones. If none are full, the least recently used one is dropped.
+                self._buckets = OrderedDict(
+                    (key, bucket) for key, bucket in self._buckets.items() if not bucket.is_full()
+                )
+                if len(self._buckets) >= _MAX_CLIENTS:
+                    self._buckets.popitem(last=False)
+            bucket = self._buckets[client] = TokenBucket(self._budget, self._budget / 60)
+            return bucket
+
+
+def _is_list(field_type) -> bool:
+    if isinstance(field_type, GraphQLNonNull):
+        field_type = field_type.of_type
+    return isinstance(field_type, GraphQLList)
+
+
+query_cost_analysis = QueryCostAnalysis()
@@ -0,0 +1,43 @@
+"""Token bucket rate limiting"""
+import time
+from threading import Lock
+
+
+class TokenBucket:
+    """
+    A bucket holding up to capacity tokens, that is refilled with rate tokens per second.
+    Each allowed action takes one token, or the given amount of tokens.
+    """
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def try_take(self, amount: float = 1) -> bool:
+        """Takes amount tokens, if they are available. Returns whether the tokens were taken."""
+        if amount <= 0:
+            raise ValueError(f"Can only take a positive amount of tokens, not {amount}.")
+        with self._lock:
+            self._refill()
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return True
+            return False
+
+    def time_until_available(self, amount: float = 1) -> float:
+        """Returns the time in seconds until amount tokens are available."""
+        with self._lock:
+            self._refill()
+            return max(0.0, (amount - self._tokens) / self.rate)
+
+    def is_full(self) -> bool:
+        with self._lock:
+            self._refill()
+            return self._tokens >= self.capacity
@@ -0,0 +1,118 @@
+"""Request-scoped context, shared by all resolvers of a single GraphQL operation."""
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from riptide.config.document.project import Project
+from riptide.config.document.service import Service
+from riptide.config.files import get_project_setup_flag_path
+from riptide.db.environments import DbEnvironments
+from riptide_mission_control.port_mapping_table import port_mapping_table
+from riptide_mission_control.registry import registry
+from riptide_mission_control.status_cache import status_cache
+
+
+class HelperTiming:
+    """Time spent in a single memoised helper of a RequestContext."""
+    def __init__(self):
+        self.calls = 0
+        self.computed = 0
+        self.duration = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "computed": self.computed,
+            "duration": self.duration
+        }
+
+
+class RequestContext:
+    """
+    Passed as context to all resolvers of a GraphQL operation.
+
+    Expensive lookups (database environments, port mappings, setup flags and engine status) are memoised
+    for the lifetime of the operation, so that the same project is only asked once, no matter how many
+    fields need the information.
+
+    client identifies the client that sent the operation (its address), if known.
+    """
+    def __init__(self, client: Optional[str] = None):
+        self.client = client
+        self._db_environments: Dict[str, Optional[DbEnvironments]] = {}
+        self._setup_flags: Dict[str, bool] = {}
+        self._engine_status: Dict[str, Dict[str, bool]] = {}
+        self._port_mappings: Dict[Tuple[str, str], Dict[int, Optional[int]]] = {}
+        self.timings: Dict[str, HelperTiming] = {}
+
+    @contextmanager
+    def _timed(self, helper: str, computed: bool):
+        if helper not in self.timings:
+            self.timings[helper] = HelperTiming()
+        timing = self.timings[helper]
+        timing.calls += 1
+        if computed:
+            timing.computed += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timing.duration += time.perf_counter() - start
+
+    def db_environments(self, project: Project) -> Optional[DbEnvironments]:
+        """Returns the database environments of the project, or None if database features are not available."""
+        name = project["name"]
+        with self._timed("db_environments", name not in self._db_environments):
+            if name not in self._db_environments:
+                self._db_environments[name] = None
+                if DbEnvironments.has_db(project):
+                    self._db_environments[name] = DbEnvironments(project, registry().engine)
+            return self._db_environments[name]
+
+    def is_setup(self, project: Project) -> bool:
+        """Returns whether or not the project was set-up."""
+        name = project["name"]
+        with self._timed("is_setup", name not in self._setup_flags):
+            if name not in self._setup_flags:
+                self._setup_flags[name] = os.path.exists(get_project_setup_flag_path(project.folder()))
+            return self._setup_flags[name]
+
+    def port_mappings(self, project: Project, service: Service) -> Dict[int, Optional[int]]:
+        """
+        Returns the bound host ports for all additional ports of a service, by the requested start port.
+        Ports that were never bound are mapped to None.
+        """
+        key = (project["name"], service["$name"])
+        with self._timed("port_mappings", key not in self._port_mappings):
+            if key not in self._port_mappings:
+                host_starts = []
+                if "additional_ports" in service:
+                    host_starts = [entry["host_start"] for entry in service["additional_ports"].values()]
+                self._port_mappings[key] = port_mapping_table.lookup(key[0], key[1], host_starts)
+            return self._port_mappings[key]
+
+    def service_running(self, project: Project, service_name: str) -> bool:
+        """
+        Returns whether or not the service is running. The status of all services of a project is looked up once,
+        see StatusCache.
+        """
+        name = project["name"]
+        with self._timed("engine_status", name not in self._engine_status):
+            if name not in self._engine_status:
+                self._engine_status[name] = status_cache.status(project)
+            return self._engine_status[name].get(service_name, False)
+
+    def timings_dict(self) -> Dict[str, dict]:
+        """Returns the number of calls, number of actual computations and total time spent per helper."""
+        return {helper: timing.to_dict() for helper, timing in self.timings.items()}
+
+
+def get_request_context(info) -> RequestContext:
+    """
+    Returns the RequestContext of the current operation.
+    If the operation was not started with one, a new, unshared context is returned.
+    """
+    if isinstance(info.context, RequestContext):
+        return info.context
+    return RequestContext()
@@ -0,0 +1,94 @@
+"""On-disk cache of parsed schema docstrings, used when generating the GraphQL schema"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from contextlib import suppress
+from typing import Dict, Optional
+
+import pkg_resources
+from appdirs import user_cache_dir
+
+from riptide.util import get_riptide_version_raw
+from riptide_mission_control import LOGGER_NAME
+from riptide_mission_control.schema_docstring_parser import extract_from_schema
+
+logger = logging.getLogger(LOGGER_NAME)
+
+# If set, schema docstrings are always parsed and the cache is not used
+NO_CACHE_ENV = 'RIPTIDE_MC_NO_SCHEMA_CACHE'
+
+
+def default_cache_path() -> str:
+    """
+    Returns the path of the cache file. It depends on the versions of riptide-lib and configcrunch,
+    which define the schemas.
+    """
+    configcrunch_version = pkg_resources.get_distribution('configcrunch').version
+    file_name = f'schema_docs-riptide_lib-{get_riptide_version_raw()}-configcrunch-{configcrunch_version}.json'
+    return os.path.join(user_cache_dir('riptide_mission_control'), file_name)
+
+
+class SchemaDocCache:
+    """
+    Parsing schema docstrings with docutils is the most expensive part of generating the GraphQL schema.
+    Parsed docstrings are stored in a JSON file, by the hash of the docstring. New entries are only written
+    to the file when save is called, after a document was generated.
+    """
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        self._entries: Optional[Dict[str, dict]] = None
+        self._dirty = False
+
+    @property
+    def path(self) -> str:
+        if self._path is None:
+            self._path = default_cache_path()
+        return self._path
+
+    def extract(self, docstring: str) -> dict:
+        """Returns the parsed docstring, see schema_docstring_parser.extract_from_schema."""
+        if os.environ.get(NO_CACHE_ENV):
+            return extract_from_schema(docstring)
+        if self._entries is None:
+            self._entries = self._load()
+        key = hashlib.sha256(docstring.encode('utf-8')).hexdigest()
+        if key not in self._entries:
+            self._entries[key] = extract_from_schema(docstring)
+            self._dirty = True
+        return self._entries[key]
+
+    def save(self):
+        """Writes the cache file, if docstrings were parsed since it was last read or written."""
+        if not self._dirty:
+            return
+        self._dirty = False
+        self._save()
+
+    def _load(self) -> Dict[str, dict]:
+        try:
+            with open(self.path, 'r') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as ex:
+            logger.debug(f"Could not read schema docstring cache {self.path}: {ex}")
+            return {}
+
+    def _save(self):
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.tmp')
+            with os.fdopen(fd, 'w') as file:
+                json.dump(self._entries, file)
+            os.replace(tmp_path, self.path)
+        except OSError as ex:
+            logger.debug(f"Could not write schema docstring cache {self.path}: {ex}")
+            if tmp_path is not None:
+                with suppress(OSError):
+                    os.remove(tmp_path)
+
+
+schema_doc_cache = SchemaDocCache()
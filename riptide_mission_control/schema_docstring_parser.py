@@ -1,8 +1,4 @@
 """Parses definitions from YamlConfigDocument schema docstrings"""
-from docutils.nodes import block_quote, definition_list, term, definition, system_message, paragraph
-
-from docutils.examples import internals
-
 SCHEMA_DOC_TEXT_FOR_LIST = "<<text>>"
 
 
@@ -15,6 +11,9 @@ def extract_from_schema(docstring) -> dict:
     Alternatively entries may also have definition list as children. If this is the case
     and they also have a paragraph, then this paragraph will be stored in <<text>>.
     """
+    # docutils is slow to import and usually not needed, see SchemaDocCache
+    from docutils.examples import internals
+    from docutils.nodes import block_quote, definition_list
     doc, _ = internals(docstring, settings_overrides={'report_level': 6})
     bq = next(d for d in doc.children if type(d) == block_quote)
     dl = next(d for d in bq.children if type(d) == definition_list)
@@ -22,6 +21,7 @@ def extract_from_schema(docstring) -> dict:
 
 
 def _extract(dl):
+    from docutils.nodes import definition_list, term, definition, paragraph
     items = {}
     for dli in dl.children:
         dli_term = next(d for d in dli.children if type(d) == term)
@@ -32,7 +32,7 @@ def _extract(dl):
         if len(inner_paragraphs) > 0 and len(inner_dls) > 0:
             # Contains both a description and sub-fields
             items[name] = _extract(inner_dls[0])
-            items[name][SCHEMA_DOC_TEXT_FOR_LIST] = inner_paragraphs[0].children[0]
+            items[name][SCHEMA_DOC_TEXT_FOR_LIST] = str(inner_paragraphs[0].children[0])
         elif len(inner_dls) > 0:
             # Contains sub-fields
             items[name] = _extract(inner_dls[0])
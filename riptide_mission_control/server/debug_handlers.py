@@ -0,0 +1,137 @@
+"""
+Diagnostic endpoints under /debug.
+
+They are only available, if a debug token was configured, and only answer requests from localhost that
+send the token as 'Authorization: Bearer <token>' header.
+"""
+import hmac
+
+import tornado.gen
+import tornado.web
+
+from riptide_mission_control.executor import run_in_executor
+from riptide_mission_control.memory import memory_diagnostics, MEMORY_TRACE_FRAMES
+from riptide_mission_control.profiling import create_profiler, PROFILE_FORMAT_PSTATS, PROFILE_FORMAT_SPEEDSCOPE
+
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+# Maximum duration of a profiling run via the API
+MAX_PROFILE_SECONDS = 300
+
+
+class DebugHandler(tornado.web.RequestHandler):
+    """Base class for diagnostic endpoints. Checks that the request is local and authenticated."""
+    token = None
+
+    def prepare(self):
+        if not DebugHandler.token:
+            raise tornado.web.HTTPError(404)
+        if self.request.remote_ip not in LOCAL_ADDRESSES:
+            raise tornado.web.HTTPError(403, "Debug endpoints are only available from localhost.")
+        auth = self.request.headers.get('Authorization', '')
+        if not auth.startswith('Bearer ') or not hmac.compare_digest(auth[len('Bearer '):], DebugHandler.token):
+            raise tornado.web.HTTPError(401)
+
+
+class ProfileHandler(DebugHandler):
+    """
+    GET /debug/profile?seconds=N&format=pstats|speedscope
+
+    Profiles the server for N seconds and returns the profile.
+    """
+    running = False
+
+    async def get(self):
+        try:
+            seconds = float(self.get_argument('seconds', '10'))
+        except ValueError:
+            raise tornado.web.HTTPError(400, "seconds must be a number.")
+        if not 0 < seconds <= MAX_PROFILE_SECONDS:
+            raise tornado.web.HTTPError(400, f"seconds must be between 0 and {MAX_PROFILE_SECONDS}.")
+        format = self.get_argument('format', PROFILE_FORMAT_PSTATS)
+        if format not in (PROFILE_FORMAT_PSTATS, PROFILE_FORMAT_SPEEDSCOPE):
+            raise tornado.web.HTTPError(400, f"format must be {PROFILE_FORMAT_PSTATS} or {PROFILE_FORMAT_SPEEDSCOPE}.")
+        if ProfileHandler.running:
+            raise tornado.web.HTTPError(409, "A profiling run is already in progress.")
+
+        ProfileHandler.running = True
+        profiler = create_profiler(format)
+        try:
+            profiler.start()
+            await tornado.gen.sleep(seconds)
+        finally:
+            profiler.stop()
+            ProfileHandler.running = False
+
+        if format == PROFILE_FORMAT_SPEEDSCOPE:
+            self.set_header('Content-Type', 'application/json')
+            self.set_header('Content-Disposition', 'attachment; filename="riptide_mc.speedscope.json"')
+        else:
+            self.set_header('Content-Type', 'application/octet-stream')
+            self.set_header('Content-Disposition', 'attachment; filename="riptide_mc.pstats"')
+        self.write(profiler.result())
+
+
+class MemoryHandler(DebugHandler):
+    """
+    GET /debug/memory
+
+    Returns whether memory tracing is active, the names of all snapshots and the approximate size of all caches.
+    """
+    async def get(self):
+        # Measuring the caches walks up to MAX_SIZE_OBJECTS objects, which would block the IOLoop
+        self.write(await run_in_executor(memory_diagnostics.status))
+
+
+class MemoryTracingHandler(DebugHandler):
+    """
+    POST /debug/memory/start?frames=N
+    POST /debug/memory/stop
+
+    Starts or stops tracing memory allocations with tracemalloc.
+    """
+    async def post(self, action):
+        if action == 'start':
+            try:
+                frames = int(self.get_argument('frames', str(MEMORY_TRACE_FRAMES)))
+            except ValueError:
+                raise tornado.web.HTTPError(400, "frames must be a number.")
+            memory_diagnostics.start(frames)
+        else:
+            memory_diagnostics.stop()
+        self.write(await run_in_executor(memory_diagnostics.status))
+
+
+class MemorySnapshotHandler(DebugHandler):
+    """
+    POST /debug/memory/snapshot?name=NAME
+
+    Takes a snapshot of the traced memory allocations and stores it under the given name.
+    """
+    def post(self):
+        name = self.get_argument('name')
+        try:
+            memory_diagnostics.take_snapshot(name)
+        except ValueError as ex:
+            raise tornado.web.HTTPError(409, str(ex))
+        self.write({"snapshots": list(memory_diagnostics.snapshots.keys())})
+
+
+class MemoryDiffHandler(DebugHandler):
+    """
+    GET /debug/memory/diff?old=NAME&new=NAME&group_by=lineno|filename&top=N
+
+    Returns the allocations that grew the most between two snapshots.
+    """
+    def get(self):
+        group_by = self.get_argument('group_by', 'lineno')
+        if group_by not in ('lineno', 'filename'):
+            raise tornado.web.HTTPError(400, "group_by must be lineno or filename.")
+        try:
+            top = int(self.get_argument('top', '20'))
+        except ValueError:
+            raise tornado.web.HTTPError(400, "top must be a number.")
+        try:
+            diff = memory_diagnostics.diff(self.get_argument('old'), self.get_argument('new'), group_by, top)
+        except KeyError as ex:
+            raise tornado.web.HTTPError(404, str(ex))
+        self.write({"diff": diff})
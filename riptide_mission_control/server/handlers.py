@@ -0,0 +1,227 @@
+"""Riptide specific request handlers, extending the generic tornadoql handlers."""
+import re
+import time
+from typing import Optional, Tuple
+
+import tornado.web
+
+from riptide_mission_control.document_cache import document_cache
+from riptide_mission_control.introspection_cache import introspection_cache
+from riptide_mission_control.memory import cache_registry
+from riptide_mission_control.metrics import REQUEST_DURATION, SUBSCRIPTION_START_DURATION, metrics_registry, \
+    operation_labels
+from riptide_mission_control.query_cost import query_cost_analysis, QueryCost, QueryCostError
+from riptide_mission_control.request_context import RequestContext
+from riptide_mission_control.slow_log import slow_operation_log
+from riptide_mission_control.tracing import ResolverTracer, resolver_statistics
+from riptide_mission_control.warm_up import startup_warm_up
+from tornadoql.graphql_handler import ExecutionError, error_response
+from tornadoql.subscription_handler import GQL_DATA
+from tornadoql.tornadoql import GraphQLHandler, GraphQLSubscriptionHandler, SETTINGS
+
+# If this request header is set to a true value, the timings of the request context are added to the response.
+TIMINGS_HEADER = 'X-Riptide-Timings'
+# If this request header is set to a true value, an Apollo tracing trace is added to the response.
+TRACING_HEADER = 'X-Riptide-Tracing'
+
+
+cache_registry.register('websocket_subscriptions',
+                        lambda: (len(SETTINGS['subscriptions']), list(SETTINGS['subscriptions'].values())))
+
+
+def _header_enabled(handler, header: str) -> bool:
+    return handler.request.headers.get(header, '').lower() in ('1', 'true', 'yes')
+
+
+_OPERATION_NAME_RE = re.compile(r'^\s*(?:query|mutation|subscription)\s+(\w+)')
+
+
+def _operation_name(operation_name, query) -> str:
+    """Returns the operation name, falling back to the name of the first operation in the query."""
+    if operation_name:
+        return operation_name
+    match = _OPERATION_NAME_RE.match(query or '')
+    return match.group(1) if match else 'anonymous'
+
+
+def _operation_label(operation_name, query) -> str:
+    """Returns the value of the operation label of metrics. Unlike the name, it has a bounded number of values."""
+    return operation_labels.label(_operation_name(operation_name, query))
+
+
+def _query_cost(schema, query, operation_name, variables) -> Optional[QueryCost]:
+    """Returns the static cost of the operation, or None if it can not be parsed."""
+    if not isinstance(query, str):
+        return None
+    try:
+        document = document_cache.document_from_string(schema, query)
+    except Exception:
+        # Syntax errors are reported by the regular execution
+        return None
+    return query_cost_analysis.analyse(schema, document.document_ast, operation_name, variables)
+
+
+class RiptideGraphQLHandler(GraphQLHandler):
+    """
+    GraphQL query and mutation handler, that shares a RequestContext between all resolvers of a request
+    and optionally traces resolvers.
+    """
+    def initialize(self):
+        self.request_context = RequestContext(self.request.remote_ip)
+        self.query_cost: Optional[QueryCost] = None
+        self.tracer = None
+        if resolver_statistics.enabled or slow_operation_log.enabled or _header_enabled(self, TRACING_HEADER):
+            self.tracer = ResolverTracer(resolver_statistics if resolver_statistics.enabled else None)
+
+    @property
+    def context(self):
+        return self.request_context
+
+    @property
+    def middleware(self):
+        if self.tracer is None:
+            return super().middleware
+        return self.tracer.middleware()
+
+    @property
+    def backend(self):
+        return document_cache
+
+    @error_response
+    def get(self):
+        """
+        Introspection queries can also be sent with GET, with query and operationName as query arguments,
+        so that HTTP caches and GraphiQL can revalidate the response with its ETag. Everything else must be
+        sent with POST.
+        """
+        start = time.perf_counter()
+        query = self.get_argument('query', None)
+        operation_name = self.get_argument('operationName', None)
+        cached = introspection_cache.response(self.schema, query, operation_name)
+        if cached is None:
+            raise ExecutionError(400, ["Only introspection queries can be sent with GET. Use POST."])
+        # Caches may store the response, but must revalidate it, since the schema changes with the server
+        self.set_header('Cache-Control', 'no-cache')
+        self._write_cached(cached)
+        REQUEST_DURATION.observe(time.perf_counter() - start, operation=_operation_label(operation_name, query))
+
+    def handle_graqhql(self):
+        if self.tracer is None and not _header_enabled(self, TIMINGS_HEADER):
+            graphql_req = self.graphql_request
+            start = time.perf_counter()
+            cached = introspection_cache.response(self.schema, graphql_req.get('query'),
+                                                  graphql_req.get('operationName'))
+            if cached is not None:
+                self._write_cached(cached)
+                operation = _operation_label(graphql_req.get('operationName'), graphql_req.get('query'))
+                REQUEST_DURATION.observe(time.perf_counter() - start, operation=operation)
+                return
+        return super().handle_graqhql()
+
+    def _write_cached(self, cached: Tuple[str, str]):
+        body, etag = cached
+        self.set_header('Etag', etag)
+        if self.check_etag_header():
+            self.set_status(304)
+        else:
+            self.write(body)
+
+    def execute_graphql(self):
+        graphql_req = self.graphql_request
+        self.query_cost = _query_cost(self.schema, graphql_req.get('query'), graphql_req.get('operationName'),
+                                      graphql_req.get('variables'))
+        if self.query_cost is not None:
+            operation = _operation_label(graphql_req.get('operationName'), graphql_req.get('query'))
+            try:
+                query_cost_analysis.check(self.request.remote_ip, operation, self.query_cost)
+            except QueryCostError as ex:
+                if ex.retry_after is not None:
+                    self.set_header('Retry-After', str(int(ex.retry_after) + 1))
+                raise ExecutionError(ex.status_code, [ex])
+
+        start = time.perf_counter()
+        try:
+            return super().execute_graphql()
+        finally:
+            if self.tracer is not None:
+                self.tracer.finish()
+            duration = time.perf_counter() - start
+            graphql_req = self.graphql_request
+            REQUEST_DURATION.observe(duration, operation=_operation_label(graphql_req.get('operationName'),
+                                                                          graphql_req.get('query')))
+            operation = _operation_name(graphql_req.get('operationName'), graphql_req.get('query'))
+            slow_operation_log.record('operation', operation, graphql_req.get('query'),
+                                      graphql_req.get('variables'), duration, self.tracer)
+
+    def extensions(self, result):
+        extensions = super().extensions(result)
+        if self.query_cost is not None:
+            extensions['cost'] = self.query_cost.to_dict(query_cost_analysis)
+        if _header_enabled(self, TIMINGS_HEADER):
+            extensions['contextTimings'] = self.request_context.timings_dict()
+        if self.tracer is not None and _header_enabled(self, TRACING_HEADER):
+            extensions['tracing'] = self.tracer.to_apollo_tracing()
+        return extensions
+
+
+class RiptideGraphQLSubscriptionHandler(GraphQLSubscriptionHandler):
+    """
+    GraphQL subscription handler, that records how long it takes to start subscriptions and rejects
+    subscriptions that are too expensive. The cost is reported in the first message of a subscription.
+    """
+    def initialize(self, opts):
+        super().initialize(opts)
+        self.query_costs = {}
+
+    def on_start(self, op_id, params):
+        query_cost = _query_cost(self.schema, params.get('request_string'), params.get('operation_name'),
+                                 params.get('variable_values'))
+        if query_cost is not None:
+            operation = _operation_label(params.get('operation_name'), params.get('request_string'))
+            try:
+                query_cost_analysis.check(self.request.remote_ip, operation, query_cost)
+            except QueryCostError as ex:
+                return self.send_error(op_id, ex)
+            self.query_costs[op_id] = query_cost
+
+        # The context is set by the server, the clients can not pass one
+        params = dict(params, context_value=RequestContext(self.request.remote_ip), backend=document_cache)
+        tracer = None
+        if slow_operation_log.enabled:
+            tracer = ResolverTracer()
+            params = dict(params, middleware=tracer.middleware())
+        start = time.perf_counter()
+        try:
+            return super().on_start(op_id, params)
+        finally:
+            duration = time.perf_counter() - start
+            if tracer is not None:
+                tracer.finish()
+            SUBSCRIPTION_START_DURATION.observe(duration, operation=_operation_label(params.get('operation_name'),
+                                                                                     params.get('request_string')))
+            operation = _operation_name(params.get('operation_name'), params.get('request_string'))
+            slow_operation_log.record('subscription start', operation, params.get('request_string'),
+                                      params.get('variable_values'), duration, tracer)
+
+    def send_execution_result(self, op_id, execution_result):
+        query_cost = self.query_costs.pop(op_id, None)
+        if query_cost is None:
+            return super().send_execution_result(op_id, execution_result)
+        result = self.execution_result_to_dict(execution_result)
+        result['extensions'] = {'cost': query_cost.to_dict(query_cost_analysis)}
+        return self.send_message(op_id, GQL_DATA, result)
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    """Exports the runtime metrics in the Prometheus text format."""
+    def get(self):
+        self.set_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.write(metrics_registry.render())
+
+
+class ReadyHandler(tornado.web.RequestHandler):
+    """Returns 200 once the server finished warming up, 503 before."""
+    def get(self):
+        if not startup_warm_up.ready:
+            self.set_status(503)
+        self.write({"ready": startup_warm_up.ready})
@@ -6,10 +6,21 @@ import graphene
 import logging
 
 from riptide_mission_control import LOGGER_NAME
+from riptide_mission_control.container_actions import container_actions
+from riptide_mission_control.engines.instrumented import InstrumentedEngine
+from riptide_mission_control.graphql_entities.subscriptions.admission import admission_controllers
+from riptide_mission_control.query_cost import query_cost_analysis
 from riptide_mission_control.registry import registry
+from riptide_mission_control.server.debug_handlers import DebugHandler, ProfileHandler, MemoryHandler, \
+    MemoryTracingHandler, MemorySnapshotHandler, MemoryDiffHandler
+from riptide_mission_control.server.handlers import RiptideGraphQLHandler, RiptideGraphQLSubscriptionHandler, \
+    MetricsHandler, ReadyHandler
+from riptide_mission_control.slow_log import slow_operation_log
+from riptide_mission_control.stall_detector import StallDetector
+from riptide_mission_control.tracing import resolver_statistics
+from riptide_mission_control.warm_up import startup_warm_up, load_warm_up_queries
 
-from tornadoql.tornadoql import TornadoQL, GraphQLSubscriptionHandler, GraphQLHandler, GraphiQLHandler, SETTINGS, \
-    FallbackHandler
+from tornadoql.tornadoql import TornadoQL, GraphiQLHandler, SETTINGS, FallbackHandler
 
 import tornado.web
 import tornado.routing
@@ -21,13 +32,42 @@ from riptide_mission_control.graphql_entities.subscription import Subscription
 logger = logging.getLogger(LOGGER_NAME)
 
 
-def run_apiserver(system_config, engine, http_port):
+def run_apiserver(system_config, engine, http_port, trace_resolvers=False, slow_threshold=None,
+                  stall_threshold=None, debug_token=None, warm_up=False, warm_up_queries=None,
+                  max_query_cost=None, max_query_depth=None, query_cost_budget=None, query_cost_weights=None,
+                  admission_limits=None, max_container_actions=None):
     """
     Run api server on the specified port.
+
+    If trace_resolvers is set, durations of all resolvers are collected into per-field statistics.
+    If slow_threshold is set, operations taking longer than this many milliseconds are logged.
+    If stall_threshold is set, the event loop being blocked for longer than this many milliseconds is logged.
+    If debug_token is set, the /debug endpoints are available from localhost with this bearer token.
+    If warm_up is set, the caches are warmed up after the server started listening. /ready returns 200 once
+    this is done. warm_up_queries is an optional directory of *.graphql files to pre-parse during warm-up.
+    max_query_cost, max_query_depth and query_cost_budget override the limits of the query cost analysis
+    (0 disables them), query_cost_weights the cost of fields by Type.field.
+    admission_limits overrides the limits of the heavy operations (eg. updateImages) by operation.
+    max_container_actions overrides the number of containers started or stopped at once (0 for no limit).
     """
 
     registry().system_config = system_config
-    registry().engine = engine
+    registry().engine = InstrumentedEngine(engine)
+    resolver_statistics.enabled = trace_resolvers
+    slow_operation_log.threshold = slow_threshold / 1000 if slow_threshold is not None else None
+    DebugHandler.token = debug_token
+    if max_query_cost is not None:
+        query_cost_analysis.max_cost = max_query_cost
+    if max_query_depth is not None:
+        query_cost_analysis.max_depth = max_query_depth
+    if query_cost_budget is not None:
+        query_cost_analysis.budget = query_cost_budget
+    if query_cost_weights:
+        query_cost_analysis.weights.update(query_cost_weights)
+    for operation, limits in (admission_limits or {}).items():
+        admission_controllers[operation].limits = limits
+    if max_container_actions is not None:
+        container_actions.limit = max_container_actions
 
     schema = graphene.Schema(query=Query, mutation=Mutation, subscription=Subscription)
 
@@ -35,11 +75,23 @@ def run_apiserver(system_config, engine, http_port):
     logger.info('  GraphiQL:              http://localhost:%s/graphiql' % http_port)
     logger.info('  Queries and Mutations: http://localhost:%s/graphql' % http_port)
     logger.info('  Subscriptions:         ws://localhost:%s/subscriptions' % http_port)
+    logger.info('  Metrics:               http://localhost:%s/metrics' % http_port)
+    logger.info('  Readiness:             http://localhost:%s/ready' % http_port)
+    if debug_token:
+        logger.info('  Profiling:             http://localhost:%s/debug/profile' % http_port)
+        logger.info('  Memory diagnostics:    http://localhost:%s/debug/memory' % http_port)
 
     app_endpoints = [
-        (r'/subscriptions', GraphQLSubscriptionHandler, dict(opts=SETTINGS)),
-        (r'/graphql', GraphQLHandler),
+        (r'/subscriptions', RiptideGraphQLSubscriptionHandler, dict(opts=SETTINGS)),
+        (r'/graphql', RiptideGraphQLHandler),
         (r'/graphiql', GraphiQLHandler),
+        (r'/metrics', MetricsHandler),
+        (r'/ready', ReadyHandler),
+        (r'/debug/profile', ProfileHandler),
+        (r'/debug/memory', MemoryHandler),
+        (r'/debug/memory/(start|stop)', MemoryTracingHandler),
+        (r'/debug/memory/snapshot', MemorySnapshotHandler),
+        (r'/debug/memory/diff', MemoryDiffHandler),
         (r'/.*', FallbackHandler)
     ]
 
@@ -47,24 +99,56 @@ def run_apiserver(system_config, engine, http_port):
     app = tornado.web.Application(app_endpoints, **SETTINGS)
 
     app.listen(http_port)
+    if warm_up:
+        startup_warm_up.start(schema, load_warm_up_queries(warm_up_queries))
+    if stall_threshold is not None:
+        StallDetector(stall_threshold / 1000).start()
     tornado.ioloop.IOLoop.current().start()
 
 
-def get_for_external(system_config, engine, hostname):
+def get_for_external(system_config, engine, hostname, debug_token=None, warm_up=False, warm_up_queries=None,
+                     max_query_cost=None, max_query_depth=None, query_cost_budget=None, query_cost_weights=None,
+                     admission_limits=None, max_container_actions=None):
     """
-    Return Tornado routes for use in external servers
+    Return Tornado routes for use in external servers.
+    If warm_up is set, the warm-up is started once the IOLoop runs.
+    max_query_cost, max_query_depth, query_cost_budget, query_cost_weights, admission_limits and
+    max_container_actions are the same as for run_apiserver.
     """
 
     registry().system_config = system_config
-    registry().engine = engine
-    
+    registry().engine = InstrumentedEngine(engine)
+    DebugHandler.token = debug_token
+    if max_query_cost is not None:
+        query_cost_analysis.max_cost = max_query_cost
+    if max_query_depth is not None:
+        query_cost_analysis.max_depth = max_query_depth
+    if query_cost_budget is not None:
+        query_cost_analysis.budget = query_cost_budget
+    if query_cost_weights:
+        query_cost_analysis.weights.update(query_cost_weights)
+    for operation, limits in (admission_limits or {}).items():
+        admission_controllers[operation].limits = limits
+    if max_container_actions is not None:
+        container_actions.limit = max_container_actions
+
     schema = graphene.Schema(query=Query, mutation=Mutation, subscription=Subscription)
     TornadoQL.schema = schema
+    if warm_up:
+        queries = load_warm_up_queries(warm_up_queries)
+        tornado.ioloop.IOLoop.current().add_callback(startup_warm_up.start, schema, queries)
 
     return [
-        (HostnameMatcher(r'/subscriptions', hostname), GraphQLSubscriptionHandler, dict(opts=SETTINGS)),
-        (HostnameMatcher(r'/graphql', hostname), GraphQLHandler),
+        (HostnameMatcher(r'/subscriptions', hostname), RiptideGraphQLSubscriptionHandler, dict(opts=SETTINGS)),
+        (HostnameMatcher(r'/graphql', hostname), RiptideGraphQLHandler),
         (HostnameMatcher(r'/graphiql', hostname), GraphiQLHandler),
+        (HostnameMatcher(r'/metrics', hostname), MetricsHandler),
+        (HostnameMatcher(r'/ready', hostname), ReadyHandler),
+        (HostnameMatcher(r'/debug/profile', hostname), ProfileHandler),
+        (HostnameMatcher(r'/debug/memory', hostname), MemoryHandler),
+        (HostnameMatcher(r'/debug/memory/(start|stop)', hostname), MemoryTracingHandler),
+        (HostnameMatcher(r'/debug/memory/snapshot', hostname), MemorySnapshotHandler),
+        (HostnameMatcher(r'/debug/memory/diff', hostname), MemoryDiffHandler),
         (HostnameMatcher(r'/.*', hostname), FallbackHandler)
     ]
 
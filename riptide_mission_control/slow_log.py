@@ -0,0 +1,70 @@
+"""Logging of GraphQL operations that take longer than a configurable threshold"""
+import hashlib
+import json
+import logging
+
+from graphql import parse, print_ast
+from typing import Optional
+
+from riptide_mission_control import LOGGER_NAME, SLOW_LOG_TOP_RESOLVERS, SLOW_LOG_MAX_PER_MINUTE
+from riptide_mission_control.rate_limit import TokenBucket
+from riptide_mission_control.tracing import ResolverTracer
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+def normalized_query_hash(query: Optional[str]) -> str:
+    """
+    Returns a short hash of the query, that does not depend on whitespace, comments or formatting.
+    """
+    query = query or ''
+    try:
+        query = print_ast(parse(query))
+    except Exception:
+        # Hash invalid queries as they are
+        pass
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()[:12]
+
+
+class SlowOperationLog:
+    """
+    Logs operations that took longer than threshold seconds, with the slowest resolvers.
+    At most SLOW_LOG_MAX_PER_MINUTE operations are logged per minute, others are counted and reported
+    with the next logged operation.
+    """
+    def __init__(self):
+        self.threshold: Optional[float] = None
+        self._bucket = TokenBucket(SLOW_LOG_MAX_PER_MINUTE, SLOW_LOG_MAX_PER_MINUTE / 60)
+        self._suppressed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold is not None
+
+    def record(self, kind: str, operation: str, query: Optional[str], variables: Optional[dict],
+               duration: float, tracer: Optional[ResolverTracer]):
+        """Logs the operation, if it is slower than the threshold."""
+        if not self.enabled or duration < self.threshold:
+            return
+        if not self._bucket.try_take():
+            self._suppressed += 1
+            return
+
+        variables_size = len(json.dumps(variables)) if variables else 0
+        slowest = ''
+        if tracer is not None:
+            slowest = ', '.join(
+                f"{'.'.join(str(p) for p in resolver['path'])} {resolver['duration'] / 1e6:.1f}ms"
+                for resolver in tracer.slowest(SLOW_LOG_TOP_RESOLVERS)
+            )
+        suppressed = ''
+        if self._suppressed > 0:
+            suppressed = f" ({self._suppressed} slow operations not logged before this one)"
+            self._suppressed = 0
+        logger.warning(
+            f"Slow {kind} {operation} [query {normalized_query_hash(query)}]: {duration * 1000:.1f}ms, "
+            f"variables {variables_size} bytes. Slowest resolvers: {slowest or 'n/a'}{suppressed}"
+        )
+
+
+slow_operation_log = SlowOperationLog()
@@ -0,0 +1,83 @@
+"""Watchdog that detects when the Tornado IOLoop is blocked and logs what it was blocked by."""
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from tornado.ioloop import IOLoop, PeriodicCallback
+
+from riptide_mission_control import LOGGER_NAME
+from riptide_mission_control.metrics import Counter, Histogram
+
+logger = logging.getLogger(LOGGER_NAME)
+
+STALLS = Counter(
+    'riptide_mc_ioloop_stalls_total',
+    'Number of times the IOLoop was blocked longer than the stall threshold.'
+)
+STALL_DURATION = Histogram(
+    'riptide_mc_ioloop_stall_duration_seconds',
+    'Duration of IOLoop stalls.'
+)
+CALLBACK_LAG = Histogram(
+    'riptide_mc_ioloop_callback_lag_seconds',
+    'Delay between the scheduled and actual execution of the stall detector heartbeat callback.',
+    buckets=(.001, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0)
+)
+
+
+class StallDetector:
+    """
+    A periodic callback on the IOLoop records a heartbeat. A watchdog thread checks the heartbeat and if
+    it is older than threshold seconds, logs the current stack of the IOLoop thread.
+    """
+    def __init__(self, threshold: float, interval: float = 0.1):
+        self.threshold = threshold
+        self.interval = interval
+        self._last_beat = time.monotonic()
+        self._loop_thread_ident = None
+        self._stall_reported = False
+        self._stopped = threading.Event()
+        self._callback = None
+
+    def start(self, io_loop: IOLoop = None):
+        """Starts watching the IOLoop. Must be called from the thread the IOLoop runs in."""
+        if io_loop is None:
+            io_loop = IOLoop.current()
+        self._loop_thread_ident = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._callback = PeriodicCallback(self._beat, self.interval * 1000)
+        io_loop.add_callback(self._callback.start)
+        threading.Thread(target=self._watch, name='riptide-mc-stall-detector', daemon=True).start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._callback is not None:
+            self._callback.stop()
+
+    def _blocked_for(self, now: float) -> float:
+        # The heartbeat is expected every interval seconds, only the delay after that is blocking
+        return max(0.0, now - self._last_beat - self.interval)
+
+    def _beat(self):
+        now = time.monotonic()
+        blocked_for = self._blocked_for(now)
+        CALLBACK_LAG.observe(blocked_for)
+        if blocked_for > self.threshold:
+            # Stalls are counted once they are over, the watchdog only reports the stack while they last
+            STALLS.inc()
+            STALL_DURATION.observe(blocked_for)
+            logger.warning(f"IOLoop was blocked for {blocked_for * 1000:.0f}ms.")
+        self._last_beat = now
+        self._stall_reported = False
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval):
+            blocked_for = self._blocked_for(time.monotonic())
+            if blocked_for > self.threshold and not self._stall_reported:
+                self._stall_reported = True
+                frame = sys._current_frames().get(self._loop_thread_ident)
+                stack = ''.join(traceback.format_stack(frame)) if frame is not None else 'unknown\n'
+                logger.warning(f"IOLoop is blocked for more than {blocked_for * 1000:.0f}ms. "
+                               f"Current stack of the IOLoop thread:\n{stack}")
@@ -0,0 +1,68 @@
+"""Short-lived cache of the container status of projects, as reported by the engine"""
+import time
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+from riptide.config.document.project import Project
+from riptide_mission_control import STATUS_CACHE_TIMEOUT
+from riptide_mission_control.memory import cache_registry
+from riptide_mission_control.metrics import CACHE_HITS, CACHE_MISSES, CACHE_EVICTIONS, cache_statistic
+from riptide_mission_control.registry import registry
+
+_CACHE_NAME = 'status'
+
+
+class StatusCache:
+    """
+    Caches the status of all services of a project for STATUS_CACHE_TIMEOUT seconds.
+
+    Starting and stopping projects via the API invalidates the entry of the project.
+    """
+    def __init__(self, timeout: float = STATUS_CACHE_TIMEOUT):
+        self.timeout = timeout
+        self._entries: Dict[str, Tuple[float, Dict[str, bool]]] = {}
+        self._lock = Lock()
+
+    def status(self, project: Project) -> Dict[str, bool]:
+        """Returns whether or not each service of the project is running."""
+        name = project["name"]
+        current_time = time.time()
+        entry = self._entries.get(name)
+        if entry is not None:
+            if current_time - entry[0] <= self.timeout:
+                CACHE_HITS.inc(cache=_CACHE_NAME)
+                return entry[1]
+            CACHE_EVICTIONS.inc(cache=_CACHE_NAME)
+        CACHE_MISSES.inc(cache=_CACHE_NAME)
+        status = registry().engine.status(project, registry().system_config)
+        with self._lock:
+            self._entries[name] = (current_time, status)
+        return status
+
+    def invalidate(self, project_name: Optional[str] = None):
+        """Removes the entry of the given project, or all entries if no project is given."""
+        with self._lock:
+            if project_name is None:
+                CACHE_EVICTIONS.inc(len(self._entries), cache=_CACHE_NAME)
+                self._entries = {}
+            elif self._entries.pop(project_name, None) is not None:
+                CACHE_EVICTIONS.inc(cache=_CACHE_NAME)
+
+    def statistic(self) -> dict:
+        entries = list(self._entries.values())
+        return cache_statistic(
+            _CACHE_NAME,
+            len(entries),
+            min((loaded for loaded, _ in entries), default=None),
+            CACHE_HITS.get(cache=_CACHE_NAME),
+            CACHE_MISSES.get(cache=_CACHE_NAME),
+            CACHE_EVICTIONS.get(cache=_CACHE_NAME)
+        )
+
+    def memory_usage(self):
+        """Returns the number of projects and the cached entries."""
+        return len(self._entries), self._entries
+
+
+status_cache = StatusCache()
+cache_registry.register('status', status_cache.memory_usage)
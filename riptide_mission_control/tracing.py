@@ -0,0 +1,159 @@
+"""
+Field-level tracing of GraphQL resolvers.
+
+The tracing data of a single request is available in the format of the Apollo tracing extension
+(https://github.com/apollographql/apollo-tracing). In addition, resolver durations can be aggregated
+over all requests into per-field statistics.
+"""
+import math
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+
+from graphql.execution.middleware import MiddlewareManager
+from promise import is_thenable
+
+from riptide_mission_control.memory import cache_registry
+
+# Number of most recent durations kept per field for computing percentiles
+STATISTICS_SAMPLE_SIZE = 1000
+
+
+def _to_ns(seconds: float) -> int:
+    return int(seconds * 1e9)
+
+
+def _rfc3339(dt: datetime) -> str:
+    return dt.isoformat(timespec='milliseconds') + 'Z'
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Returns the pct-th percentile (nearest-rank) of a sorted, non-empty list."""
+    index = math.ceil(pct / 100 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(len(sorted_values) - 1, index))]
+
+
+class FieldStatistic:
+    """Aggregated durations of a single field (ParentType.fieldName)."""
+    def __init__(self, field: str):
+        self.field = field
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: Deque[float] = deque(maxlen=STATISTICS_SAMPLE_SIZE)
+
+    def record(self, duration: float):
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        self.samples.append(duration)
+
+    def to_dict(self) -> dict:
+        """Returns the statistic. Times are in milliseconds, percentiles are based on the most recent samples."""
+        samples = sorted(self.samples)
+        return {
+            "field": self.field,
+            "count": self.count,
+            "mean": self.total / self.count * 1000,
+            "p50": percentile(samples, 50) * 1000,
+            "p90": percentile(samples, 90) * 1000,
+            "p99": percentile(samples, 99) * 1000,
+            "max": self.max * 1000
+        }
+
+
+class ResolverStatistics:
+    """Per-field resolver statistics, aggregated over all traced requests."""
+    def __init__(self):
+        self.enabled = False
+        self.fields: Dict[str, FieldStatistic] = {}
+
+    def record(self, field: str, duration: float):
+        if field not in self.fields:
+            self.fields[field] = FieldStatistic(field)
+        self.fields[field].record(duration)
+
+    def to_list(self) -> List[dict]:
+        """Returns the statistics of all fields, slowest (by p90) first."""
+        return sorted((stat.to_dict() for stat in self.fields.values()), key=lambda s: s["p90"], reverse=True)
+
+    def reset(self):
+        self.fields = {}
+
+    def memory_usage(self):
+        """Returns the number of fields and their statistics."""
+        return len(self.fields), self.fields
+
+
+resolver_statistics = ResolverStatistics()
+cache_registry.register('resolver_statistics', resolver_statistics.memory_usage)
+
+
+class ResolverTracer:
+    """
+    GraphQL middleware that records start offset and duration of every resolved field of one request.
+    """
+    def __init__(self, statistics: Optional[ResolverStatistics] = None):
+        self.statistics = statistics
+        self.start_time = datetime.utcnow()
+        self.end_time = None
+        self._start = time.perf_counter()
+        self._end = None
+        self.resolvers = []
+
+    def resolve(self, next, root, info, **args):
+        if self._end is not None:
+            # Finished: Don't trace fields resolved later (eg. for events of subscriptions)
+            return next(root, info, **args)
+        start = time.perf_counter()
+        result = next(root, info, **args)
+        if is_thenable(result):
+            def on_resolved(value):
+                self._record(info, start)
+                return value
+            return result.then(on_resolved)
+        self._record(info, start)
+        return result
+
+    def _record(self, info, start: float):
+        duration = time.perf_counter() - start
+        self.resolvers.append({
+            "path": list(info.path) if info.path else [info.field_name],
+            "parentType": str(info.parent_type),
+            "fieldName": info.field_name,
+            "returnType": str(info.return_type),
+            "startOffset": _to_ns(start - self._start),
+            "duration": _to_ns(duration)
+        })
+        if self.statistics is not None:
+            self.statistics.record(f"{info.parent_type}.{info.field_name}", duration)
+
+    def middleware(self) -> MiddlewareManager:
+        """Returns a middleware manager for this tracer, that does not wrap every resolver in a promise."""
+        return MiddlewareManager(self, wrap_in_promise=False)
+
+    def finish(self):
+        self.end_time = datetime.utcnow()
+        self._end = time.perf_counter()
+
+    def total_duration(self) -> float:
+        """Duration of the traced request in seconds."""
+        return (self._end if self._end is not None else time.perf_counter()) - self._start
+
+    def slowest(self, n: int) -> List[dict]:
+        """Returns the n slowest resolver entries."""
+        return sorted(self.resolvers, key=lambda r: r["duration"], reverse=True)[:n]
+
+    def to_apollo_tracing(self) -> dict:
+        """Returns the trace in the format of the Apollo tracing extension."""
+        return {
+            "version": 1,
+            "startTime": _rfc3339(self.start_time),
+            "endTime": _rfc3339(self.end_time or datetime.utcnow()),
+            "duration": _to_ns(self.total_duration()),
+            "execution": {
+                "resolvers": self.resolvers
+            }
+        }
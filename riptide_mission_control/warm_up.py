@@ -0,0 +1,75 @@
+"""Warm-up of the caches after the server started listening"""
+import asyncio
+import glob
+import logging
+import os
+import time
+from typing import List, Optional
+
+from graphql.utils.introspection_query import introspection_query
+
+from riptide_mission_control import LOGGER_NAME
+from riptide_mission_control.cache_management import cache_warmer
+from riptide_mission_control.document_cache import document_cache
+from riptide_mission_control.executor import run_in_executor
+from riptide_mission_control.introspection_cache import introspection_cache
+
+logger = logging.getLogger(LOGGER_NAME)
+
+# Queries that are always pre-parsed during warm-up
+WARM_UP_QUERIES = [
+    introspection_query,
+    '{ allProjectNames }',
+]
+
+
+def load_warm_up_queries(directory: Optional[str]) -> List[str]:
+    """Returns the built-in warm-up queries and the contents of all *.graphql files in directory."""
+    queries = list(WARM_UP_QUERIES)
+    if directory is not None:
+        for path in sorted(glob.glob(os.path.join(directory, '*.graphql'))):
+            with open(path, 'r') as file:
+                queries.append(file.read())
+    return queries
+
+
+class WarmUp:
+    """
+    Preloads the project registry, all projects and their status, pre-parses queries and computes the
+    response to the introspection query.
+    The server is ready, once the warm-up finished (or if it was never started).
+    """
+    def __init__(self):
+        self.ready = True
+        self.duration: Optional[float] = None
+
+    def start(self, schema, queries: List[str]):
+        """Starts the warm-up in the background. Must be called from the IOLoop thread."""
+        self.ready = False
+        asyncio.ensure_future(self._run(schema, queries))
+
+    async def _run(self, schema, queries: List[str]):
+        start = time.perf_counter()
+        try:
+            tasks = [run_in_executor(self._parse, schema, query) for query in queries]
+            tasks.append(run_in_executor(introspection_cache.response, schema, introspection_query, None))
+            projects_warmed = cache_warmer.start()
+            if projects_warmed is not None:
+                tasks.append(projects_warmed)
+            await asyncio.gather(*tasks)
+        except Exception as ex:
+            logger.error(f"Warm-up failed: {ex}")
+        finally:
+            self.duration = time.perf_counter() - start
+            self.ready = True
+            logger.info(f"Warm-up finished in {self.duration:.2f}s. Ready.")
+
+    @staticmethod
+    def _parse(schema, query: str):
+        try:
+            document_cache.document_from_string(schema, query)
+        except Exception as ex:
+            logger.warning(f"Warm-up: Could not parse query. {ex}")
+
+
+startup_warm_up = WarmUp()
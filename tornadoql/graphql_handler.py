@@ -82,6 +82,9 @@ class GQLHandler(web.RequestHandler):
             raise ex
 
         response = {'data': result.data}
+        extensions = self.extensions(result)
+        if extensions:
+            response['extensions'] = extensions
         self.write(json_encode(response))
 
     def execute_graphql(self):
@@ -92,7 +95,8 @@ class GQLHandler(web.RequestHandler):
             variable_values=graphql_req.get('variables'),
             operation_name=graphql_req.get('operationName'),
             context_value=self.context,
-            middleware=self.middleware
+            middleware=self.middleware,
+            backend=self.backend
         )
 
     @property
@@ -114,3 +118,10 @@ class GQLHandler(web.RequestHandler):
     @property
     def context(self):
         return {}
+
+    @property
+    def backend(self):
+        return None
+
+    def extensions(self, result):
+        return {}
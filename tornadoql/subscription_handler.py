@@ -2,11 +2,13 @@
 
 from __future__ import absolute_import, division, print_function
 
+import threading
 from collections import OrderedDict
 from graphql import graphql, format_error
 from graphql.execution import ExecutionResult
 from tornado import websocket
 from tornado.escape import json_decode, json_encode
+from tornado.ioloop import IOLoop
 from tornado.log import app_log
 from rx import Observer, Observable
 
@@ -30,17 +32,19 @@ GQL_STOP = 'stop'  # Client -> Server
 
 class SubscriptionObserver(Observer):
 
-    def __init__(self, op_id, send_execution_result, send_error, on_close):
+    def __init__(self, op_id, send_execution_result, send_error, on_subscription_completed):
         self.op_id = op_id
         self.send_execution_result = send_execution_result
         self.send_error = send_error
-        self.on_close = on_close
+        self.on_subscription_completed = on_subscription_completed
+        self.completed = False
 
     def on_next(self, value):
         self.send_execution_result(self.op_id, value)
 
     def on_completed(self):
-        self.on_close()
+        self.completed = True
+        self.on_subscription_completed(self.op_id)
 
     def on_error(self, error):
         self.send_error(self.op_id, error)
@@ -78,8 +82,18 @@ class GQLSubscriptionHandler(websocket.WebSocketHandler):
 
         assert message, "You need to send at least one thing"
         json_message = json_encode(message)
+        if threading.get_ident() != self._io_loop_thread:
+            # Subscriptions publish from executor threads, but Tornado is not thread-safe
+            self._io_loop.add_callback(self._write_if_open, json_message)
+            return None
         return self.write_message(json_message)
 
+    def _write_if_open(self, json_message):
+        try:
+            self.write_message(json_message)
+        except websocket.WebSocketClosedError:
+            pass
+
     def send_error(self, op_id, error, error_type=None):
         if error_type is None:
             error_type = GQL_ERROR
@@ -122,6 +136,8 @@ class GQLSubscriptionHandler(websocket.WebSocketHandler):
 
     def open(self):
         app_log.info('open socket %s', self)
+        self._io_loop = IOLoop.current()
+        self._io_loop_thread = threading.get_ident()
         self.sockets.append(self)
         self.subscriptions = {}
 
@@ -179,13 +195,17 @@ class GQLSubscriptionHandler(websocket.WebSocketHandler):
                 return
             assert isinstance(
                 execution_result, Observable), "A subscription must return an observable"
-            subscription = execution_result.subscribe(SubscriptionObserver(
-                    op_id,
-                    self.send_execution_result,
-                    self.send_error,
-                    self.on_close
-                )
+            observer = SubscriptionObserver(
+                op_id,
+                self.send_execution_result,
+                self.send_error,
+                self.on_subscription_completed
             )
+            subscription = execution_result.subscribe(observer)
+            if observer.completed:
+                # Completed while subscribing, there is nothing left to stop
+                subscription.dispose()
+                return
             self.subscribe(op_id, subscription)
         except Exception as e:
             self.send_error(op_id, str(e))
@@ -193,6 +213,16 @@ class GQLSubscriptionHandler(websocket.WebSocketHandler):
     def on_stop(self, op_id):
         self.unsubscribe(op_id)
 
+    def on_subscription_completed(self, op_id):
+        """Removes a subscription, whose observable completed. Other subscriptions of the socket stay."""
+        if threading.get_ident() != self._io_loop_thread:
+            # Subscriptions complete in executor threads, but the subscriptions are only changed on the IOLoop
+            self._io_loop.add_callback(self.on_subscription_completed, op_id)
+            return
+        # After the socket was closed, all subscriptions are already disposed
+        if op_id in self.subscriptions:
+            self.unsubscribe(op_id)
+
     def subscribe(self, op_id, subscription):
         if op_id in self.subscriptions:
             self.subscriptions[op_id].dispose()
@@ -202,6 +232,8 @@ class GQLSubscriptionHandler(websocket.WebSocketHandler):
 
     def unsubscribe(self, op_id):
         app_log.info('subscrption end: op_id=%s', op_id)
+        if op_id in self.subscriptions:
+            self.subscriptions[op_id].dispose()
         self.subscriptions = {n: s for n, s in self.subscriptions.items()
-                              if s != op_id}
+                              if n != op_id}
         app_log.debug('subscriptions: %s', self.subscriptions)
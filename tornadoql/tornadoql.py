@@ -51,6 +51,11 @@ class GraphQLSubscriptionHandler(GQLSubscriptionHandler):
     def subscriptions(self, subscriptions):
         self.opts['subscriptions'][self] = subscriptions
 
+    def on_close(self):
+        super(GraphQLSubscriptionHandler, self).on_close()
+        # Don't keep closed sockets around as keys
+        self.opts['subscriptions'].pop(self, None)
+
 
 class GraphiQLHandler(tornado.web.RequestHandler):
     def get(self):